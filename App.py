@@ -1,15 +1,194 @@
+import atexit
+import os
+import sys
+import threading
 import streamlit as st
 import time
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "blendercode"))
+
+from livebuffers import LiveBuffers
+from motionfeatures import MotionFeatures
+from motionrollups import MotionRollups
+from pulsewindows import PulseWindows, AggregateFile
+from sessionstore import SessionStore
+
+# Event Hub 连接配置 (Azure Web App 应用设置); "local" 使用进程内模拟设备
+EVENTHUB_CONNECTION_STR = os.environ.get("EVENTHUB_CONNECTION_STR")
+EVENTHUB_NAME = os.environ.get("EVENTHUB_NAME", "local")
+# 设置后按分区保存消费进度, 重启后从上次位置继续 (心率聚合不丢数据); "local" 模拟 hub 每次都是新的, 不保存
+EVENTHUB_CHECKPOINT_PATH = os.environ.get("EVENTHUB_CHECKPOINT_PATH")
+LIVE_REFRESH_SECONDS = 0.5
+LIVE_WINDOW_SECONDS = 60
+LIVE_MAX_POINTS = 600
+# 历史动作状态: 按秒/分钟预聚合, 任意时间范围最多绘制 HISTORY_MAX_POINTS 个点
+HISTORY_REFRESH_SECONDS = 5
+HISTORY_MAX_POINTS = 1500
+HISTORY_RANGES = {"Last 10 minutes": 600, "Last hour": 3600, "Session": None}
+# 心率按分钟聚合后写入的文件 (JSON lines); 不设置则只在页面上显示
+PULSE_AGGREGATE_PATH = os.environ.get("PULSE_AGGREGATE_PATH")
+# 设备停止发送后, 每隔这么多秒检查并关闭已结束的心率窗口
+PULSE_FLUSH_SECONDS = 5.0
+# 实时面板显示的最近心率报警条数 (过低 / 过高 / 无效读数)
+PULSE_ALERTS_SHOWN = 5
+
+# 计时记录数据库 (Azure Web App 上可设为 /home 下的路径以持久保存)
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
+HISTORY_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_live_sinks():
+    # one Event Hub consumer per server process, shared by every browser session
+    if not EVENTHUB_CONNECTION_STR:
+        return None, None, None, None
+    from blendercloud import EventHubReceiver
+    from jointstore import JointStore
+
+    checkpoint_store = None
+    consumer_client = None
+    if EVENTHUB_CONNECTION_STR == "local":
+        # the in-memory hub starts empty on every run, so checkpoints saved for an earlier one
+        # would point past its events; the local hub is never checkpointed
+        from localhub import LocalEventHub, LocalConsumerClient, FakeESP32Fleet
+        hub = LocalEventHub()
+        FakeESP32Fleet(hub, devices=2, joint_rate=20.0, bpm_rate=1.0).start_threaded()
+        consumer_client = LocalConsumerClient(hub)
+    elif EVENTHUB_CHECKPOINT_PATH:
+        from checkpointstore import SQLiteCheckpointStore
+        checkpoint_store = SQLiteCheckpointStore(EVENTHUB_CHECKPOINT_PATH)
+
+    live_buffers = LiveBuffers()
+    motion_features = MotionFeatures()
+    motion_rollups = MotionRollups()
+    aggregate_file = AggregateFile(PULSE_AGGREGATE_PATH) if PULSE_AGGREGATE_PATH else None
+    pulse_windows = PulseWindows(outputs=[aggregate_file] if aggregate_file else ())
+    receiver = EventHubReceiver(EVENTHUB_CONNECTION_STR, EVENTHUB_NAME, sinks=[live_buffers, motion_features, motion_rollups, pulse_windows],
+                                consumer_client=consumer_client, store=JointStore(), checkpoint_store=checkpoint_store)
+    # daemon threads, so the server can exit and run shutdown() below
+    threading.Thread(target=receiver.start, daemon=True).start()
+    flush_stop = threading.Event()
+    threading.Thread(target=flush_pulse_windows, args=(pulse_windows, flush_stop), daemon=True).start()
+
+    def shutdown():
+        # windows that ended after the last reading are written; the open, partial one is not
+        receiver.stop()
+        flush_stop.set()
+        pulse_windows.flush()
+        if aggregate_file:
+            aggregate_file.close()
+
+    atexit.register(shutdown)
+    return live_buffers, motion_features, motion_rollups, pulse_windows
+
+def flush_pulse_windows(pulse_windows, stop):
+    # a window otherwise only closes when its device's next reading arrives, so a device that went
+    # quiet would keep its last minute out of the page and the aggregate file indefinitely
+    while not stop.wait(PULSE_FLUSH_SECONDS):
+        pulse_windows.flush()
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(SESSION_DB_PATH)
+
+@st.cache_data(max_entries=256)
+def history_chart(user, version, page):
+    # version only changes when a session is added, so the figure is rebuilt only then
+    rows = get_session_store().history(user, page, HISTORY_PAGE_SIZE)[::-1]
+    durations_df = pd.DataFrame(rows, columns=["Id", "Started", "Duration (seconds)"])
+    durations_df["Started"] = pd.to_datetime(durations_df["Started"], unit="s")
+    return px.bar(durations_df, x="Started", y="Duration (seconds)", title="Duration of Each Exercise Session")
+
+@st.cache_data(max_entries=256)
+def totals_chart(user, version, period):
+    store = get_session_store()
+    rows = store.daily_totals(user) if period == "Daily" else store.weekly_totals(user)
+    totals_df = pd.DataFrame(rows, columns=[period, "Total (seconds)", "Sessions"])
+    return px.bar(totals_df, x=period, y="Total (seconds)", hover_data=["Sessions"], title=f"{period} Exercise Totals")
+
+def live_frame(live_buffers, source, keys):
+    frames = []
+    for key in keys:
+        ages, values = live_buffers.series(source, key, max_points=LIVE_MAX_POINTS, window=LIVE_WINDOW_SECONDS)
+        frames.append(pd.DataFrame({"Seconds (0 = now)": ages, "Value": values, "Key": key}))
+    return pd.concat(frames) if frames else pd.DataFrame(columns=["Seconds (0 = now)", "Value", "Key"])
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_panel(live_buffers, motion_features, pulse_windows):
+    # only this fragment reruns; it reads the shared buffers and never touches Event Hub itself
+    sources = live_buffers.sources()
+    if not sources:
+        st.info("Waiting for device data...")
+        return
+    source = st.selectbox("Device", sources, key="live_device")
+    keys = live_buffers.keys(source)
+    st.write("### Joint motion state (live)")
+    st.line_chart(live_frame(live_buffers, source, [key for key in keys if key.startswith("/joint/")]),
+                  x="Seconds (0 = now)", y="Value", color="Key")
+    features = motion_features.features(source)
+    if features:
+        st.dataframe(pd.DataFrame(
+            [(key, f.reps, f.range_of_motion, f.angular_velocity_ema, f.motion_state_ema) for key, f in sorted(features.items())],
+            columns=["Joint", "Reps", "Range of motion (rad)", "Angular velocity (rad/s)", "Motion state"]),
+            hide_index=True)
+    st.write("### Pulse (live)")
+    st.line_chart(live_frame(live_buffers, source, [key for key in keys if key == "BPM"]),
+                  x="Seconds (0 = now)", y="Value", color="Key")
+    pulse = pulse_windows.sliding(source)
+    if pulse is not None and pulse.count:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Mean BPM", f"{pulse.mean:.0f}")
+        col2.metric("Min / max", f"{pulse.min:.0f} / {pulse.max:.0f}")
+        col3.metric("RMSSD (ms)", f"{pulse.rmssd:.0f}")
+        col4.metric("Out of range", pulse.low + pulse.high + pulse.invalid)
+    alerts = pulse_windows.recent_alerts(source)[-PULSE_ALERTS_SHOWN:][::-1]
+    if alerts:
+        st.dataframe(pd.DataFrame({"Time": pd.to_datetime([alert.timestamp for alert in alerts], unit="s"),
+                                   "BPM": [alert.value for alert in alerts], "Alert": [alert.flag for alert in alerts]}),
+                     hide_index=True)
+
+def history_chart_figure(motion_rollups, source, seconds):
+    # mean line with a min/max band per joint, from the rollups; the point count is bounded
+    # whatever the range, so the chart costs the same an hour or a week into a session
+    start = time.time() - seconds if seconds is not None else None
+    figure = go.Figure()
+    for key in motion_rollups.keys(source):
+        series = motion_rollups.series(source, key, start=start, max_points=HISTORY_MAX_POINTS)
+        if not len(series.time):
+            continue
+        times = pd.to_datetime(series.time, unit="s")
+        figure.add_trace(go.Scatter(x=times, y=series.max, mode="lines", line_width=0, showlegend=False,
+                                    legendgroup=key, hoverinfo="skip"))
+        figure.add_trace(go.Scatter(x=times, y=series.min, mode="lines", line_width=0, fill="tonexty",
+                                    showlegend=False, legendgroup=key, hoverinfo="skip"))
+        figure.add_trace(go.Scatter(x=times, y=series.mean, mode="lines", name=key, legendgroup=key))
+    figure.update_layout(xaxis_title="Time", yaxis_title="Motion state", title="Joint motion state (history)")
+    return figure
+
+@st.fragment(run_every=HISTORY_REFRESH_SECONDS)
+def history_panel(motion_rollups):
+    sources = motion_rollups.sources()
+    if not sources:
+        return
+    source = st.session_state.get("live_device")
+    if source not in sources:
+        source = sources[0]
+    period = st.radio("Range", list(HISTORY_RANGES), horizontal=True, key="history_range")
+    st.plotly_chart(history_chart_figure(motion_rollups, source, HISTORY_RANGES[period]))
+    summaries = [(key, motion_rollups.summary(source, key)) for key in motion_rollups.keys(source)]
+    st.dataframe(pd.DataFrame(
+        [(key, s.count, s.mean, s.min, s.max, (s.end - s.start) / 60) for key, s in summaries if s is not None],
+        columns=["Joint", "Samples", "Mean motion state", "Min", "Max", "Minutes"]), hide_index=True)
 
 # 初始化会话状态变量
 if 'start_time' not in st.session_state:
     st.session_state.start_time = None
 if 'end_time' not in st.session_state:
     st.session_state.end_time = None
-if 'durations' not in st.session_state:
-    st.session_state.durations = []
+if 'last_duration' not in st.session_state:
+    st.session_state.last_duration = 0
 if 'paused_time' not in st.session_state:
     st.session_state.paused_time = 0
 if 'is_paused' not in st.session_state:
@@ -40,9 +219,22 @@ st.markdown(f"""
 <iframe width="800" height="600" src="{embed_link}" frameborder="0" allowFullScreen="true"></iframe>
 """, unsafe_allow_html=True)
 
+# 实时数据
+st.write("## Live data")
+live_buffers, motion_features, motion_rollups, pulse_windows = get_live_sinks()
+if live_buffers is None:
+    st.info("Set EVENTHUB_CONNECTION_STR and EVENTHUB_NAME to show live joint and pulse data.")
+else:
+    live_panel(live_buffers, motion_features, pulse_windows)
+    st.write("## Motion history")
+    history_panel(motion_rollups)
+
 # 计时功能
 st.write("## Sport Timer")
 
+session_store = get_session_store()
+user = st.text_input("User", value="default")
+
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
@@ -69,7 +261,8 @@ with col3:
             else:
                 st.session_state.end_time = time.time()
                 duration = st.session_state.end_time - st.session_state.start_time
-            st.session_state.durations.append(duration)
+            st.session_state.last_duration = duration
+            session_store.add_session(user, duration)
             st.session_state.start_time = None
             st.session_state.end_time = None
             st.session_state.paused_time = 0
@@ -77,45 +270,58 @@ with col3:
 
 # 显示当前计时状态
 st.write("### Time Elapsed")
-timer_placeholder = st.empty()
 
 def format_time(seconds):
     minutes = seconds // 60
     seconds = seconds % 60
     return f"{int(minutes):02}:{int(seconds):02}"
 
+TIMER_HTML = """
+<div id="sport-timer" style="font-size: 72px; text-align: center;">{initial}</div>
+<script>
+    // counts in the browser from the elapsed time at render, so no server thread is held while running
+    (() => {{
+        clearInterval(window.sportTimerInterval);
+        if (!{running}) return;
+        const elapsedAtRender = {elapsed};
+        const loadedAt = performance.now();
+        const pad = (value) => String(Math.floor(value)).padStart(2, "0");
+        window.sportTimerInterval = setInterval(() => {{
+            const timer = document.getElementById("sport-timer");
+            const seconds = Math.floor(elapsedAtRender + (performance.now() - loadedAt) / 1000);
+            if (timer) timer.textContent = pad(seconds / 60) + ":" + pad(seconds % 60);
+        }}, 250);
+    }})();
+</script>
+"""
+
+def render_timer(elapsed, running):
+    st.html(TIMER_HTML.format(initial=format_time(elapsed), elapsed=elapsed, running="true" if running else "false"),
+            unsafe_allow_javascript=True)
+
 if st.session_state.start_time is not None:
-    while st.session_state.start_time is not None:
-        if st.session_state.is_paused:
-            elapsed_time = int(st.session_state.paused_time - st.session_state.start_time)
-        else:
-            elapsed_time = int(time.time() - st.session_state.start_time)
-        timer_placeholder.markdown(f"""
-        <div style="font-size: 72px; text-align: center;">
-            {format_time(elapsed_time)}
-        </div>
-        """, unsafe_allow_html=True)
-        time.sleep(1)
-elif st.session_state.end_time is not None:
-    last_duration = int(st.session_state.durations[-1])
-    timer_placeholder.markdown(f"""
-    <div style="font-size: 72px; text-align: center;">
-        {format_time(last_duration)}
-    </div>
-    """, unsafe_allow_html=True)
+    if st.session_state.is_paused:
+        render_timer(st.session_state.paused_time - st.session_state.start_time, running=False)
+    else:
+        render_timer(time.time() - st.session_state.start_time, running=True)
 else:
-    timer_placeholder.markdown("""
-    <div style="font-size: 72px; text-align: center;">
-        00:00
-    </div>
-    """, unsafe_allow_html=True)
+    # after End the timer holds the session just recorded (0 before the first one)
+    render_timer(int(st.session_state.last_duration), running=False)
 
 # 统计表格
 st.write("## Recorded Durations")
-durations_df = pd.DataFrame(st.session_state.durations, columns=["Duration (seconds)"])
+version = session_store.version(user)
+total_sessions = version[1]
+pages = max((total_sessions + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+page = st.number_input("Page", min_value=1, max_value=pages, value=1) - 1
+
+rows = session_store.history(user, page, HISTORY_PAGE_SIZE)
+durations_df = pd.DataFrame([(pd.to_datetime(started, unit="s"), duration) for _, started, duration in rows],
+                            columns=["Started", "Duration (seconds)"])
 st.table(durations_df)
 
 # 绘制柱状图
-if not durations_df.empty:
-    fig = px.bar(durations_df, x=durations_df.index + 1, y="Duration (seconds)", labels={'x': 'Session', 'Duration (seconds)': 'Duration (seconds)'}, title="Duration of Each Exercise Session")
-    st.plotly_chart(fig)
\ No newline at end of file
+if total_sessions:
+    st.plotly_chart(history_chart(user, version, page))
+    period = st.radio("Totals", ["Daily", "Weekly"], horizontal=True)
+    st.plotly_chart(totals_chart(user, version, period))
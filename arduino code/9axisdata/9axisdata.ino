@@ -18,22 +18,25 @@ void setup() {
 
 void loop() {
   if (mpu.update()) {
-    int16_t ax = mpu.getAccX();
-    int16_t ay = mpu.getAccY();
-    int16_t az = mpu.getAccZ();
-    int16_t gx = mpu.getGyroX();
-    int16_t gy = mpu.getGyroY() - 1;
-    int16_t gz = mpu.getGyroZ();
-    int16_t mx = mpu.getMagX();
-    int16_t my = mpu.getMagY();
-    int16_t mz = mpu.getMagZ();
+    // one tab-separated line per sample: accel in milli-g and mag in milligauss as integers,
+    // gyro in deg/s with two decimals. the library reports g, deg/s and mG as floats; a plain
+    // int16_t cast would leave the accelerometer only -1, 0 or 1 g
+    long ax = lroundf(mpu.getAccX() * 1000.0f);
+    long ay = lroundf(mpu.getAccY() * 1000.0f);
+    long az = lroundf(mpu.getAccZ() * 1000.0f);
+    float gx = mpu.getGyroX();
+    float gy = mpu.getGyroY() - 1.0f;
+    float gz = mpu.getGyroZ();
+    long mx = lroundf(mpu.getMagX());
+    long my = lroundf(mpu.getMagY());
+    long mz = lroundf(mpu.getMagZ());
 
     Serial.print(ax); Serial.print("\t");
     Serial.print(ay); Serial.print("\t");
     Serial.print(az); Serial.print("\t");
-    Serial.print(gx); Serial.print("\t");
-    Serial.print(gy); Serial.print("\t");
-    Serial.print(gz); Serial.print("\t");
+    Serial.print(gx, 2); Serial.print("\t");
+    Serial.print(gy, 2); Serial.print("\t");
+    Serial.print(gz, 2); Serial.print("\t");
     Serial.print(mx); Serial.print("\t");
     Serial.print(my); Serial.print("\t");
     Serial.println(mz);
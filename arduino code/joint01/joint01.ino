@@ -8,6 +8,39 @@ MPU6050 mpu_secondary(0x69);
 
 uint8_t status_code = 0U;      // return status after each device operation (0 = success, !0 = error)
 
+// set to 1 to stream compact binary frames instead of JSON lines (blenderport decodes both).
+// frame: 0xA5 0x5A | joint id | sequence | w x y z as int16 Q14, little-endian | CRC-8 over id..z
+#define BINARY_FRAMES 0
+#define JOINT_PRIMARY 2
+#define JOINT_SECONDARY 3
+
+uint8_t frame_sequence[2] = {0U, 0U};
+
+uint8_t crc8(const uint8_t *data, uint8_t length) {
+  uint8_t crc = 0U;
+  for (uint8_t i = 0U; i < length; i++) {
+    crc ^= data[i];
+    for (uint8_t bit = 0U; bit < 8U; bit++) {
+      crc = (crc & 0x80U) ? (uint8_t)((crc << 1) ^ 0x07U) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+void writeQuaternionFrame(uint8_t joint_id, uint8_t sequence, const int16_t *quat) {
+  uint8_t frame[13];
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  frame[2] = joint_id;
+  frame[3] = sequence;
+  for (uint8_t i = 0U; i < 4U; i++) {
+    frame[4 + 2 * i] = (uint8_t)(quat[i] & 0xFF);
+    frame[5 + 2 * i] = (uint8_t)((quat[i] >> 8) & 0xFF);
+  }
+  frame[12] = crc8(&frame[2], 10);
+  Serial.write(frame, sizeof(frame));
+}
+
 void setup() {
   Wire.begin();
 
@@ -104,6 +137,16 @@ void loop() {
     return;
   }
   
+#if BINARY_FRAMES
+  // raw DMP quaternions are already Q14 int16, so no float formatting at all
+  int16_t raw_primary[4];
+  int16_t raw_secondary[4];
+  mpu_primary.dmpGetQuaternion(raw_primary, fifo_buffer_primary);
+  mpu_secondary.dmpGetQuaternion(raw_secondary, fifo_buffer_secondary);
+
+  writeQuaternionFrame(JOINT_PRIMARY, frame_sequence[0]++, raw_primary);
+  writeQuaternionFrame(JOINT_SECONDARY, frame_sequence[1]++, raw_secondary);
+#else
   // orientation/motion vars
   Quaternion quat_primary;           // [w, x, y, z]         quaternion container
   Quaternion quat_secondary;           // [w, x, y, z]         quaternion container
@@ -124,4 +167,5 @@ void loop() {
   Serial.print(quat_secondary.y);Serial.print(", ");
   Serial.print(quat_secondary.z);
   Serial.print("]}\n");
+#endif
 }
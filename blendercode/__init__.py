@@ -0,0 +1,240 @@
+import logging
+import os
+import sys
+import time
+
+import bpy
+
+# the Joint Stream add-on: drives an armature from the joint sensors like mainapp.py / maincloud.py,
+# with a transport selector in View3D > Sidebar > Joints. enabling it imports only bpy; NumPy, the
+# pipeline and the selected transport (pyserial, the Azure SDK, a recorded session or the shared
+# memory of a running jointreceiver.py) load when Start is pressed, and connecting happens on a
+# background thread (see jointsession.py). install by zipping this folder and picking the zip in
+# Edit > Preferences > Add-ons > Install.
+
+bl_info = {
+    "name": "Joint Stream",
+    "author": "techin515project",
+    "version": (1, 0, 0),
+    "blender": (3, 6, 0),
+    "location": "View3D > Sidebar > Joints",
+    "description": "Drive an armature from serial, Event Hub, replayed or shared-memory joint streams",
+    "category": "Animation",
+}
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+STATUS_INTERVAL = 1.0   # seconds between status bar / panel refreshes while running
+
+TRANSPORT_ITEMS = [
+    ("serial", "Serial", "MCUs on serial ports (pyserial)"),
+    ("cloud", "Event Hub", "IoT Hub events routed to an Event Hub (azure-eventhub)"),
+    ("replay", "Replay", "a session recorded with a record folder, looped"),
+    ("shared", "Receiver", "shared memory of a running jointreceiver.py"),
+]
+
+# keys of skeleton.SKELETONS, listed here so the enum needs no NumPy at registration
+SKELETON_ITEMS = [
+    ("right_arm", "Right arm", "VRM right upper and lower arm"),
+    ("arms", "Arms", "VRM upper and lower arms"),
+    ("full_body", "Full body", "VRM hips to feet, 17 joints"),
+]
+
+logger = logging.getLogger("JointStream")
+
+# the running jointsession.JointSession, None while stopped
+active_session = None
+
+
+def source_options(settings):
+    if settings.transport == "serial":
+        return {"ports": settings.ports.split(),
+                "imu_keys": dict(imu.split("=", 1) for imu in settings.imu_ports.split()),
+                "baudrate": settings.baudrate}
+    if settings.transport == "cloud":
+        return {"connection_str": settings.connection_str, "eventhub": settings.eventhub}
+    if settings.transport == "replay":
+        return {"session": bpy.path.abspath(settings.session_dir), "speed": settings.replay_speed}
+    return {}
+
+
+def stop_session():
+    global active_session
+    session, active_session = active_session, None
+    if session is not None:
+        session.stop()
+
+
+def is_armature(self, obj):
+    return obj.type == "ARMATURE"
+
+
+class JointStreamSettings(bpy.types.PropertyGroup):
+    transport: bpy.props.EnumProperty(name="Transport", items=TRANSPORT_ITEMS, default="serial")
+    ports: bpy.props.StringProperty(name="Ports", default="COM7 COM9",
+                                    description="Serial ports of the joint MCUs, separated by spaces")
+    imu_ports: bpy.props.StringProperty(name="IMU ports", default="",
+                                        description="Raw 9-axis boards as PORT=/joint/N, separated by spaces")
+    baudrate: bpy.props.IntProperty(name="Baud rate", default=115200, min=1200)
+    connection_str: bpy.props.StringProperty(name="Connection string", subtype="PASSWORD")
+    eventhub: bpy.props.StringProperty(name="Event Hub")
+    session_dir: bpy.props.StringProperty(name="Session", subtype="DIR_PATH")
+    replay_speed: bpy.props.FloatProperty(name="Speed", default=1.0, min=0.01, max=100.0)
+    shared_memory_name: bpy.props.StringProperty(name="Name", default="blender_joints",
+                                                 description="--name of the running jointreceiver.py")
+    skeleton: bpy.props.EnumProperty(name="Skeleton", items=SKELETON_ITEMS, default="arms")
+    armature: bpy.props.PointerProperty(name="Armature", type=bpy.types.Object, poll=is_armature)
+    joint_filter: bpy.props.BoolProperty(name="Smooth joints", default=True,
+                                         description="Smooth and extrapolate joints between samples")
+    filter_lead: bpy.props.FloatProperty(name="Lead", default=0.0, min=0.0, max=0.5,
+                                         description="Seconds to predict ahead for a known transport latency")
+    max_fps: bpy.props.IntProperty(name="Max FPS", default=60, min=1, max=240)
+    record_dir: bpy.props.StringProperty(name="Record to", subtype="DIR_PATH",
+                                         description="New or empty folder to record every joint sample to (blank: off)")
+
+
+class JOINTS_OT_start(bpy.types.Operator):
+    bl_idname = "joints.start"
+    bl_label = "Start Joint Stream"
+    bl_description = "Connect the selected transport and drive the armature"
+
+    _timer = None
+    _status_shown = 0.0
+
+    @classmethod
+    def poll(cls, context):
+        return active_session is None
+
+    def execute(self, context):
+        global active_session
+        started = time.perf_counter()
+        settings = context.scene.joint_stream
+        armature = settings.armature or bpy.data.objects.get("Armature")
+        if armature is None or armature.type != "ARMATURE":
+            self.report({"ERROR"}, "Pick an armature.")
+            return {"CANCELLED"}
+
+        # NumPy and the pipeline load on the first Start, the transport itself on the session's thread
+        from jointsession import JointSession
+        from skeleton import SKELETONS
+        try:
+            session = JointSession(armature, SKELETONS[settings.skeleton], settings.transport,
+                                   source_options(settings), joint_filter=settings.joint_filter,
+                                   filter_lead=settings.filter_lead, max_fps=settings.max_fps,
+                                   record_dir=bpy.path.abspath(settings.record_dir) if settings.record_dir else None,
+                                   shared_memory_name=settings.shared_memory_name)
+        except ValueError as error:
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
+        session.start()
+        active_session = session
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(session.pacer.interval, window=context.window)
+        wm.modal_handler_add(self)
+        logger.info("Started %s in %.1f ms.", settings.transport, (time.perf_counter() - started) * 1e3)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        session = active_session
+        if session is None:
+            # Stop was pressed
+            return self.finish(context)
+        if event.type == "ESC":
+            stop_session()
+            return self.finish(context)
+
+        if event.type == "TIMER":
+            interval = session.frame()
+            now = time.monotonic()
+            if now - self._status_shown >= STATUS_INTERVAL:
+                self._status_shown = now
+                context.workspace.status_text_set("Joints: " + session.status())
+                for area in context.screen.areas:
+                    if area.type == "VIEW_3D":
+                        area.tag_redraw()
+            if interval is not None:
+                context.window_manager.event_timer_remove(self._timer)
+                self._timer = context.window_manager.event_timer_add(interval, window=context.window)
+
+        return {"PASS_THROUGH"}
+
+    def finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+        return {"CANCELLED"}
+
+
+class JOINTS_OT_stop(bpy.types.Operator):
+    bl_idname = "joints.stop"
+    bl_label = "Stop Joint Stream"
+    bl_description = "Disconnect and put the armature back in its rest pose"
+
+    @classmethod
+    def poll(cls, context):
+        return active_session is not None
+
+    def execute(self, context):
+        stop_session()
+        return {"FINISHED"}
+
+
+class JOINTS_PT_panel(bpy.types.Panel):
+    bl_label = "Joint Stream"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Joints"
+
+    def draw(self, context):
+        settings = context.scene.joint_stream
+        layout = self.layout
+        column = layout.column()
+        column.enabled = active_session is None
+        column.prop(settings, "transport")
+        if settings.transport == "serial":
+            column.prop(settings, "ports")
+            column.prop(settings, "imu_ports")
+            column.prop(settings, "baudrate")
+        elif settings.transport == "cloud":
+            column.prop(settings, "connection_str")
+            column.prop(settings, "eventhub")
+        elif settings.transport == "replay":
+            column.prop(settings, "session_dir")
+            column.prop(settings, "replay_speed")
+        else:
+            column.prop(settings, "shared_memory_name")
+        column.separator()
+        column.prop(settings, "armature")
+        column.prop(settings, "skeleton")
+        column.prop(settings, "joint_filter")
+        if settings.joint_filter:
+            column.prop(settings, "filter_lead")
+        column.prop(settings, "max_fps")
+        if settings.transport != "shared":
+            column.prop(settings, "record_dir")
+
+        if active_session is None:
+            layout.operator(JOINTS_OT_start.bl_idname, icon="PLAY")
+        else:
+            layout.operator(JOINTS_OT_stop.bl_idname, icon="PAUSE")
+            layout.label(text=active_session.status())
+
+
+classes = (JointStreamSettings, JOINTS_OT_start, JOINTS_OT_stop, JOINTS_PT_panel)
+
+
+def register():
+    started = time.perf_counter()
+    # the pipeline modules sit next to this file and import each other by module name
+    if ADDON_DIR not in sys.path:
+        sys.path.append(ADDON_DIR)
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.joint_stream = bpy.props.PointerProperty(type=JointStreamSettings)
+    logger.info("Registered in %.1f ms.", (time.perf_counter() - started) * 1e3)
+
+
+def unregister():
+    stop_session()
+    del bpy.types.Scene.joint_stream
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
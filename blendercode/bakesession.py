@@ -0,0 +1,77 @@
+import sys
+import os
+import logging
+import math
+import time
+
+import bpy
+
+sys.path.append(os.path.join(bpy.path.abspath("//"), "scripts"))
+
+from recorder import SessionReader
+from sessionbake import bake, write_action
+from skeleton import Skeleton, VRM_ARMS
+
+# a session recorded by mainapp.py / maincloud.py (RECORD_SESSION_DIR)
+SESSION_DIR = bpy.path.abspath("//sessions/arm01")
+
+# must match the skeleton the session was recorded for (see skeleton.py)
+SKELETON = VRM_ARMS
+
+# keyframe decimation tolerance in degrees; None keys every frame
+DECIMATE_DEGREES = 0.5
+
+# baked into a new action named after the session folder, starting at this frame
+FRAME_START = 1
+
+
+# set up logging
+logger = logging.getLogger("BlenderLogger")
+logger.setLevel(logging.DEBUG)
+
+if not logger.handlers:
+    stream_handler = logging.StreamHandler()
+    stream_handler.setStream(sys.stdout)
+    stream_handler.setLevel(logging.DEBUG)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s]: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(stream_handler)
+
+
+class BakeSessionOperator(bpy.types.Operator):
+    # we need these two fields for Blender
+    bl_idname = "wm.bake_joint_session"
+    bl_label = "Bake Joint Session"
+
+    def execute(self, context):
+        started = time.perf_counter()
+        scene = context.scene
+        armature = bpy.data.objects["Armature"]
+        skeleton = Skeleton(SKELETON)
+        reader = SessionReader(SESSION_DIR)
+        if not len(reader):
+            self.report({"WARNING"}, "Session is empty.")
+            return {"CANCELLED"}
+
+        fps = scene.render.fps / scene.render.fps_base
+        tolerance = None if DECIMATE_DEGREES is None else math.radians(DECIMATE_DEGREES)
+        _, rotations, keep = bake(reader, skeleton, fps, tolerance)
+        solved = time.perf_counter()
+
+        action = bpy.data.actions.new(os.path.basename(os.path.normpath(SESSION_DIR)))
+        if armature.animation_data is None:
+            armature.animation_data_create()
+        armature.animation_data.action = action
+        for bone in skeleton.bones:
+            armature.pose.bones[bone].rotation_mode = "QUATERNION"
+        keys = write_action(action, skeleton.bones, rotations, keep, FRAME_START)
+
+        scene.frame_start = FRAME_START
+        scene.frame_end = FRAME_START + len(rotations) - 1
+        logger.info("Baked %d samples into %d frames (%d keyframes) of %s in %.2f s (%.2f s solving).",
+                    len(reader), len(rotations), keys, action.name, time.perf_counter() - started, solved - started)
+        return {"FINISHED"}
+
+
+if __name__ == "__main__":
+    bpy.utils.register_class(BakeSessionOperator)
+    bpy.ops.wm.bake_joint_session()
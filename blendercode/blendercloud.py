@@ -1,12 +1,23 @@
 import sys  # Ensure the sys module is imported
-import json
 import logging
+import multiprocessing
+import queue
 import threading
 import time
-from azure.eventhub import EventHubConsumerClient
+import traceback
+
+from jointstore import JointStore
+from pipelinestats import pipeline_stats
+from telemetry import decode_bodies
 
 CONNECTION_STR = "key"
 EVENTHUB_NAME = "name"
+MAX_BATCH_SIZE = 300    # events handed to on_event_batch at most per call
+MAX_WAIT_TIME = 0.05    # seconds to wait for a batch to fill before delivering what arrived
+CHECKPOINT_INTERVAL = 5.0   # seconds between checkpoints per partition (plus one on stop)
+MAX_PENDING_BATCHES = 64    # batches queued per pool worker before the receive callback blocks
+POOL_POLL_INTERVAL = 5.0    # seconds between pool worker liveness checks (and blocked put retries)
+POOL_STOP_TIMEOUT = 30.0    # seconds close() waits for a worker to drain its queue before terminating it
 
 # Set up logging
 logger = logging.getLogger("EventHubReceiver")
@@ -20,53 +31,332 @@ if not logger.handlers:
     ch.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s]: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
     logger.addHandler(ch)
 
-# Global dictionary to store the data
-data_table = {}
+# Global store for the latest joint values (other keys, e.g. BPM, land in joint_store.extras)
+joint_store = JointStore()
+
+
+def create_consumer_client(connection_str, eventhub_name, consumer_group="$Default", checkpoint_store=None):
+    # the Azure SDK is only imported when a real hub is used; tests and benchmarks pass a
+    # localhub.LocalConsumerClient (or anything with the same receive/receive_batch/close) instead
+    from azure.eventhub import EventHubConsumerClient
+    return EventHubConsumerClient.from_connection_string(
+        conn_str=connection_str,
+        consumer_group=consumer_group,
+        eventhub_name=eventhub_name,
+        checkpoint_store=checkpoint_store,
+    )
+
+
+def event_source(event):
+    # IoT Hub stamps the sending device on every routed event
+    device = (event.system_properties or {}).get(b"iothub-connection-device-id")
+    return device.decode() if isinstance(device, bytes) else device
+
+
+def decode_events(events, sinks, timestamp):
+    # [(source, body), ...] -> ({key: latest value}, error lines); every sample goes to the sinks
+    bodies_by_source = {}
+    for source, body in events:
+        bodies_by_source.setdefault(source, []).append(body)
+
+    latest = {}
+    all_errors = []
+    for source, bodies in bodies_by_source.items():
+        records, errors = decode_bodies(bodies)
+        all_errors.extend(errors)
+        for key, value in records:
+            latest[key] = value
+            for sink in sinks:
+                sink.push(key, value, timestamp, source)
+    return latest, all_errors
+
+
+def partition_worker(tasks, results, sink_factory):
+    # runs in a pool process: decodes batches and feeds this process's own sinks. failures are sent
+    # back as results (batch id None: the sinks could not be built), so the receiver logs them
+    # rather than waiting for a batch that never comes
+    try:
+        sinks = sink_factory() if sink_factory is not None else []
+    except Exception:
+        results.put((None, None, None, traceback.format_exc()))
+        return
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        batch_id, events = task
+        try:
+            latest, errors = decode_events(events, sinks, time.monotonic())
+        except Exception:
+            results.put((batch_id, {}, [], traceback.format_exc()))
+            continue
+        results.put((batch_id, latest, errors, None))
+    for sink in sinks:
+        close = getattr(sink, "close", None) or getattr(sink, "flush", None)
+        if close is not None:
+            close()
+
+
+class PartitionPool:
+    # fans batches out to worker processes so decoding and per-sample sinks use more than one core.
+    # a partition always goes to the same worker, so its samples stay in order and its sink state
+    # (windows, rep counters) lives in one place. sink_factory must be a module-level function
+    # returning the worker's sinks; only the latest value per key comes back for the receiver's store.
+    def __init__(self, processes=2, sink_factory=None):
+        context = multiprocessing.get_context("spawn")
+        self.tasks = [context.Queue(maxsize=MAX_PENDING_BATCHES) for _ in range(processes)]
+        self.results = context.Queue()
+        self.workers = [context.Process(target=partition_worker, args=(tasks, self.results, sink_factory), daemon=True)
+                        for tasks in self.tasks]
+        self.pending = {}
+        self.next_batch = 0
+        # the SDK calls submit() from its one receive thread, and collect() runs on its own
+        self.submit_lock = threading.Lock()
+        self.receiver = None
+        self.collector = None
+        self.failure = None     # why the pool stopped working, once it has
+        self.closing = False
+
+    def start(self, receiver):
+        self.receiver = receiver
+        for worker in self.workers:
+            worker.start()
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+
+    def submit(self, partition_context, events):
+        with self.submit_lock:
+            batch_id = self.next_batch
+            self.next_batch += 1
+            self.pending[batch_id] = (partition_context, events[-1], time.monotonic())
+        # Event Hubs partition ids are "0" .. "N-1"
+        tasks = self.tasks[int(partition_context.partition_id) % len(self.tasks)]
+        bodies = [(event_source(event), event.body_as_str()) for event in events]
+        self.receiver.stats.count("cloud.bytes", sum(len(body) for _, body in bodies))
+        # blocks when that worker is behind, which holds back the consumer instead of growing memory,
+        # but gives up once the pool has failed: a dead worker never frees its queue
+        while True:
+            if self.failure is not None:
+                raise RuntimeError(f"partition pool failed: {self.failure}")
+            try:
+                tasks.put((batch_id, bodies), timeout=POOL_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def collect(self):
+        next_check = time.monotonic() + POOL_POLL_INTERVAL
+        while True:
+            try:
+                result = self.results.get(timeout=POOL_POLL_INTERVAL)
+            except queue.Empty:
+                result = ()
+            if result is None:
+                break
+            now = time.monotonic()
+            if now >= next_check:
+                next_check = now + POOL_POLL_INTERVAL
+                self.check_workers()
+            if result:
+                self.finish(*result)
+
+    def finish(self, batch_id, latest, errors, failure):
+        if batch_id is None:
+            self.fail(f"a pool worker could not create its sinks:\n{failure}")
+            return
+        partition_context, last_event, submitted = self.pending.pop(batch_id)
+        # queued and decoded in a worker; its sinks' own stats stay in that process
+        self.receiver.stats.latency("cloud.decode", time.monotonic() - submitted)
+        if failure is not None:
+            # skipped and still checkpointed, so one bad batch is not replayed forever
+            self.receiver.stats.count("cloud.pool_errors")
+            logger.error("Batch %d failed in a pool worker and was skipped:\n%s", batch_id, failure)
+            latest, errors = {}, []
+        # checkpoint only once the batch has been processed, so a crash replays rather than drops it
+        self.receiver.apply(partition_context, last_event, latest, errors)
+
+    def check_workers(self):
+        if self.closing:
+            return
+        for worker in self.workers:
+            if not worker.is_alive():
+                self.fail(f"pool worker {worker.name} exited with code {worker.exitcode}")
+                return
+
+    def fail(self, message):
+        # stops receiving: the dead worker's partitions would otherwise stall without a word
+        if self.failure is not None:
+            return
+        self.failure = message
+        logger.error("Partition pool failed, stopping the receiver: %s", message)
+        self.receiver.stop()
+
+    def close(self):
+        self.closing = True
+        for tasks in self.tasks:
+            try:
+                tasks.put(None, timeout=POOL_POLL_INTERVAL)
+            except queue.Full:
+                pass    # a worker that is gone or stuck; terminated below
+        for worker, tasks in zip(self.workers, self.tasks):
+            worker.join(POOL_STOP_TIMEOUT)
+            if worker.is_alive():
+                logger.error("Pool worker %s did not stop within %.0f s, terminating it.", worker.name,
+                             POOL_STOP_TIMEOUT)
+                worker.terminate()
+                worker.join()
+            # nothing reads its queue any more, so exit must not wait on flushing it
+            tasks.cancel_join_thread()
+        self.results.put(None)
+        self.collector.join(POOL_STOP_TIMEOUT)
+
 
 class EventHubReceiver:
-    def __init__(self, connection_str, eventhub_name):
+    def __init__(self, connection_str, eventhub_name, sinks=(), consumer_client=None, store=None,
+                 checkpoint_store=None, starting_position="@latest", partition_pool=None, stats=None):
         self.connection_str = connection_str
         self.eventhub_name = eventhub_name
-        self.consumer_client = EventHubConsumerClient.from_connection_string(
-            conn_str=self.connection_str,
-            consumer_group="$Default",
-            eventhub_name=self.eventhub_name,
-        )
+        if consumer_client is None:
+            consumer_client = create_consumer_client(connection_str, eventhub_name, checkpoint_store=checkpoint_store)
+        self.consumer_client = consumer_client
+        self.store = store if store is not None else joint_store
         self.stop_sig = threading.Event()
         self.stop_sig.clear()
+        # sinks see every sample (not just the latest): push(key, value, timestamp, source).
+        # with a partition_pool they run in the pool's processes instead (see PartitionPool).
+        # the sync SDK calls on_event_batch from a single thread that walks its partitions in turn
+        # (EventProcessor.start in azure-eventhub 5.x; load balancing runs on a second thread but
+        # never calls back with events), so sinks get one batch at a time. they still lock, as the
+        # apps read them from other threads
+        self.sinks = list(sinks)
+        # with a checkpoint store, partitions resume from their checkpoint and this is only
+        # used for partitions that have none yet ("@latest", "-1" for the beginning, ...)
+        self.starting_position = starting_position
+        self.partition_pool = partition_pool
+        # event/byte counters, transport, decode and store latencies (see pipelinestats)
+        self.stats = stats if stats is not None else pipeline_stats
+        self.checkpoint_lock = threading.Lock()
+        self.checkpoints = {}   # partition_id -> [context, last processed event, last checkpoint time, written]
 
     def on_event(self, partition_context, event):
-        data = event.body_as_str()
-        
-        # Preprocess the data to handle escaped quotes
-        data = data.replace('\\"', '"')
-
-        # Split the data into separate lines
-        lines = data.strip().split('\n')
-        for line in lines:
-            try:
-                item = json.loads(line)
-                key = item.get("key")
-                value = item.get("value")
-                if not key:
-                    logger.warning("packet format error.")
+        self.on_event_batch(partition_context, [event])
+
+    def on_event_batch(self, partition_context, events):
+        if not events:
+            return
+        self.count_events(events)
+        if self.partition_pool is not None:
+            self.partition_pool.submit(partition_context, events)
+            return
+
+        timestamp = time.monotonic()
+        bodies_by_source = {}
+        size = 0
+        for event in events:
+            body = event.body_as_str()
+            size += len(body)
+            bodies_by_source.setdefault(event_source(event), []).append(body)
+        self.stats.count("cloud.bytes", size)
+
+        decoded = []
+        for source, bodies in bodies_by_source.items():
+            records, errors = decode_bodies(bodies)
+            if errors:
+                self.stats.count("cloud.parse_errors", len(errors))
+            for line in errors:
+                logger.warning("packet format error: %s", line)
+            decoded.append((source, records))
+        decoded_at = time.monotonic()
+        self.stats.latency("cloud.decode", decoded_at - timestamp)
+
+        updated = 0
+        for source, records in decoded:
+            for key, value in records:
+                try:
+                    self.store.update(key, value, timestamp)
+                except (ValueError, TypeError):
+                    logger.warning("packet format error: %s", key)
                     continue
+                for sink in self.sinks:
+                    sink.push(key, value, timestamp, source)
+            updated += len(records)
+        self.stats.count("cloud.samples", updated)
+        self.stats.latency("cloud.store", time.monotonic() - decoded_at)
+
+        logger.info("Updated %d values from %d events", updated, len(events))
+        self.checkpoint(partition_context, events[-1])
+
+    def count_events(self, events):
+        self.stats.count("cloud.events", len(events))
+        # IoT Hub -> Event Hub -> here, for the newest event of the batch. enqueued_time is the
+        # service's clock, so this includes any skew of the local clock against it
+        enqueued_time = getattr(events[-1], "enqueued_time", None)
+        if enqueued_time is not None:
+            self.stats.latency("cloud.transport", max(time.time() - enqueued_time.timestamp(), 0.0))
+
+    def apply(self, partition_context, last_event, latest, errors):
+        # results of a batch decoded by the partition pool
+        if errors:
+            self.stats.count("cloud.parse_errors", len(errors))
+        for line in errors:
+            logger.warning("packet format error: %s", line)
+        timestamp = time.monotonic()
+        for key, value in latest.items():
+            try:
+                self.store.update(key, value, timestamp)
+            except (ValueError, TypeError):
+                logger.warning("packet format error: %s", key)
+        self.stats.count("cloud.samples", len(latest))
+        self.stats.latency("cloud.store", time.monotonic() - timestamp)
+        self.checkpoint(partition_context, last_event)
+
+    def checkpoint(self, partition_context, event, force=False):
+        # at most one checkpoint write per partition every CHECKPOINT_INTERVAL seconds
+        now = time.monotonic()
+        with self.checkpoint_lock:
+            state = self.checkpoints.get(partition_context.partition_id)
+            if state is None:
+                state = self.checkpoints[partition_context.partition_id] = [partition_context, event, now, True]
+            state[0], state[1] = partition_context, event
+            if not force and now - state[2] < CHECKPOINT_INTERVAL:
+                state[3] = False
+                return
+            state[2], state[3] = now, True
+        partition_context.update_checkpoint(event)
 
-                global data_table
-                data_table[key] = value
-                logger.info(f"Updated data_table: {data_table}")
-            except json.decoder.JSONDecodeError:
-                logger.warning(f"packet format error: {line}")
+    def flush_checkpoints(self):
+        with self.checkpoint_lock:
+            unwritten = [(context, event) for context, event, _, written in self.checkpoints.values() if not written]
+        for partition_context, event in unwritten:
+            self.checkpoint(partition_context, event, force=True)
 
-    def start(self):
-        with self.consumer_client:
-            self.consumer_client.receive(
-                on_event=self.on_event,
-                starting_position="@latest",  # "@latest" is from the latest position.
-            )
+    def start(self, batch=True):
+        if self.partition_pool is not None:
+            self.partition_pool.start(self)
+        try:
+            with self.consumer_client:
+                if batch:
+                    self.consumer_client.receive_batch(
+                        on_event_batch=self.on_event_batch,
+                        max_batch_size=MAX_BATCH_SIZE,
+                        max_wait_time=MAX_WAIT_TIME,
+                        starting_position=self.starting_position,
+                    )
+                else:
+                    self.consumer_client.receive(
+                        on_event=self.on_event,
+                        starting_position=self.starting_position,
+                    )
+        finally:
+            # let the pool finish what it was handed, then record how far every partition got
+            if self.partition_pool is not None:
+                self.partition_pool.close()
+            self.flush_checkpoints()
 
     def stop(self):
         self.stop_sig.set()
+        # closing the client makes receive()/receive_batch() return
+        self.consumer_client.close()
         logger.info("Stopped.")
 
     def startThreaded(self):
@@ -74,8 +364,7 @@ class EventHubReceiver:
         self.t.start()
 
     def get(self, key):
-        global data_table
-        return data_table.get(key)
+        return self.store.get(key)
 
 if __name__ == "__main__":
     try:
@@ -1,31 +1,218 @@
 import serial
-import json
+import selectors
 import threading
 import time
 import logging
 
+import numpy as np
+
+from imufusion import ImuFusion, RAW_COLUMNS
+from jointstore import JointStore
+from pipelinestats import pipeline_stats
+from telemetry import decode_lines
+
+READ_TIMEOUT = 0.1      # seconds a read may block, so stop() is honoured promptly
+MAX_LINE_LENGTH = 4096  # drop unterminated garbage (e.g. calibration dump) beyond this
+POLL_INTERVAL = 0.002   # PortManager idle sleep where ports cannot be select()ed (Windows COM ports)
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 10.0
+
+# binary joint frame (see joint01.ino, BINARY_FRAMES), 13 bytes little-endian:
+#   sync 0xA5 0x5A | joint id u8 | sequence u8 | w x y z int16 (Q14) | CRC-8 (poly 0x07) over id..z
+# the sync bytes are never valid in the ASCII JSON lines, so both formats can share a port.
+FRAME_SYNC = b"\xa5\x5a"
+FRAME_DTYPE = np.dtype([("sync", "u1", (2,)), ("joint", "u1"), ("sequence", "u1"), ("quat", "<i2", (4,)), ("crc", "u1")])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+QUAT_SCALE = 1.0 / 16384
+
+
+def _crc8_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & 0x80 else (crc << 1)
+        table[byte] = crc & 0xFF
+    return table
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(rows):
+    # CRC-8 of every row of a (N, k) uint8 array, one table lookup per column for all rows at once
+    crc = np.zeros(len(rows), dtype=np.uint8)
+    for column in range(rows.shape[1]):
+        crc = CRC8_TABLE[crc ^ rows[:, column]]
+    return crc
+
+
+def encode_frames(joints, sequences, quats):
+    # inverse of decode_frames; used by fake MCUs and tools
+    frames = np.zeros(len(joints), dtype=FRAME_DTYPE)
+    frames["sync"] = np.frombuffer(FRAME_SYNC, dtype=np.uint8)
+    frames["joint"] = joints
+    frames["sequence"] = np.asarray(sequences) & 0xFF
+    frames["quat"] = np.clip(np.round(np.asarray(quats) / QUAT_SCALE), -32768, 32767)
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames["crc"] = crc8(raw[:, 2:FRAME_SIZE - 1])
+    return frames.tobytes()
+
+
+def decode_frames(data):
+    # bytes holding whole frames -> (valid frames, number rejected by CRC)
+    frames = np.frombuffer(data, dtype=FRAME_DTYPE)
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    valid = crc8(raw[:, 2:FRAME_SIZE - 1]) == frames["crc"]
+    return frames[valid], int(len(frames) - valid.sum())
+
+
+def decode_raw_imu(lines):
+    # splits out 9axisdata.ino lines (`ax\tay\taz\tgx\tgy\tgz\tmx\tmy\tmz`) from the JSON ones;
+    # returns ((n, 9) float array, other lines). the firmware sends accel in milli-g, gyro in deg/s
+    # and mag in milligauss; ImuFusion only needs the gyro unit, accel and mag are normalized
+    raw = []
+    other = []
+    for line in lines:
+        (raw if line.count(b"\t") == RAW_COLUMNS - 1 else other).append(line)
+    if not raw:
+        return np.empty((0, RAW_COLUMNS)), other
+    try:
+        # one split and one conversion for the whole batch
+        samples = np.array(b"\t".join(line.strip() for line in raw).split(b"\t")).astype(np.float64)
+    except ValueError:
+        samples = np.array([row for row in (_parse_raw(line) for line in raw) if row is not None])
+    return samples.reshape(-1, RAW_COLUMNS), other
+
+
+def _parse_raw(line):
+    try:
+        return [float(field) for field in line.split(b"\t")]
+    except ValueError:
+        return None
+
+
+class LineFramer:
+    # splits a serial byte stream into complete lines, keeping the partial tail between reads
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        self.buffer = bytearray()
+        self.max_line_length = max_line_length
+
+    def feed(self, data):
+        self.buffer += data
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            if len(self.buffer) > self.max_line_length:
+                self.buffer.clear()
+            return []
+
+        lines = self.buffer[:end].split(b"\n")
+        del self.buffer[:end + 1]
+        return lines
+
+    def reset(self):
+        self.buffer.clear()
+
+
+class PacketFramer(LineFramer):
+    # like LineFramer, but also cuts runs of binary joint frames out of the stream.
+    # feed() returns (lines, frame_bytes): text lines, and whole frames concatenated
+    def feed(self, data):
+        self.buffer += data
+        buffer = self.buffer
+        lines = []
+        frames = []
+        position = 0
+
+        while True:
+            sync = buffer.find(FRAME_SYNC, position)
+            text_end = len(buffer) if sync < 0 else sync
+            newline = buffer.rfind(b"\n", position, text_end)
+            if newline >= 0:
+                lines.extend(buffer[position:newline].split(b"\n"))
+            if sync < 0:
+                position = newline + 1 if newline >= 0 else position
+                break
+
+            # text cut off by a frame is noise; jump to the frame
+            count = (len(buffer) - sync) // FRAME_SIZE
+            if count == 0:
+                position = sync
+                break
+
+            # take the whole run of back-to-back frames in one slice
+            block = np.frombuffer(bytes(buffer[sync:sync + count * FRAME_SIZE]), dtype=np.uint8).reshape(count, FRAME_SIZE)
+            in_sync = (block[:, 0] == FRAME_SYNC[0]) & (block[:, 1] == FRAME_SYNC[1])
+            run = count if in_sync.all() else int(np.argmin(in_sync))
+            frames.append(block[:run].tobytes())
+            position = sync + run * FRAME_SIZE
+
+        del buffer[:position]
+        if len(buffer) > self.max_line_length and buffer.find(FRAME_SYNC) < 0:
+            buffer.clear()
+        return lines, b"".join(frames)
+
+
 class UARTCommunicator:
-    def __init__(self, port, baudrate=115200, logging_level=None):
+    # imu_key names the joint a raw 9-axis board on this port drives (e.g. "/joint/0"); its samples
+    # are fused by `imu`, shared between ports by PortManager or owned by this communicator.
+    # byte/line/frame counters and decode/store latencies go to `stats` (pipelinestats)
+    def __init__(self, port, baudrate=115200, logging_level=None, store=None, auto_connect=True, sinks=(),
+                 imu_key=None, imu=None, stats=None):
         self.serial_connection = None
         self.port = port
         self.baudrate = baudrate
-        self.data_table = {}
+        # several communicators may share one store so the render loop reads every joint at once
+        self.store = store if store is not None else JointStore()
+        # sinks see every sample (not just the latest): push(key, value, timestamp, source)
+        self.sinks = list(sinks)
+        self.framer = PacketFramer()
+        self.crc_errors = 0
+        self.dropped_frames = 0
+        self.duplicate_frames = 0
+        self.last_sequence = {}
+        self.imu_key = imu_key
+        self.owns_imu = imu_key is not None and imu is None
+        self.imu = ImuFusion() if self.owns_imu else imu
+        self.stats = stats if stats is not None else pipeline_stats
+        # resolved once: one append per chunk read, see pipelinestats.chunk_recorder
+        self.record_chunk = self.stats.chunk_recorder("serial")
+        # what the chunk being handled held, filled in by handle_lines / handle_frames
+        self.received = None    # time.monotonic() it was read
+        self.decoded = None     # time.monotonic() its first samples were decoded
+        self.lines = 0
+        self.frames = 0
+        self.samples = 0
         self.stop_signal = threading.Event()
         self.logger = logging.getLogger("UARTComm")
         if logging_level:
             self.logger.setLevel(logging_level)
-        self.connect()
+        if auto_connect:
+            self.connect()
 
     def connect(self):
-        while True:
-            try:
-                self.serial_connection = serial.Serial(self.port, self.baudrate)
-                if self.serial_connection.is_open:
-                    break
-            except serial.SerialException:
-                time.sleep(1)
-                continue
-        self.logger.info("Connected.")
+        while not self.stop_signal.is_set():
+            if self.try_connect():
+                return
+            time.sleep(1)
+
+    def try_connect(self):
+        # a single, non-blocking connection attempt
+        try:
+            self.serial_connection = serial.Serial(self.port, self.baudrate, timeout=READ_TIMEOUT)
+        except serial.SerialException:
+            return False
+        if not self.serial_connection.is_open:
+            return False
+        self.framer.reset()
+        self.last_sequence.clear()
+        self.logger.info("Connected to %s.", self.port)
+        return True
+
+    def disconnect(self):
+        if self.serial_connection:
+            self.serial_connection.close()
+        self.serial_connection = None
 
     def stop(self):
         self.stop_signal.set()
@@ -43,57 +230,264 @@ class UARTCommunicator:
         self.thread.start()
 
     def get(self, key):
-        return self.data_table.get(key)
+        return self.store.get(key)
 
-    def receive_packet(self):
-        while True:
-            if self.stop_signal.is_set():
-                return
+    def read_chunk(self):
+        # block for at least one byte (up to READ_TIMEOUT), then drain whatever the driver holds
+        return self.serial_connection.read(max(1, self.serial_connection.in_waiting))
 
-            char = b""
-            buffer = b""
-            while char != b"\n":
+    def receive_packet(self):
+        while not self.stop_signal.is_set():
+            try:
+                chunk = self.read_chunk()
+            except (AttributeError, TypeError, OSError, serial.serialutil.SerialException) as e:
                 if self.stop_signal.is_set():
                     return
-                buffer += char
-                try:
-                    char = self.serial_connection.read()
-                except (AttributeError, TypeError, serial.serialutil.SerialException) as e:
-                    print(e)
-                    self.connect()
-                    continue
-
-            data = buffer.decode()
-            try:
-                data = json.loads(data)
-            except json.decoder.JSONDecodeError:
-                self.logger.warning("Packet format error.")
+                self.logger.warning(e)
+                self.connect()
                 continue
 
-            key = data.get("key")
-            if not key:
-                self.logger.warning("Packet format error.")
+            self.handle_chunk(chunk)
+
+    def handle_chunk(self, chunk):
+        self.received = time.monotonic()
+        self.decoded = None
+        self.lines = self.frames = self.samples = 0
+        lines, frames = self.framer.feed(chunk)
+        if lines:
+            self.handle_lines(lines)
+        if frames:
+            self.handle_frames(frames)
+        # counters plus read -> decoded and decoded -> in the store, as one entry per chunk
+        self.record_chunk((len(chunk), self.lines, self.frames, self.samples, self.received,
+                           self.decoded or self.received, time.monotonic()))
+        if self.owns_imu:
+            self.fuse()
+
+    def fuse(self):
+        fused = self.imu.update()
+        for key, quat, timestamp in fused:
+            self.publish(key, quat, timestamp)
+        if fused:
+            # read -> fused orientation in the store
+            self.stats.latency("serial.fuse", time.monotonic() - min(timestamp for _, _, timestamp in fused))
+
+    def publish(self, key, value, timestamp):
+        try:
+            self.store.update(key, value, timestamp)
+        except (ValueError, TypeError):
+            self.logger.warning("Packet format error.")
+            return
+        for sink in self.sinks:
+            sink.push(key, value, timestamp, self.port)
+
+    def handle_lines(self, lines):
+        self.lines += len(lines)
+        if self.imu_key is not None:
+            samples, lines = decode_raw_imu(lines)
+            if len(samples):
+                self.imu.add(self.imu_key, samples, time.monotonic())
+        records, errors = decode_lines(lines)
+        if errors:
+            self.stats.count("serial.parse_errors", len(errors))
+            self.logger.warning("Packet format error.")
+
+        timestamp = time.monotonic()
+        for key, value in records:
+            self.publish(key, value, timestamp)
+        self.decoded_samples(timestamp, len(records))
+
+    def decoded_samples(self, timestamp, samples):
+        if samples:
+            self.samples += samples
+            if self.decoded is None:
+                self.decoded = timestamp
+
+    def handle_frames(self, data):
+        frames, crc_errors = decode_frames(data)
+        self.frames += len(frames) + crc_errors
+        if crc_errors:
+            self.crc_errors += crc_errors
+            self.stats.count("serial.crc_errors", crc_errors)
+            self.logger.warning("%d frames failed CRC.", crc_errors)
+        if not len(frames):
+            return
+
+        timestamp = time.monotonic()
+        duplicates = None
+        for joint in np.unique(frames["joint"]):
+            rows = np.flatnonzero(frames["joint"] == joint)
+            sequences = frames["sequence"][rows].astype(np.int64)
+
+            # the u8 sequence counter wraps: a step of 0 is the previous frame sent again, each
+            # step beyond 1 a frame lost on the wire
+            previous = self.last_sequence.get(joint)
+            if previous is not None:
+                steps = np.diff(sequences, prepend=previous) % 256
+            else:
+                steps = np.concatenate(([1], np.diff(sequences) % 256))
+            repeated = steps == 0
+            dropped = int((steps[~repeated] - 1).sum())
+            if dropped:
+                self.dropped_frames += dropped
+                self.stats.count("serial.dropped_frames", dropped)
+            if repeated.any():
+                if duplicates is None:
+                    duplicates = np.zeros(len(frames), dtype=bool)
+                duplicates[rows[repeated]] = True
+            self.last_sequence[joint] = int(sequences[-1])
+
+            # only the newest sample per joint survives in the latest-value store
+            self.store.update(f"/joint/{joint}", frames["quat"][rows[-1]] * QUAT_SCALE, timestamp)
+
+        if duplicates is not None:
+            count = int(duplicates.sum())
+            self.duplicate_frames += count
+            self.stats.count("serial.duplicate_frames", count)
+            # sinks see each sample once
+            frames = frames[~duplicates]
+        if self.sinks:
+            quats = frames["quat"] * QUAT_SCALE
+            for joint, quat in zip(frames["joint"].tolist(), quats):
+                for sink in self.sinks:
+                    sink.push(f"/joint/{joint}", quat, timestamp, self.port)
+        self.decoded_samples(timestamp, len(frames))
+
+
+class PortManager:
+    # services any number of serial ports from one thread. ports that are missing or drop
+    # out are retried in the background with exponential backoff, so construction never blocks.
+    # imu_keys maps ports carrying raw 9-axis boards to the joint each drives; all of them are
+    # fused together once per loop.
+    def __init__(self, ports, baudrate=115200, logging_level=None, store=None, sinks=(), imu_keys=None, stats=None):
+        self.store = store if store is not None else JointStore()
+        imu_keys = imu_keys or {}
+        self.imu = ImuFusion() if imu_keys else None
+        self.stats = stats if stats is not None else pipeline_stats
+        self.ports = [UARTCommunicator(port, baudrate, logging_level, store=self.store, auto_connect=False, sinks=sinks,
+                                       imu_key=imu_keys.get(port), imu=self.imu, stats=self.stats)
+                      for port in ports]
+        self.imu_ports = {uart.imu_key: uart for uart in self.ports if uart.imu_key is not None}
+        self.retry_at = {uart.port: 0.0 for uart in self.ports}
+        self.retry_delay = {uart.port: RECONNECT_MIN_DELAY for uart in self.ports}
+        self.selector = selectors.DefaultSelector()
+        self.polled = []    # open ports without a selectable fileno (Windows COM ports)
+        self.stop_signal = threading.Event()
+        self.logger = logging.getLogger("PortManager")
+        if logging_level:
+            self.logger.setLevel(logging_level)
+
+    def stop(self):
+        self.stop_signal.set()
+        self.logger.info("Stopped.")
+
+    def start(self):
+        self.logger.debug("Starting...")
+        self.run()
+
+    def start_threaded(self):
+        self.logger.debug("Starting thread...")
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def connected(self):
+        return [uart.port for uart in self.ports if uart.serial_connection]
+
+    def run(self):
+        try:
+            while not self.stop_signal.is_set():
+                self.reconnect_due()
+                if self.selector.get_map():
+                    timeout = POLL_INTERVAL if self.polled else READ_TIMEOUT
+                    for key, _ in self.selector.select(timeout=timeout):
+                        self.read(key.data)
+                if self.polled:
+                    self.service_polled()
+                elif not self.selector.get_map():
+                    time.sleep(READ_TIMEOUT)    # nothing connected yet
+                if self.imu is not None:
+                    self.fuse()
+        finally:
+            for uart in self.ports:
+                self.drop(uart)
+            self.selector.close()
+
+    def reconnect_due(self):
+        now = time.monotonic()
+        for uart in self.ports:
+            if uart.serial_connection or now < self.retry_at[uart.port]:
+                continue
+            if not uart.try_connect():
+                self.retry_at[uart.port] = now + self.retry_delay[uart.port]
+                self.retry_delay[uart.port] = min(self.retry_delay[uart.port] * 2, RECONNECT_MAX_DELAY)
                 continue
 
-            self.data_table[key] = data.get("value")
+            self.retry_delay[uart.port] = RECONNECT_MIN_DELAY
+            try:
+                self.selector.register(uart.serial_connection, selectors.EVENT_READ, uart)
+            except (ValueError, AttributeError, OSError):
+                self.polled.append(uart)
+
+    def service_polled(self):
+        busy = False
+        for uart in list(self.polled):
+            try:
+                waiting = uart.serial_connection.in_waiting
+            except (AttributeError, OSError, serial.SerialException):
+                self.drop(uart)
+                continue
+            if waiting:
+                busy = True
+                self.read(uart)
+        if not busy and not self.selector.get_map():
+            time.sleep(POLL_INTERVAL)
+
+    def fuse(self):
+        fused = self.imu.update()
+        for key, quat, timestamp in fused:
+            self.imu_ports[key].publish(key, quat, timestamp)
+        if fused:
+            self.stats.latency("serial.fuse", time.monotonic() - min(timestamp for _, _, timestamp in fused))
+
+    def read(self, uart):
+        try:
+            chunk = uart.serial_connection.read(max(1, uart.serial_connection.in_waiting))
+        except (AttributeError, TypeError, OSError, serial.SerialException) as e:
+            self.logger.warning("%s: %s", uart.port, e)
+            self.drop(uart)
+            return
+        uart.handle_chunk(chunk)
+
+    def drop(self, uart):
+        if uart.serial_connection is None:
+            return
+        if uart in self.polled:
+            self.polled.remove(uart)
+        else:
+            try:
+                self.selector.unregister(uart.serial_connection)
+            except (KeyError, ValueError):
+                pass
+        uart.disconnect()
+        self.retry_at[uart.port] = time.monotonic() + self.retry_delay[uart.port]
+
 
 if __name__ == "__main__":
     try:
-        uart_right_arm = UARTCommunicator("COM7", logging_level=logging.DEBUG)
-        uart_left_arm = UARTCommunicator("COM9", logging_level=logging.DEBUG)
-        
-        uart_right_arm.start_threaded()
-        uart_left_arm.start_threaded()
+        uart_ports = PortManager(["COM7", "COM9"], logging_level=logging.DEBUG)
+        uart_ports.start_threaded()
 
         while True:
-            joint_right_upper = uart_right_arm.get("/joint/0")
-            joint_right_lower = uart_right_arm.get("/joint/1")
-            joint_left_upper = uart_left_arm.get("/joint/2")
-            joint_left_lower = uart_left_arm.get("/joint/3")
+            joint_right_upper = uart_ports.get("/joint/0")
+            joint_right_lower = uart_ports.get("/joint/1")
+            joint_left_upper = uart_ports.get("/joint/2")
+            joint_left_lower = uart_ports.get("/joint/3")
             
             print(f'joint_right_upper: {joint_right_upper}, joint_right_lower: {joint_right_lower}, joint_left_upper: {joint_left_upper}, joint_left_lower: {joint_left_lower}')
             
             time.sleep(0.01)
     except KeyboardInterrupt:
-        uart_right_arm.stop()
-        uart_left_arm.stop()
+        uart_ports.stop()
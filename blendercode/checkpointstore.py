@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+# a checkpoint store with the same methods as azure.eventhub's CheckpointStore (the blob
+# store's sync API), kept in one SQLite file. EventHubConsumerClient and
+# localhub.LocalConsumerClient both accept it as checkpoint_store=..., so a consumer restarted
+# on a laptop or in the Azure Web App picks up where it stopped without a storage account.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    namespace TEXT NOT NULL,
+    eventhub TEXT NOT NULL,
+    consumer_group TEXT NOT NULL,
+    partition_id TEXT NOT NULL,
+    sequence_number INTEGER NOT NULL,
+    offset TEXT,
+    PRIMARY KEY (namespace, eventhub, consumer_group, partition_id)
+);
+CREATE TABLE IF NOT EXISTS ownership (
+    namespace TEXT NOT NULL,
+    eventhub TEXT NOT NULL,
+    consumer_group TEXT NOT NULL,
+    partition_id TEXT NOT NULL,
+    owner_id TEXT NOT NULL,
+    last_modified_time REAL NOT NULL,
+    etag TEXT NOT NULL,
+    PRIMARY KEY (namespace, eventhub, consumer_group, partition_id)
+);
+"""
+
+
+class SQLiteCheckpointStore:
+    def __init__(self, path):
+        # several receiver processes may share the file, so writes go through WAL with a busy timeout
+        self.connection = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def list_checkpoints(self, fully_qualified_namespace, eventhub_name, consumer_group, **kwargs):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT partition_id, sequence_number, offset FROM checkpoints "
+                "WHERE namespace = ? AND eventhub = ? AND consumer_group = ?",
+                (fully_qualified_namespace, eventhub_name, consumer_group)).fetchall()
+        return [{
+            "fully_qualified_namespace": fully_qualified_namespace,
+            "eventhub_name": eventhub_name,
+            "consumer_group": consumer_group,
+            "partition_id": partition_id,
+            "sequence_number": sequence_number,
+            "offset": offset,
+        } for partition_id, sequence_number, offset in rows]
+
+    def update_checkpoint(self, checkpoint, **kwargs):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO checkpoints (namespace, eventhub, consumer_group, partition_id, sequence_number, offset) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (namespace, eventhub, consumer_group, partition_id) "
+                "DO UPDATE SET sequence_number = excluded.sequence_number, offset = excluded.offset",
+                (checkpoint["fully_qualified_namespace"], checkpoint["eventhub_name"], checkpoint["consumer_group"],
+                 checkpoint["partition_id"], checkpoint["sequence_number"], checkpoint.get("offset")))
+
+    def list_ownership(self, fully_qualified_namespace, eventhub_name, consumer_group, **kwargs):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT partition_id, owner_id, last_modified_time, etag FROM ownership "
+                "WHERE namespace = ? AND eventhub = ? AND consumer_group = ?",
+                (fully_qualified_namespace, eventhub_name, consumer_group)).fetchall()
+        return [{
+            "fully_qualified_namespace": fully_qualified_namespace,
+            "eventhub_name": eventhub_name,
+            "consumer_group": consumer_group,
+            "partition_id": partition_id,
+            "owner_id": owner_id,
+            "last_modified_time": last_modified_time,
+            "etag": etag,
+        } for partition_id, owner_id, last_modified_time, etag in rows]
+
+    def claim_ownership(self, ownership_list, **kwargs):
+        # a claim succeeds only if the caller saw the current etag (or the partition is unowned)
+        claimed = []
+        with self.lock, self.connection:
+            for ownership in ownership_list:
+                key = (ownership["fully_qualified_namespace"], ownership["eventhub_name"],
+                       ownership["consumer_group"], ownership["partition_id"])
+                row = self.connection.execute(
+                    "SELECT etag FROM ownership WHERE namespace = ? AND eventhub = ? AND consumer_group = ? "
+                    "AND partition_id = ?", key).fetchone()
+                if row is not None and row[0] != ownership.get("etag"):
+                    continue
+                claim = dict(ownership, last_modified_time=time.time(), etag=uuid.uuid4().hex)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO ownership VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    key + (claim["owner_id"], claim["last_modified_time"], claim["etag"]))
+                claimed.append(claim)
+        return claimed
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+
+FRAME_HISTORY = 1024    # frame costs kept for the percentile summary
+RETIME_INTERVAL = 1.0   # seconds between timer interval changes
+RETIME_RATIO = 0.2      # only re-register the timer if the interval moves by more than this
+ARRIVAL_SMOOTHING = 0.1
+
+
+class FramePacer:
+    # picks the modal timer interval from how often new joint data arrives and how long a frame
+    # of our own work takes: never faster than the data or max_fps, never slower than min_fps,
+    # and never spending more than budget of each frame interval on bone updates.
+    def __init__(self, max_fps=60, min_fps=15, budget=0.25):
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self.budget = budget
+        self.interval = self.min_interval
+        self.arrival_interval = self.min_interval
+        self.last_sequence = None
+        self.last_timestamps = None
+        self.costs = np.zeros(FRAME_HISTORY)
+        self.frames = 0
+        self.updated = 0
+        self.retimed = time.monotonic()
+
+    def arrival(self, sequence, timestamps):
+        # per-slot update counts and arrival times from a JointSnapshot. samples per elapsed time
+        # gives the real data rate even when several samples land between two frames
+        if self.last_sequence is not None:
+            samples = sequence - self.last_sequence
+            elapsed = timestamps - self.last_timestamps
+            fresh = (samples > 0) & (elapsed > 0)
+            if fresh.any():
+                gap = np.min(elapsed[fresh] / samples[fresh])
+                self.arrival_interval += ARRIVAL_SMOOTHING * (gap - self.arrival_interval)
+        self.last_sequence = sequence
+        self.last_timestamps = timestamps
+
+    def frame(self, cost, updated):
+        self.costs[self.frames % FRAME_HISTORY] = cost
+        self.frames += 1
+        self.updated += updated
+
+    def next_interval(self):
+        # the new timer interval if it should change now, otherwise None
+        now = time.monotonic()
+        if now - self.retimed < RETIME_INTERVAL:
+            return None
+        recent = self.costs[:min(self.frames, FRAME_HISTORY)]
+        cost = np.percentile(recent, 95) if len(recent) else 0.0
+        wanted = max(self.min_interval, self.arrival_interval, cost / self.budget)
+        wanted = min(wanted, self.max_interval)
+        if abs(wanted - self.interval) <= RETIME_RATIO * self.interval:
+            return None
+        self.interval = wanted
+        self.retimed = now
+        return wanted
+
+    def percentiles(self):
+        # (p50, p95, p99, max) frame cost in milliseconds over the recent frames
+        recent = self.costs[:min(self.frames, FRAME_HISTORY)]
+        if not len(recent):
+            return 0.0, 0.0, 0.0, 0.0
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1e3
+        return p50, p95, p99, recent.max() * 1e3
+
+    def summary(self):
+        p50, p95, p99, worst = self.percentiles()
+        return (f"frame {p50:.2f}/{p95:.2f}/{p99:.2f}/{worst:.2f} ms (p50/p95/p99/max), "
+                f"timer {1.0 / self.interval:.0f} fps, data {1.0 / max(self.arrival_interval, 1e-6):.0f} Hz")
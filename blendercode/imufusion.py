@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+import quatmath
+
+# host-side orientation filter for boards that stream raw 9-axis samples (9axisdata.ino)
+# instead of DMP quaternions. the Madgwick gradient-descent (MARG) update runs on every sensor
+# at once, so one tick costs about the same NumPy calls whether it serves 1 sensor or 32.
+
+SAMPLE_PERIOD = 0.01                # 9axisdata.ino sends one sample every ~10 ms
+BETA = 0.1                          # gradient step: higher trusts accel/mag more, lower the gyro
+GYRO_SCALE = np.pi / 180.0          # the MPU9250 library reports deg/s; accel and mag are normalized
+RAW_COLUMNS = 9                     # ax ay az gx gy gz mx my mz
+
+
+def madgwick_step(q, gyro, accel, mag, dt, beta=BETA):
+    # one filter step for (N, 4) orientations from (N, 3) gyro (rad/s), accel and mag.
+    # sensors with a zero magnetometer reading fall back to the accel-only (IMU) update.
+    q0, q1, q2, q3 = q.T
+    zeros = np.zeros_like(q0)
+
+    accel_norm = np.linalg.norm(accel, axis=1, keepdims=True)
+    mag_norm = np.linalg.norm(mag, axis=1, keepdims=True)
+    a = accel / np.where(accel_norm > 0, accel_norm, 1.0)
+    m = mag / np.where(mag_norm > 0, mag_norm, 1.0)
+
+    # earth's field direction seen from the current estimate, with its east component removed
+    h = quatmath.multiply(quatmath.multiply(q, np.column_stack([zeros, m])), quatmath.conjugate(q))
+    bx = np.hypot(h[:, 1], h[:, 2])
+    bz = h[:, 3]
+
+    # objective (gravity and field mismatch) and its Jacobian; the step direction is J^T f
+    f = np.column_stack([
+        2 * (q1 * q3 - q0 * q2) - a[:, 0],
+        2 * (q0 * q1 + q2 * q3) - a[:, 1],
+        2 * (0.5 - q1 * q1 - q2 * q2) - a[:, 2],
+        2 * bx * (0.5 - q2 * q2 - q3 * q3) + 2 * bz * (q1 * q3 - q0 * q2) - m[:, 0],
+        2 * bx * (q1 * q2 - q0 * q3) + 2 * bz * (q0 * q1 + q2 * q3) - m[:, 1],
+        2 * bx * (q0 * q2 + q1 * q3) + 2 * bz * (0.5 - q1 * q1 - q2 * q2) - m[:, 2],
+    ])
+    jacobian = np.stack([
+        np.column_stack([-2 * q2, 2 * q3, -2 * q0, 2 * q1]),
+        np.column_stack([2 * q1, 2 * q0, 2 * q3, 2 * q2]),
+        np.column_stack([zeros, -4 * q1, -4 * q2, zeros]),
+        np.column_stack([-2 * bz * q2, 2 * bz * q3, -4 * bx * q2 - 2 * bz * q0, -4 * bx * q3 + 2 * bz * q1]),
+        np.column_stack([-2 * bx * q3 + 2 * bz * q1, 2 * bx * q2 + 2 * bz * q0, 2 * bx * q1 + 2 * bz * q3,
+                         -2 * bx * q0 + 2 * bz * q2]),
+        np.column_stack([2 * bx * q2, 2 * bx * q3 - 4 * bz * q1, 2 * bx * q0 - 4 * bz * q2, 2 * bx * q1]),
+    ], axis=1)
+    f[:, 3:] *= mag_norm > 0
+    f *= accel_norm > 0
+    step = np.einsum("nij,ni->nj", jacobian, f)
+    step_norm = np.linalg.norm(step, axis=1, keepdims=True)
+    step /= np.where(step_norm > 0, step_norm, 1.0)
+
+    q_dot = 0.5 * quatmath.multiply(q, np.column_stack([zeros, gyro])) - beta * step
+    return quatmath.normalize(q + q_dot * dt)
+
+
+class ImuFusion:
+    # raw samples are queued per sensor as they are read and fused together in update(),
+    # which the reading thread calls once per tick (after servicing every port)
+    def __init__(self, sample_period=SAMPLE_PERIOD, beta=BETA, gyro_scale=GYRO_SCALE):
+        self.sample_period = sample_period
+        self.beta = beta
+        self.gyro_scale = gyro_scale
+        self.keys = []
+        self.index = {}
+        self.orientation = np.empty((0, 4))
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, samples, timestamp):
+        # samples: (n, 9) raw rows for one sensor, timestamp: when they were read
+        with self.lock:
+            if key not in self.index:
+                self.index[key] = len(self.keys)
+                self.keys.append(key)
+                self.orientation = np.vstack([self.orientation, quatmath.IDENTITY])
+            queued = self.pending.setdefault(key, [[], timestamp])
+            queued[0].append(samples)
+            queued[1] = timestamp
+
+    def update(self):
+        # fuse everything queued; returns [(key, quaternion, timestamp), ...] for sensors that advanced
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return []
+
+        keys = list(pending)
+        rows = np.array([self.index[key] for key in keys])
+        samples = [np.concatenate(pending[key][0]) for key in keys]
+        counts = np.array([len(s) for s in samples])
+        # (sensors, steps, 9), padded where a sensor queued fewer samples this tick
+        batch = np.zeros((len(keys), counts.max(), RAW_COLUMNS))
+        for sensor, sensor_samples in enumerate(samples):
+            batch[sensor, :len(sensor_samples)] = sensor_samples
+        batch[:, :, 3:6] *= self.gyro_scale
+
+        q = self.orientation[rows]
+        for step in range(counts.max()):
+            active = counts > step
+            if active.all():
+                q = madgwick_step(q, batch[:, step, 3:6], batch[:, step, 0:3], batch[:, step, 6:9],
+                                  self.sample_period, self.beta)
+            else:
+                q[active] = madgwick_step(q[active], batch[active, step, 3:6], batch[active, step, 0:3],
+                                          batch[active, step, 6:9], self.sample_period, self.beta)
+        self.orientation[rows] = q
+        return [(key, q[sensor], pending[key][1]) for sensor, key in enumerate(keys)]
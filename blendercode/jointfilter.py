@@ -0,0 +1,77 @@
+import numpy as np
+
+import quatmath
+
+SMOOTHING_SECONDS = 0.05    # how long a correction takes to fade (to 1/e) after a new sample
+MAX_HORIZON = 0.1           # never extrapolate more than this far past the newest sample
+MAX_STEPS = 1.5             # ...or more than this many sample intervals (after the lead)
+
+
+class JointFilter:
+    # per-frame filter over every joint at once. from the last two samples of each slot it
+    # estimates angular velocity and extrapolates to the render time, hiding transport lag and
+    # sample-and-hold steps. when a new sample changes the prediction, the jump is not shown
+    # at once but faded out over SMOOTHING_SECONDS, so the output is smooth without lagging
+    # behind steady motion the way a low-pass filter would. lead is a known transport latency
+    # (tens of ms on the cloud path) to predict ahead by on top of the time since arrival.
+    def __init__(self, count, smoothing=SMOOTHING_SECONDS, max_horizon=MAX_HORIZON, lead=0.0):
+        self.smoothing = smoothing
+        self.max_horizon = max_horizon
+        self.lead = lead
+        self.previous = np.tile(quatmath.IDENTITY, (count, 1))
+        self.previous_time = np.zeros(count)
+        self.current = np.tile(quatmath.IDENTITY, (count, 1))
+        self.current_time = np.zeros(count)
+        self.sequence = np.zeros(count, dtype=np.int64)
+        self.correction = np.zeros((count, 4))
+        self.output_time = None
+
+    def update(self, snapshot, now):
+        # snapshot is a JointSnapshot, now the time.monotonic() the frame is rendered for
+        fresh = snapshot.sequence != self.sequence
+        if fresh.any():
+            before = self.predict(now)
+            self.ingest(fresh, snapshot)
+            # whatever the new sample moved the prediction by becomes a correction that fades out
+            self.correction += before - self.predict(now)
+            self.correction[self.sequence == 0] = 0.0
+            self.sequence = snapshot.sequence.copy()
+
+        if self.output_time is not None and self.smoothing > 0:
+            self.correction *= np.exp(-max(now - self.output_time, 0.0) / self.smoothing)
+        else:
+            self.correction[:] = 0.0
+        self.output_time = now
+        return self.normalized(self.predict(now) + self.correction)
+
+    def ingest(self, fresh, snapshot):
+        values = snapshot.values[fresh]
+        # q and -q are the same rotation; keep each slot on one side so predictions stay continuous
+        flip = np.einsum("ij,ij->i", values, self.current[fresh]) < 0
+        values[flip] *= -1.0
+        self.previous[fresh] = self.current[fresh]
+        self.previous_time[fresh] = self.current_time[fresh]
+        self.current[fresh] = values
+        self.current_time[fresh] = snapshot.timestamps[fresh]
+        # a slot's first sample has nothing to extrapolate from
+        first = fresh & (self.sequence == 0)
+        self.previous[first] = self.current[first]
+        self.previous_time[first] = self.current_time[first]
+
+    def predict(self, now):
+        interval = self.current_time - self.previous_time
+        moving = interval > 0
+        safe_interval = np.where(moving, interval, 1.0)
+        ahead = np.clip(now - self.current_time, 0.0, self.max_horizon) + self.lead
+        steps = np.where(moving, np.minimum(ahead / safe_interval, MAX_STEPS + self.lead / safe_interval), 0.0)
+        # normalized lerp past t = 1: per-sample rotations are small, so this tracks slerp closely
+        # at a fraction of the cost
+        t = steps[:, np.newaxis]
+        return self.current + t * (self.current - self.previous)
+
+    def normalized(self, q):
+        return q / np.sqrt(np.einsum("ij,ij->i", q, q))[:, np.newaxis]
+
+    def reset(self):
+        self.correction[:] = 0.0
+        self.output_time = None
@@ -0,0 +1,67 @@
+import argparse
+import logging
+import sys
+import threading
+
+from jointsession import create_source
+from pipelinestats import pipeline_stats
+from recorder import SessionRecorder
+from sharedjoints import SharedJointStore, DEFAULT_NAME
+from skeleton import Skeleton, SKELETONS
+
+# runs the joint receivers outside Blender and publishes the latest joints in shared memory,
+# so serial reads, JSON decoding and AMQP never hold Blender's GIL. start it before Blender:
+#   python jointreceiver.py serial --ports COM7 COM9
+#   python jointreceiver.py cloud --connection-str "Endpoint=sb://..." --eventhub name
+#   python jointreceiver.py replay --session sessions/arm01
+# and set SHARED_MEMORY_NAME in mainapp.py / maincloud.py to --name (default blender_joints), or pick
+# the "shared" transport in the Joint Stream add-on (__init__.py).
+
+logger = logging.getLogger("JointReceiver")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("transport", choices=["serial", "cloud", "replay"])
+    parser.add_argument("--name", default=DEFAULT_NAME, help="shared memory block Blender attaches to")
+    parser.add_argument("--skeleton", choices=sorted(SKELETONS), default="arms")
+    parser.add_argument("--ports", nargs="*", default=["COM7", "COM9"])
+    parser.add_argument("--imu", nargs="*", default=[], help="raw 9-axis boards as PORT=/joint/N")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--connection-str")
+    parser.add_argument("--eventhub")
+    parser.add_argument("--session")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, > 0 (1.0 is real time)")
+    parser.add_argument("--record", help="new or empty folder to record every joint sample to")
+    parser.add_argument("--stats-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO,
+                        format="%(asctime)s %(levelname)s [%(name)s]: %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    store = SharedJointStore(Skeleton(SKELETONS[args.skeleton]).keys, name=args.name)
+    recorder = SessionRecorder(args.record) if args.record else None
+    source = create_source(args.transport, store, [recorder] if recorder else [], ports=args.ports,
+                           imu_keys=dict(imu.split("=", 1) for imu in args.imu), baudrate=args.baudrate,
+                           connection_str=args.connection_str, eventhub=args.eventhub, session=args.session,
+                           speed=args.speed)
+    logger.info("Publishing %s to shared memory %s.", ", ".join(store.keys), store.name)
+    pipeline_stats.start_logging(args.stats_interval)
+    thread = threading.Thread(target=source.start)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(0.5)
+    except KeyboardInterrupt:
+        logger.info("Received KeyboardInterrupt, stopping.")
+    finally:
+        source.stop()
+        thread.join()
+        pipeline_stats.stop_logging()
+        if recorder:
+            recorder.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+
+from framepacing import FramePacer
+from jointfilter import JointFilter
+from jointstore import JointStore
+from pipelinestats import pipeline_stats
+from posewriter import PoseWriter
+from skeleton import Skeleton
+
+TRANSPORTS = ("serial", "cloud", "replay", "shared")
+ATTACH_RETRY = 0.5      # seconds between attempts to attach to a jointreceiver.py that is not up yet
+STOP_TIMEOUT = 2.0      # seconds stop() waits for the source thread before leaving it to finish alone
+
+logger = logging.getLogger("JointSession")
+
+
+def create_source(transport, store, sinks=(), ports=(), imu_keys=None, baudrate=115200, connection_str=None,
+                  eventhub=None, session=None, speed=1.0, logging_level=None):
+    # transports are imported only when one is started, so loading the add-on (or running the
+    # serial receiver) never pulls in pyserial or the Azure SDK when they are not used
+    if transport == "serial":
+        from blenderport import PortManager
+        imu_keys = imu_keys or {}
+        return PortManager(list(ports) + [port for port in imu_keys if port not in ports], baudrate=baudrate,
+                           logging_level=logging_level, store=store, sinks=sinks, imu_keys=imu_keys)
+    if transport == "cloud":
+        from blendercloud import EventHubReceiver
+        return EventHubReceiver(connection_str, eventhub, sinks=sinks, store=store)
+    if transport == "replay":
+        from replay import ReplaySource
+        return ReplaySource(session, speed=speed, loop=True, logging_level=logging_level, store=store, sinks=sinks)
+    raise ValueError(f"unknown transport {transport}")
+
+
+class JointSession:
+    # one Start..Stop of the add-on (see __init__.py), without any bpy: the store, bone writer,
+    # filter and pacer the timer needs, and a joint source that is imported, constructed and run
+    # on a background thread, so a missing port, a slow Event Hub handshake or a jointreceiver.py
+    # that is not up yet never blocks Blender. "shared" attaches to jointreceiver.py's block
+    # (shared_memory_name) instead of running a source. frame() is the timer's whole tick.
+    def __init__(self, armature, joints, transport, source_options=None, joint_filter=True, filter_lead=0.0,
+                 max_fps=60, min_fps=15, record_dir=None, shared_memory_name=None, stats=None):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unknown transport {transport}")
+        self.skeleton = Skeleton(joints)
+        self.transport = transport
+        self.source_options = dict(source_options or {})
+        self.record_dir = record_dir
+        self.shared_memory_name = shared_memory_name
+        self.filter_enabled = joint_filter
+        self.filter_lead = filter_lead
+        self.stats = stats if stats is not None else pipeline_stats
+        self.pose_writer = PoseWriter(armature, self.skeleton.bones)
+        self.pacer = FramePacer(max_fps=max_fps, min_fps=min_fps)
+        self.store = None
+        self.slots = None
+        self.joint_filter = None
+        self.source = None
+        self.recorder = None
+        self.error = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stop_signal = threading.Event()
+        self.started = None
+        self.first_joints = None    # seconds from start() until every joint had a sample
+        self.generation = -1
+        self.sequence = None
+        if transport != "shared":
+            self.use(JointStore(self.skeleton.keys))
+
+    def use(self, store):
+        try:
+            slots = self.skeleton.slots(store)
+        except KeyError as error:
+            raise ValueError(f"{store.keys} has no slot for {error}") from None
+        self.slots = slots
+        self.joint_filter = JointFilter(len(store.keys), lead=self.filter_lead) if self.filter_enabled else None
+        # published last: frame() does nothing until the store is set
+        self.store = store
+
+    def start(self):
+        # returns at once; status() tells how far connecting got
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name="JointSession", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            if self.transport == "shared":
+                self.attach()
+            else:
+                self.run_source()
+        except Exception as error:
+            self.error = error
+            logger.exception("%s source failed.", self.transport)
+
+    def run_source(self):
+        sinks = []
+        try:
+            if self.record_dir:
+                from recorder import SessionRecorder
+                self.recorder = SessionRecorder(self.record_dir)
+                sinks.append(self.recorder)
+            source = create_source(self.transport, self.store, sinks, **self.source_options)
+            with self.lock:
+                if self.stop_signal.is_set():
+                    source.stop()
+                    return
+                self.source = source
+            logger.info("%s source up %.3f s after start.", self.transport, time.monotonic() - self.started)
+            source.start()
+        finally:
+            # the source has stopped pushing, so the last buffers can be flushed
+            if self.recorder:
+                self.recorder.close()
+
+    def attach(self):
+        from sharedjoints import SharedJointStore
+        while not self.stop_signal.is_set():
+            try:
+                store = SharedJointStore.attach(self.shared_memory_name)
+            except FileNotFoundError:
+                self.stop_signal.wait(ATTACH_RETRY)
+                continue
+            with self.lock:
+                if self.stop_signal.is_set():
+                    store.close()
+                    return
+                try:
+                    self.use(store)
+                except ValueError:
+                    store.close()
+                    raise
+            logger.info("Attached to %s %.3f s after start.", store.name, time.monotonic() - self.started)
+            return
+
+    def reattach(self):
+        # jointreceiver.py stopped or was replaced: the pose stays while its next block is waited for
+        logger.info("%s closed, waiting for the receiver to come back.", self.store.name)
+        with self.lock:
+            self.store.close()
+            self.store = None
+            self.sequence = None
+            self.generation = -1
+        self.thread = threading.Thread(target=self.run, name="JointSession", daemon=True)
+        self.thread.start()
+
+    def frame(self):
+        # one timer tick: bones from the latest joints, then the new timer interval if it should change
+        started = time.perf_counter()
+        updated = self.update_bones()
+        self.pacer.frame(time.perf_counter() - started, updated)
+        return self.pacer.next_interval()
+
+    def update_bones(self):
+        store = self.store
+        if store is None:
+            return False
+        if self.transport == "shared" and store.closed:
+            self.reattach()
+            return False
+        snapshot = store.snapshot()
+        sequence = snapshot.sequence[self.slots]
+        if not sequence.all():
+            if self.first_joints is not None:
+                self.stats.count("apply.invalid_frames")
+            return False
+        if self.first_joints is None:
+            self.first_joints = time.monotonic() - self.started
+            logger.info("First joints %.3f s after start.", self.first_joints)
+
+        if self.joint_filter is not None:
+            # the filter moves the bones between samples too, so every frame is rendered
+            quats = self.joint_filter.update(snapshot, time.monotonic())[self.slots]
+        else:
+            if snapshot.generation == self.generation:
+                self.stats.count("apply.stale_frames")
+                return False
+            self.generation = snapshot.generation
+            self.pacer.arrival(sequence, snapshot.timestamps[self.slots])
+            quats = snapshot.values[self.slots]
+
+        written = self.pose_writer.write(self.skeleton.solve(quats)) > 0
+
+        # arrival -> bone latency of the samples new since the last frame
+        fresh = sequence != self.sequence if self.sequence is not None else sequence > 0
+        self.sequence = sequence
+        self.stats.applied(snapshot.timestamps[self.slots][fresh])
+        return written
+
+    def status(self):
+        if self.error is not None:
+            return f"{self.transport} failed: {self.error}"
+        if self.store is None and self.transport == "shared":
+            return f"waiting for jointreceiver.py ({self.shared_memory_name})..."
+        if self.store is None or (self.source is None and self.transport != "shared"):
+            return f"connecting {self.transport}..."
+        if self.first_joints is None:
+            return f"{self.transport}: waiting for joints"
+        return f"{self.transport}: {self.pacer.summary()}"
+
+    def stop(self):
+        # main thread only, after the last frame(); leaves the pose at rest
+        with self.lock:
+            self.stop_signal.set()
+            source = self.source
+        if source is not None:
+            source.stop()
+        if self.thread is not None:
+            self.thread.join(STOP_TIMEOUT)
+            if self.thread.is_alive():
+                logger.warning("%s source still stopping after %.1f s.", self.transport, STOP_TIMEOUT)
+        if self.transport == "shared" and self.store is not None:
+            self.store.close()
+            self.store = None
+        self.pose_writer.reset()
+        logger.info("Stopped %s after %d frames (%d with bone writes); %s.", self.transport, self.pacer.frames,
+                    self.pacer.updated, self.pacer.summary())
+        logger.info("Pipeline %s.", self.stats.summary())
@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+JOINT_KEYS = ("/joint/0", "/joint/1", "/joint/2", "/joint/3")
+
+JointSnapshot = namedtuple("JointSnapshot", ["values", "timestamps", "sequence", "generation"])
+
+
+class JointStore:
+    # latest value per joint key in fixed, array-backed slots.
+    # writers bump `generation` around every update (odd while a write is in flight),
+    # so readers copy without taking a lock and retry if a writer got in between.
+    def __init__(self, keys=JOINT_KEYS, width=4):
+        self.keys = tuple(keys)
+        self.index = {key: slot for slot, key in enumerate(self.keys)}
+        self.values = np.zeros((len(self.keys), width), dtype=np.float64)
+        self.timestamps = np.zeros(len(self.keys), dtype=np.float64)   # time.monotonic() of arrival
+        self.sequence = np.zeros(len(self.keys), dtype=np.int64)       # updates received per slot
+        self.generation = 0
+        self.extras = {}                    # non-joint keys (logs, BPM, ...) keep dict semantics
+        self.write_lock = threading.Lock()  # only serializes writers sharing one store
+
+    def update(self, key, value, timestamp=None):
+        slot = self.index.get(key)
+        if slot is None:
+            self.extras[key] = value
+            return False
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if len(value) != self.values.shape[1]:
+            raise ValueError(f"expected {self.values.shape[1]} components for {key}, got {len(value)}")
+
+        with self.write_lock:
+            self.generation += 1
+            try:
+                self.write_slot(slot, value, timestamp)
+            finally:
+                # a rejected value must not leave the generation odd, or readers would spin
+                self.generation += 1
+        return True
+
+    def write_slot(self, slot, value, timestamp):
+        # called with write_lock held and the generation odd
+        self.values[slot] = value
+        self.timestamps[slot] = timestamp
+        self.sequence[slot] += 1
+
+    def snapshot(self):
+        while True:
+            generation = self.generation
+            if not generation & 1:
+                values = self.values.copy()
+                timestamps = self.timestamps.copy()
+                sequence = self.sequence.copy()
+                if generation == self.generation:
+                    return JointSnapshot(values, timestamps, sequence, generation)
+            time.sleep(0)
+
+    def get(self, key):
+        slot = self.index.get(key)
+        if slot is None:
+            return self.extras.get(key)
+        snapshot = self.snapshot()
+        if not snapshot.sequence[slot]:
+            return None
+        return snapshot.values[slot].tolist()
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import numpy as np
+
+import quatmath
+
+RING_CAPACITY = 4096    # samples kept per (source, key)
+MAX_SERIES_KEYS = 256   # new (source, key) pairs beyond this are ignored
+
+
+class RingBuffer:
+    def __init__(self, capacity, width):
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, width), dtype=np.float64)
+        self.next = 0
+        self.count = 0
+
+    def append(self, timestamp, value):
+        slot = self.next
+        self.times[slot] = timestamp
+        self.values[slot] = value
+        self.next = (slot + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def ordered(self):
+        # oldest first, copied so the caller can use it without holding the lock
+        if self.count < len(self.times):
+            return self.times[:self.count].copy(), self.values[:self.count].copy()
+        return np.roll(self.times, -self.next), np.roll(self.values, -self.next, axis=0)
+
+
+class LiveBuffers:
+    # receiver sink keeping the recent history of every (source, key) in bounded ring buffers,
+    # shared by all dashboard sessions. quaternions are kept raw and turned into motion state on read.
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def push(self, key, value, timestamp, source=None):
+        if isinstance(value, (int, float)):
+            value = (value,)
+        elif not isinstance(value, (list, tuple, np.ndarray)):
+            return      # logs and other non-numeric values are not plotted
+        buffer = self.buffers.get((source, key))
+        if buffer is None:
+            if len(self.buffers) >= MAX_SERIES_KEYS:
+                return
+            buffer = RingBuffer(self.capacity, len(value))
+            with self.lock:
+                self.buffers[(source, key)] = buffer
+        with self.lock:
+            try:
+                buffer.append(timestamp, value)
+            except (ValueError, TypeError):
+                pass
+
+    def sources(self):
+        with self.lock:
+            return sorted({source for source, _ in self.buffers}, key=str)
+
+    def keys(self, source):
+        with self.lock:
+            return sorted(key for buffer_source, key in self.buffers if buffer_source == source)
+
+    def series(self, source, key, max_points=None, window=None):
+        # (seconds relative to now, so 0 and below, values) with quaternions reduced to motion state
+        with self.lock:
+            buffer = self.buffers.get((source, key))
+            if buffer is None:
+                return np.empty(0), np.empty(0)
+            times, values = buffer.ordered()
+
+        ages = times - time.monotonic()
+        if window is not None:
+            keep = ages >= -window
+            ages, values = ages[keep], values[keep]
+        if values.shape[1] == 4:
+            euler = quatmath.to_euler(values)
+            values = np.sqrt(np.einsum("ij,ij->i", euler, euler))
+        else:
+            values = values[:, 0]
+        if max_points is not None:
+            ages, values = downsample_minmax(ages, values, max_points)
+        return ages, values
+
+
+def downsample_minmax(x, y, max_points):
+    # keeps the min and max of each bucket (in time order), so spikes survive downsampling
+    if len(x) <= max_points:
+        return x, y
+    size = -(-len(y) // max(max_points // 2, 1))
+    buckets = np.pad(y, (0, -len(y) % size), mode="edge").reshape(-1, size)
+    offsets = np.arange(len(buckets)) * size
+    picks = np.concatenate([offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)])
+    picks = np.unique(np.minimum(picks, len(y) - 1))
+    return x[picks], y[picks]
+
+
+def lttb_indices(x, y, max_points):
+    # largest-triangle-three-buckets, for lines where the shape matters more than every extreme.
+    # one point per bucket: the one spanning the largest triangle with the point kept before it and
+    # the mean of the next bucket. x must be numeric and ascending; first and last are always kept
+    if len(x) <= max_points:
+        return np.arange(len(x))
+    xs = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    if max_points < 3:
+        return np.array([0, len(xs) - 1])[:max(max_points, 0)]
+    edges = np.linspace(1, len(xs) - 1, max_points - 1).astype(np.int64)
+    # mean of every inner bucket, for the bucket before it to aim at; the last point closes the line
+    sizes = np.diff(edges)
+    next_x = np.append(np.add.reduceat(xs[:-1], edges[:-1]) / sizes, xs[-1])[1:]
+    next_y = np.append(np.add.reduceat(ys[:-1], edges[:-1]) / sizes, ys[-1])[1:]
+    picks = np.empty(max_points, dtype=np.int64)
+    picks[0], picks[-1] = 0, len(xs) - 1
+    anchor = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = xs[anchor], ys[anchor]
+        areas = np.abs((ax - next_x[bucket]) * (ys[start:end] - ay) - (ax - xs[start:end]) * (next_y[bucket] - ay))
+        anchor = start + int(areas.argmax())
+        picks[bucket + 1] = anchor
+    return picks
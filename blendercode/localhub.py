@@ -0,0 +1,221 @@
+import datetime
+import json
+import random
+import threading
+import time
+import zlib
+
+# an in-process stand-in for Event Hub: LocalEventHub keeps per-partition event logs,
+# LocalConsumerClient exposes the parts of EventHubConsumerClient that EventHubReceiver uses,
+# and FakeESP32Fleet produces the payloads the ESP32 firmware and the joint MCUs send.
+
+
+class LocalEventData:
+    def __init__(self, body, device_id, partition_id, sequence_number):
+        self.body = body
+        self.sequence_number = sequence_number
+        self.offset = str(sequence_number)
+        self.partition_id = partition_id
+        self.enqueued_time = datetime.datetime.now(datetime.timezone.utc)
+        self.properties = {}
+        self.system_properties = {b"iothub-connection-device-id": device_id.encode()}
+
+    def body_as_str(self, encoding="UTF-8"):
+        return self.body
+
+
+class LocalPartitionContext:
+    def __init__(self, client, partition_id):
+        self.client = client
+        self.partition_id = partition_id
+        self.fully_qualified_namespace = client.fully_qualified_namespace
+        self.eventhub_name = client.hub.name
+        self.consumer_group = client.consumer_group
+        self.last_enqueued_event_properties = None
+        self.last_received_event = None
+
+    def update_checkpoint(self, event=None):
+        # like the SDK: without a checkpoint store this is a no-op, and no event means the last one received
+        event = event if event is not None else self.last_received_event
+        if self.client.checkpoint_store is None or event is None:
+            return
+        self.client.checkpoint_store.update_checkpoint({
+            "fully_qualified_namespace": self.fully_qualified_namespace,
+            "eventhub_name": self.eventhub_name,
+            "consumer_group": self.consumer_group,
+            "partition_id": self.partition_id,
+            "sequence_number": event.sequence_number,
+            "offset": event.offset,
+        })
+
+
+class LocalEventHub:
+    def __init__(self, name="local", partition_count=4):
+        self.name = name
+        self.partitions = [[] for _ in range(partition_count)]
+        self.condition = threading.Condition()
+
+    def partition_ids(self):
+        return [str(partition) for partition in range(len(self.partitions))]
+
+    def partition_for(self, device_id):
+        # like IoT Hub routing, a device always lands on the same partition
+        return zlib.crc32(device_id.encode()) % len(self.partitions)
+
+    def send(self, body, device_id, partition=None):
+        if partition is None:
+            partition = self.partition_for(device_id)
+        with self.condition:
+            log = self.partitions[partition]
+            log.append(LocalEventData(body, device_id, str(partition), len(log)))
+            self.condition.notify_all()
+
+    def send_many(self, messages):
+        # [(body, device_id), ...] under one lock/notify
+        with self.condition:
+            for body, device_id in messages:
+                partition = self.partition_for(device_id)
+                log = self.partitions[partition]
+                log.append(LocalEventData(body, device_id, str(partition), len(log)))
+            self.condition.notify_all()
+
+    def end_positions(self):
+        with self.condition:
+            return [len(log) for log in self.partitions]
+
+
+class LocalConsumerClient:
+    def __init__(self, hub, consumer_group="$Default", partition_ids=None, checkpoint_store=None):
+        self.hub = hub
+        self.consumer_group = consumer_group
+        self.partition_ids = partition_ids    # None means every partition
+        self.checkpoint_store = checkpoint_store
+        self.fully_qualified_namespace = "local"
+        self.closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.closed.set()
+        with self.hub.condition:
+            self.hub.condition.notify_all()
+
+    def get_partition_ids(self):
+        return self.hub.partition_ids()
+
+    def receive(self, on_event, starting_position="@latest", **kwargs):
+        def on_event_batch(context, events):
+            for event in events:
+                on_event(context, event)
+        self.receive_batch(on_event_batch, starting_position=starting_position, **kwargs)
+
+    def receive_batch(self, on_event_batch, max_batch_size=300, max_wait_time=None, starting_position="@latest", **kwargs):
+        partitions = [int(partition) for partition in (self.partition_ids or self.hub.partition_ids())]
+        positions = {partition: self.starting_index(partition, starting_position) for partition in partitions}
+        # as with the SDK, a stored checkpoint wins over starting_position
+        for checkpoint in self.list_checkpoints():
+            partition = int(checkpoint["partition_id"])
+            if partition in positions:
+                positions[partition] = checkpoint["sequence_number"] + 1
+        contexts = {partition: LocalPartitionContext(self, str(partition)) for partition in partitions}
+        idle_since = {partition: time.monotonic() for partition in partitions}
+
+        # one thread walks the partitions round-robin, as the sync SDK's EventProcessor.start does
+        while not self.closed.is_set():
+            delivered = False
+            for partition in partitions:
+                log = self.hub.partitions[partition]
+                start = positions[partition]
+                batch = log[start:start + max_batch_size]
+                if batch:
+                    positions[partition] = start + len(batch)
+                    idle_since[partition] = time.monotonic()
+                    contexts[partition].last_received_event = batch[-1]
+                    on_event_batch(contexts[partition], batch)
+                    delivered = True
+                elif max_wait_time is not None and time.monotonic() - idle_since[partition] >= max_wait_time:
+                    idle_since[partition] = time.monotonic()
+                    on_event_batch(contexts[partition], [])
+            if not delivered:
+                with self.hub.condition:
+                    if all(positions[partition] >= len(self.hub.partitions[partition]) for partition in partitions):
+                        self.hub.condition.wait(timeout=max_wait_time or 0.1)
+
+    def list_checkpoints(self):
+        if self.checkpoint_store is None:
+            return []
+        return self.checkpoint_store.list_checkpoints(self.fully_qualified_namespace, self.hub.name, self.consumer_group)
+
+    def starting_index(self, partition, starting_position):
+        if isinstance(starting_position, dict):
+            starting_position = starting_position.get(str(partition), "@latest")
+        if starting_position == "@latest":
+            return len(self.hub.partitions[partition])
+        if starting_position in ("-1", -1):
+            return 0
+        return int(starting_position)
+
+
+def joint_payload(rng, joints=4):
+    # what the joint MCUs push through IoT Hub: one JSON line per joint, two-decimal floats
+    lines = []
+    for joint in range(joints):
+        quat = [rng.gauss(0, 1) for _ in range(4)]
+        norm = sum(c * c for c in quat) ** 0.5
+        lines.append(json.dumps({"key": f"/joint/{joint}", "value": [round(c / norm, 2) for c in quat]}))
+    return "\n".join(lines)
+
+
+def bpm_payload(rng):
+    # generateTelemetryPayload() in Azure_IoT_Hub_ESP32copy.ino
+    return '{"key": "BPM", "value": %d}' % rng.randint(55, 120)
+
+
+class FakeESP32Fleet:
+    # one thread producing for many devices at fixed per-device rates (messages/sec).
+    # payloads come from a pre-generated pool so the producer stays cheap next to the consumer
+    def __init__(self, hub, devices=1, joint_rate=50.0, bpm_rate=1.0, tick=0.005, seed=0, pool_size=256):
+        self.hub = hub
+        self.devices = [f"esp32-{device:03d}" for device in range(devices)]
+        self.joint_rate = joint_rate
+        self.bpm_rate = bpm_rate
+        self.tick = tick
+        rng = random.Random(seed)
+        self.joint_pool = [joint_payload(rng) for _ in range(pool_size)]
+        self.bpm_pool = [bpm_payload(rng) for _ in range(pool_size)]
+        self.sent = 0
+        self.stop_signal = threading.Event()
+
+    def start_threaded(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_signal.set()
+        self.thread.join()
+
+    def run(self):
+        started = time.monotonic()
+        joint_sent = 0
+        bpm_sent = 0
+        while not self.stop_signal.is_set():
+            elapsed = time.monotonic() - started
+            joint_due = int(elapsed * self.joint_rate) - joint_sent
+            bpm_due = int(elapsed * self.bpm_rate) - bpm_sent
+            messages = []
+            for _ in range(max(joint_due, 0)):
+                messages.extend((self.joint_pool[(self.sent + i) % len(self.joint_pool)], device)
+                                for i, device in enumerate(self.devices))
+            for _ in range(max(bpm_due, 0)):
+                messages.extend((self.bpm_pool[(self.sent + i) % len(self.bpm_pool)], device)
+                                for i, device in enumerate(self.devices))
+            if messages:
+                self.hub.send_many(messages)
+                self.sent += len(messages)
+            joint_sent += max(joint_due, 0)
+            bpm_sent += max(bpm_due, 0)
+            time.sleep(self.tick)
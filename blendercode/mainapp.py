@@ -2,20 +2,65 @@ import sys
 import os
 import json
 import logging
+import time
 
 import bpy
-import numpy as np
 import serial
 
 sys.path.append(os.path.join(bpy.path.abspath("//"), "scripts"))
 
-from blenderport import UARTCommunicator
+from blenderport import PortManager
+from framepacing import FramePacer
+from jointfilter import JointFilter
+from jointstore import JointStore
+from motionfeatures import MotionFeatures
+from pipelinestats import pipeline_stats
+from posewriter import PoseWriter
+from recorder import SessionRecorder
+from replay import ReplaySource
+from sharedjoints import SharedJointStore
+from skeleton import Skeleton, VRM_ARMS
 
 MCU_PORT_RIGHT_ARM = "COM7"
 MCU_PORT_LEFT_ARM = "COM9"
 
-#FPS = 30        # use 30 if system performance is poor
+# boards running 9axisdata.ino (raw accel/gyro/mag, no DMP): port -> joint key they drive.
+# their ports are opened alongside the MCU ports and fused on the host, e.g. {"COM11": "/joint/2"}
+IMU_PORTS = {}
+
+# bone <- joint key mapping and hierarchy (see skeleton.py); swap in VRM_FULL_BODY,
+# your own list, or Skeleton.from_json(path) to drive more of the body
+SKELETON = VRM_ARMS
+
+# the timer adapts between these to the joint data rate and the measured cost of a frame
 FPS = 60
+MIN_FPS = 15
+# seconds between frame time summaries (log and status bar) and pipeline counter/latency summaries (log)
+FRAME_LOG_INTERVAL = 5.0
+
+# smooth and extrapolate joints between samples; the timer then always runs at FPS.
+# FILTER_LEAD predicts further ahead by a known transport latency (seconds): keep it at about
+# the serial link's latency, the filter alone lags behind the raw samples
+JOINT_FILTER = True
+FILTER_LEAD = 0.005
+
+# set to a new or empty folder (e.g. bpy.path.abspath("//sessions/arm01")) to record every joint sample;
+# a folder that already holds a session is refused rather than appended to
+RECORD_SESSION_DIR = None
+
+# set to a recorded session folder to drive the avatar without hardware;
+# REPLAY_SPEED 1.0 is real time, 10.0 ten times faster, None as fast as possible
+REPLAY_SESSION_DIR = None
+REPLAY_SPEED = 1.0
+
+# set to the --name of a running jointreceiver.py (e.g. "blender_joints", started with the same
+# skeleton) to take joints from that process through shared memory. Blender then does no serial
+# I/O or decoding at all; recording and motion features happen in the receiver (--record).
+# the timer re-attaches on its own when the receiver is restarted
+SHARED_MEMORY_NAME = None
+
+# seconds between copies of the per-joint activity metrics onto the armature's "motion_features" property
+FEATURE_INTERVAL = 0.5
 
 
 # set up logging
@@ -34,31 +79,58 @@ if not logger.handlers:
 # get scene armature object
 armature = bpy.data.objects["Armature"]
 
-# get the bones we need
-bone_root = armature.pose.bones.get("Root")
-bone_right_upper_arm = armature.pose.bones.get("J_Bip_R_UpperArm")
-bone_right_lower_arm = armature.pose.bones.get("J_Bip_R_LowerArm")
-bone_left_upper_arm = armature.pose.bones.get("J_Bip_L_UpperArm")
-bone_left_lower_arm = armature.pose.bones.get("J_Bip_L_LowerArm")
-
-uart_table_right_arm = blenderport(MCU_PORT_RIGHT_ARM, logging_level=logging.DEBUG)
-uart_table_left_arm = blenderport(MCU_PORT_LEFT_ARM, logging_level=logging.DEBUG)
-
-def setBoneRotation(bone, rotation):
-    w, x, y, z = rotation
-    bone.rotation_quaternion[0] = w
-    bone.rotation_quaternion[1] = x
-    bone.rotation_quaternion[2] = y
-    bone.rotation_quaternion[3] = z
-
-def multiply_quaternions(q1, q0):
-    w0, x0, y0, z0 = q0
-    w1, x1, y1, z1 = q1
-    return np.array([-x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0,
-                     x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0,
-                     -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0,
-                     x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0], dtype=np.float64)
-                     
+skeleton = Skeleton(SKELETON)
+
+# bones are looked up once here and written in bulk, skipping frames where none moved noticeably
+pose_writer = PoseWriter(armature, skeleton.bones)
+
+# every MCU writes into one store, in skeleton order, so the timer reads all joints in a single snapshot
+if SHARED_MEMORY_NAME:
+    joint_store = SharedJointStore.attach(SHARED_MEMORY_NAME)
+    if joint_store.keys != tuple(skeleton.keys):
+        raise ValueError(f"{SHARED_MEMORY_NAME} publishes {joint_store.keys}, the skeleton needs {skeleton.keys}")
+else:
+    joint_store = JointStore(skeleton.keys)
+
+session_recorder = SessionRecorder(RECORD_SESSION_DIR) if RECORD_SESSION_DIR and not SHARED_MEMORY_NAME else None
+
+# angular velocity, range of motion and rep counts per joint, updated as every sample arrives
+motion_features = MotionFeatures()
+
+if SHARED_MEMORY_NAME:
+    joint_source = None
+elif REPLAY_SESSION_DIR:
+    joint_source = ReplaySource(REPLAY_SESSION_DIR, speed=REPLAY_SPEED, loop=True, logging_level=logging.DEBUG, store=joint_store,
+                                sinks=[motion_features])
+else:
+    # one thread services every MCU port; missing ports are retried in the background
+    joint_source = PortManager([MCU_PORT_RIGHT_ARM, MCU_PORT_LEFT_ARM, *IMU_PORTS], logging_level=logging.DEBUG,
+                               store=joint_store, imu_keys=IMU_PORTS,
+                               sinks=[session_recorder, motion_features] if session_recorder else [motion_features])
+
+joint_filter = JointFilter(len(joint_store.keys), lead=FILTER_LEAD) if JOINT_FILTER else None
+
+
+def reattach_joint_store():
+    # the receiver stopped or was replaced: the last pose stays until its new block is up
+    global joint_store
+    joint_store.close()
+    store = SharedJointStore.reattach(SHARED_MEMORY_NAME, joint_store.keys)
+    if store is None:
+        return False
+    joint_store = store
+    logger.info("Re-attached to %s.", SHARED_MEMORY_NAME)
+    return True
+
+
+def publish_motion_features():
+    # exposed as a custom property so drivers and UI panels can show reps and range of motion
+    armature["motion_features"] = {
+        key: {"reps": features.reps, "range_of_motion": features.range_of_motion,
+              "angular_velocity": features.angular_velocity_ema, "motion_state": features.motion_state_ema}
+        for (_, key), features in motion_features.all_features().items()
+    }
+
 
 class ModalTimerOperator(bpy.types.Operator):
     # we need these two fields for Blender
@@ -66,6 +138,12 @@ class ModalTimerOperator(bpy.types.Operator):
     bl_label = "Modal Timer Operator"
     
     _timer = None
+    _generation = -1
+    _sequence = None
+    _started = 0.0
+    _features_published = 0.0
+    _frames_logged = 0.0
+    _pacer = None
     
     def modal(self, context, event):
         if event.type == "ESC":
@@ -74,59 +152,89 @@ class ModalTimerOperator(bpy.types.Operator):
     
         if event.type == "TIMER":
             # this will eval true every Timer delay seconds
-            quat_right_upper = uart_table_right_arm.get("/joint/0")
-            quat_right_lower = uart_table_right_arm.get("/joint/1")
-            quat_left_upper = uart_table_left_arm.get('/joint/2')
-            quat_left_lower = uart_table_left_arm.get('/joint/3')
-            
-            if not quat_right_upper or not quat_right_lower or not quat_left_upper or not quat_left_lower:
-                logger.warning("Invalid joint data")
-                return {"PASS_THROUGH"}
-            
-            # convert data to numpy arrays
-            quat_right_upper = np.array(quat_right_upper)
-            quat_right_lower = np.array(quat_right_lower)
-            quat_left_upper = np.array(quat_left_upper)
-            quat_left_lower = np.array(quat_left_lower)
-                        
-            # get inverse transformation of right upper arm
-            quat_right_upper_inv = quat_right_upper * np.array([1, -1, -1, -1])
-            
-            # rotate right lower arm relative to right upper arm
-            quat_right_lower_rel = multiply_quaternions(quat_right_upper_inv, quat_right_lower)
-
-            # get inverse transformation of left upper arm
-            quat_left_upper_inv = quat_left_upper * np.array([1, -1, -1, -1])
-            
-            # rotate left lower arm relative to left upper arm
-            quat_left_lower_rel = multiply_quaternions(quat_left_upper_inv, quat_left_lower)
-            
-            # apply transformation
-            setBoneRotation(bone_right_upper_arm, quat_right_upper)
-            setBoneRotation(bone_right_lower_arm, quat_right_lower_rel)
-
-            # if refresh rate is too low, uncomment this line to force Blender to render viewport
-#            bpy.ops.wm.redraw_timer(type="DRAW_WIN_SWAP", iterations=1)
+            started = time.perf_counter()
+            updated = self.update_bones()
+            self._pacer.frame(time.perf_counter() - started, updated)
+
+            now = time.monotonic()
+            if now - self._features_published >= FEATURE_INTERVAL:
+                self._features_published = now
+                publish_motion_features()
+            if now - self._frames_logged >= FRAME_LOG_INTERVAL:
+                self._frames_logged = now
+                summary = self._pacer.summary()
+                logger.info("BlenderTimer %s.", summary)
+                logger.info("Pipeline %s.", pipeline_stats.summary(reset=True))
+                context.workspace.status_text_set("Joint update: " + summary)
+
+            interval = self._pacer.next_interval()
+            if interval is not None:
+                context.window_manager.event_timer_remove(self._timer)
+                self._timer = context.window_manager.event_timer_add(interval, window=context.window)
     
         return {"PASS_THROUGH"}
 
+    def update_bones(self):
+        if SHARED_MEMORY_NAME and joint_store.closed and not reattach_joint_store():
+            return False
+        snapshot = joint_store.snapshot()
+        
+        if not snapshot.sequence.all():
+            pipeline_stats.count("apply.invalid_frames")
+            logger.warning("Invalid joint data")
+            return False
+        
+        if joint_filter is not None:
+            # the filter moves the bones between samples too, so every frame is rendered
+            quats = joint_filter.update(snapshot, time.monotonic())
+        else:
+            # skip the bone writes if nothing arrived since the last frame
+            if snapshot.generation == self._generation:
+                pipeline_stats.count("apply.stale_frames")
+                return False
+            self._generation = snapshot.generation
+            self._pacer.arrival(snapshot.sequence, snapshot.timestamps)
+            quats = snapshot.values
+                    
+        # every bone relative to its parent's sensor, for the whole skeleton in one batch
+        rotations = skeleton.solve(quats)
+        
+        # apply transformation; below the angular threshold nothing is written and nothing redraws
+        written = pose_writer.write(rotations) > 0
+
+        # arrival -> bone latency of the samples new since the last frame
+        fresh = snapshot.sequence != self._sequence if self._sequence is not None else snapshot.sequence > 0
+        self._sequence = snapshot.sequence
+        pipeline_stats.applied(snapshot.timestamps[fresh])
+        return written
+
     def execute(self, context):
-        # update rate is 0.01 second
-        self._timer = context.window_manager.event_timer_add(1./FPS, window=context.window)
+        self._pacer = FramePacer(max_fps=FPS, min_fps=MIN_FPS)
+        self._timer = context.window_manager.event_timer_add(self._pacer.interval, window=context.window)
+        self._started = time.monotonic()
         context.window_manager.modal_handler_add(self)
         return {"RUNNING_MODAL"}
         
     def cancel(self, context):
-        uart_table_right_arm.stop()
-        uart_table_left_arm.stop()
+        if joint_source:
+            joint_source.stop()
+        if SHARED_MEMORY_NAME:
+            joint_store.close()
+        if session_recorder:
+            session_recorder.close()
         
         # reset joint position
-        setBoneRotation(bone_right_upper_arm, [1, 0, 0, 0])
-        setBoneRotation(bone_right_lower_arm, [1, 0, 0, 0])
-        setBoneRotation(bone_left_upper_arm, [1, 0, 0, 0])
-        setBoneRotation(bone_left_lower_arm, [1, 0, 0, 0])
+        pose_writer.reset()
         context.window_manager.event_timer_remove(self._timer)
-        logger.info("BlenderTimer Stopped.")
+        context.workspace.status_text_set(None)
+        elapsed = time.monotonic() - self._started
+        for (source, key), features in sorted(motion_features.all_features().items(), key=str):
+            logger.info("%s %s: %d reps, range of motion %.2f rad.", source, key, features.reps, features.range_of_motion)
+        frames = self._pacer.frames
+        logger.info("Pipeline %s.", pipeline_stats.summary())
+        logger.info("BlenderTimer Stopped after %d frames (%.1f fps, %d with bone writes, %d skipped below threshold); %s.",
+                    frames, frames / elapsed if elapsed else 0.0, self._pacer.updated, pose_writer.skipped,
+                    self._pacer.summary())
         return {"CANCELLED"}
 
 
@@ -135,15 +243,14 @@ if __name__ == "__main__":
         logger.info("Starting services.")
         bpy.utils.register_class(ModalTimerOperator)
         
-        # uart_table.start()
-        uart_table_right_arm.startThreaded()
-        uart_table_left_arm.startThreaded()
+        if joint_source:
+            joint_source.start_threaded()
         
         # start Blender timer
         bpy.ops.wm.modal_timer_operator()
         
         logger.info("All started.")
     except KeyboardInterrupt:
-        uart_table_right_arm.stop()
-        uart_table_left_arm.stop()
+        if joint_source:
+            joint_source.stop()
         logger.info("Received KeyboardInterrupt, stopped.")
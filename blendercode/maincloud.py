@@ -2,18 +2,46 @@ import sys
 import os
 import logging
 import time
-import numpy as np
 import bpy
 
 # Ensure the current directory is in the sys.path
 sys.path.append(os.path.join(bpy.path.abspath("//"), "scripts"))
 
 
-from blendercloud import data_table, EventHubReceiver
+from blendercloud import joint_store, EventHubReceiver
+from framepacing import FramePacer
+from jointfilter import JointFilter
+from pipelinestats import pipeline_stats
+from posewriter import PoseWriter
+from recorder import SessionRecorder
+from sharedjoints import SharedJointStore
+from skeleton import Skeleton, VRM_RIGHT_ARM
 
 CONNECTION_STR = "key"
 EVENTHUB_NAME = "name"
+
+# The timer adapts between these to the joint data rate and the measured cost of a frame
 FPS = 60
+MIN_FPS = 15
+
+# Seconds between frame time summaries (log and status bar) and pipeline summaries
+# (events/sec, transport, decode, store and apply latency) in the log
+STATS_LOG_INTERVAL = 5.0
+
+# Bone <- joint key mapping and hierarchy (see skeleton.py)
+SKELETON = VRM_RIGHT_ARM
+
+# Smooth and extrapolate joints between the (slower, burstier) cloud samples;
+# FILTER_LEAD predicts further ahead to make up for the IoT Hub -> Event Hub latency (seconds)
+JOINT_FILTER = True
+FILTER_LEAD = 0.05
+
+# Set to a new or empty folder (e.g. bpy.path.abspath("//sessions/cloud01")) to record every joint sample
+RECORD_SESSION_DIR = None
+
+# Set to the --name of a running `jointreceiver.py cloud ...` (e.g. "blender_joints") to keep the
+# Event Hub client and JSON decoding out of Blender; joints then arrive through shared memory
+SHARED_MEMORY_NAME = None
 
 # Set up logging
 logger = logging.getLogger("BPY")
@@ -29,25 +57,27 @@ if not logger.handlers:
 # Get scene armature object
 armature = bpy.data.objects["Armature"]
 
-# Get the bones we need
-bone_root = armature.pose.bones.get("Root")
-bone_right_upper_arm = armature.pose.bones.get("J_Bip_R_UpperArm")
-bone_right_lower_arm = armature.pose.bones.get("J_Bip_R_LowerArm")
+if SHARED_MEMORY_NAME:
+    joint_store = SharedJointStore.attach(SHARED_MEMORY_NAME)
+
+# Resolve the bones and the store slots feeding them once
+skeleton = Skeleton(SKELETON)
+skeleton_slots = skeleton.slots(joint_store)
+pose_writer = PoseWriter(armature, skeleton.bones)
 
-def setBoneRotation(bone, rotation):
-    w, x, y, z = rotation
-    bone.rotation_quaternion[0] = w
-    bone.rotation_quaternion[1] = x
-    bone.rotation_quaternion[2] = y
-    bone.rotation_quaternion[3] = z
+joint_filter = JointFilter(len(joint_store.keys), lead=FILTER_LEAD) if JOINT_FILTER else None
 
-def multiply_quaternions(q1, q0):
-    w0, x0, y0, z0 = q0
-    w1, x1, y1, z1 = q1
-    return np.array([-x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0,
-                     x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0,
-                     -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0,
-                     x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0], dtype=np.float64)
+
+def reattach_joint_store():
+    # The receiver stopped or was replaced: the last pose stays until its new block is up
+    global joint_store
+    joint_store.close()
+    store = SharedJointStore.reattach(SHARED_MEMORY_NAME, joint_store.keys)
+    if store is None:
+        return False
+    joint_store = store
+    logger.info("Re-attached to %s.", SHARED_MEMORY_NAME)
+    return True
 
 
 class ModalTimerOperator(bpy.types.Operator):
@@ -56,6 +86,11 @@ class ModalTimerOperator(bpy.types.Operator):
     bl_label = "Modal Timer Operator"
     
     _timer = None
+    _generation = -1
+    _sequence = None
+    _stats_logged = 0.0
+    _started = 0.0
+    _pacer = None
     
     def modal(self, context, event):
         if event.type == "ESC":
@@ -64,43 +99,83 @@ class ModalTimerOperator(bpy.types.Operator):
     
         if event.type == "TIMER":
             # This will eval true every Timer delay seconds
-            quat_right_upper = data_table.get("/joint/0")
-            quat_right_lower = data_table.get("/joint/1")
-            
-            if not quat_right_upper or not quat_right_lower:
-                logger.warning("Invalid joint data")
-                return {"PASS_THROUGH"}
-            
-            # Convert data to numpy arrays
-            quat_right_upper = np.array(quat_right_upper)
-            quat_right_lower = np.array(quat_right_lower)
-            
-            # get inverse transformation of right upper arm
-            quat_right_upper_inv = quat_right_upper * np.array([1, -1, -1, -1])
-            
-            # rotate right lower arm relative to right upper arm
-            quat_right_lower_rel = multiply_quaternions(quat_right_upper_inv, quat_right_lower)
-
-            # apply transformation
-            setBoneRotation(bone_right_upper_arm, quat_right_upper)
-            setBoneRotation(bone_right_lower_arm, quat_right_lower_rel)
+            started = time.perf_counter()
+            updated = self.update_bones()
+            self._pacer.frame(time.perf_counter() - started, updated)
+
+            now = time.monotonic()
+            if now - self._stats_logged >= STATS_LOG_INTERVAL:
+                self._stats_logged = now
+                summary = self._pacer.summary()
+                logger.info("BlenderTimer %s.", summary)
+                logger.info("Pipeline %s.", pipeline_stats.summary(reset=True))
+                context.workspace.status_text_set("Joint update: " + summary)
+
+            interval = self._pacer.next_interval()
+            if interval is not None:
+                context.window_manager.event_timer_remove(self._timer)
+                self._timer = context.window_manager.event_timer_add(interval, window=context.window)
     
         return {"PASS_THROUGH"}
 
+    def update_bones(self):
+        if SHARED_MEMORY_NAME and joint_store.closed and not reattach_joint_store():
+            return False
+        snapshot = joint_store.snapshot()
+        sequence = snapshot.sequence[skeleton_slots]
+        
+        if not sequence.all():
+            pipeline_stats.count("apply.invalid_frames")
+            logger.warning("Invalid joint data")
+            return False
+        
+        if joint_filter is not None:
+            # The filter moves the bones between samples too, so every frame is rendered
+            quats = joint_filter.update(snapshot, time.monotonic())[skeleton_slots]
+        else:
+            # Skip the bone writes if nothing arrived since the last frame
+            if snapshot.generation == self._generation:
+                pipeline_stats.count("apply.stale_frames")
+                return False
+            self._generation = snapshot.generation
+            self._pacer.arrival(sequence, snapshot.timestamps[skeleton_slots])
+            quats = snapshot.values[skeleton_slots]
+        
+        # Every bone relative to its parent's sensor, in one batch, then one bulk write;
+        # below the angular threshold nothing is written and nothing redraws
+        written = pose_writer.write(skeleton.solve(quats)) > 0
+
+        # Arrival -> bone latency of the samples new since the last frame
+        fresh = sequence != self._sequence if self._sequence is not None else sequence > 0
+        self._sequence = sequence
+        pipeline_stats.applied(snapshot.timestamps[skeleton_slots][fresh])
+        return written
+
     def execute(self, context):
-        # Update rate is 0.01 second
-        self._timer = context.window_manager.event_timer_add(1./FPS, window=context.window)
+        # The timer starts at FPS and follows the Event Hub's data rate and the cost of a frame from there
+        self._pacer = FramePacer(max_fps=FPS, min_fps=MIN_FPS)
+        self._timer = context.window_manager.event_timer_add(self._pacer.interval, window=context.window)
+        self._started = time.monotonic()
         context.window_manager.modal_handler_add(self)
         return {"RUNNING_MODAL"}
         
     def cancel(self, context):
-        eventhub_receiver.stop()
+        if eventhub_receiver:
+            eventhub_receiver.stop()
+        if SHARED_MEMORY_NAME:
+            joint_store.close()
+        if session_recorder:
+            session_recorder.close()
         
         # Reset joint position
-        setBoneRotation(bone_right_upper_arm, [1, 0, 0, 0])
-        setBoneRotation(bone_right_lower_arm, [1, 0, 0, 0])
+        pose_writer.reset()
         context.window_manager.event_timer_remove(self._timer)
-        logger.info("BlenderTimer Stopped.")
+        context.workspace.status_text_set(None)
+        elapsed = time.monotonic() - self._started
+        frames = self._pacer.frames
+        logger.info("Pipeline %s.", pipeline_stats.summary())
+        logger.info("BlenderTimer Stopped after %d frames (%.1f fps, %d with bone writes); %s.",
+                    frames, frames / elapsed if elapsed else 0.0, self._pacer.updated, self._pacer.summary())
         return {"CANCELLED"}
 
 
@@ -109,13 +184,18 @@ if __name__ == "__main__":
         logger.info("Starting services.")
         bpy.utils.register_class(ModalTimerOperator)
         
-        eventhub_receiver = EventHubReceiver(CONNECTION_STR, EVENTHUB_NAME)
-        eventhub_receiver.startThreaded()
+        session_recorder = None
+        eventhub_receiver = None
+        if not SHARED_MEMORY_NAME:
+            session_recorder = SessionRecorder(RECORD_SESSION_DIR) if RECORD_SESSION_DIR else None
+            eventhub_receiver = EventHubReceiver(CONNECTION_STR, EVENTHUB_NAME, sinks=[session_recorder] if session_recorder else ())
+            eventhub_receiver.startThreaded()
         
         # Start Blender timer
         bpy.ops.wm.modal_timer_operator()
         
         logger.info("All started.")
     except KeyboardInterrupt:
-        eventhub_receiver.stop()
+        if eventhub_receiver:
+            eventhub_receiver.stop()
         logger.info("Received KeyboardInterrupt, stopped.")
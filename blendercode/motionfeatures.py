@@ -0,0 +1,147 @@
+import collections
+import math
+import threading
+
+EMA_SECONDS = 0.5           # time constant of the fast averages
+BASELINE_SECONDS = 5.0      # time constant of the rep-counting baseline
+ROM_WINDOW_SECONDS = 10.0   # range of motion is measured over roughly this much history
+ROM_BUCKETS = 10            # min/max buckets making up the range-of-motion window
+VELOCITY_SECONDS = 0.02     # differentiate over at least this long so sensor noise doesn't dominate
+REP_THRESHOLD = 0.35        # radians of motion state above/below the baseline that count as a rep
+MAX_FEATURE_KEYS = 256      # new (source, key) pairs beyond this are ignored
+
+JointFeatures = collections.namedtuple("JointFeatures", [
+    "motion_state",             # norm of the Euler angles, same as motionstate.compute_motion_state
+    "motion_state_ema",
+    "angular_velocity",         # rad/s over the last VELOCITY_SECONDS
+    "angular_velocity_ema",
+    "range_of_motion",          # max - min motion state over the last ROM_WINDOW_SECONDS
+    "reps",
+    "samples",
+    "timestamp",
+])
+
+
+def motion_state_of(w, x, y, z):
+    # one unit quaternion's motion state, same as motionstate.compute_motion_state
+    roll = math.atan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    pitch = math.asin(max(-1.0, min(1.0, 2.0 * (w * y - z * x))))
+    yaw = math.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return math.sqrt(roll * roll + pitch * pitch + yaw * yaw)
+
+
+class _JointTracker:
+    # O(1) work and fixed memory per sample; scalar math beats NumPy at one quaternion at a time
+    __slots__ = ("reference", "reference_time", "timestamp", "samples", "motion_state",
+                 "motion_state_ema", "baseline", "angular_velocity", "angular_velocity_ema", "bucket_start", "bucket",
+                 "bucket_min", "bucket_max", "above", "reps")
+
+    def __init__(self):
+        self.reference = None
+        self.reference_time = 0.0
+        self.timestamp = 0.0
+        self.samples = 0
+        self.motion_state = 0.0
+        self.motion_state_ema = 0.0
+        self.baseline = 0.0
+        self.angular_velocity = 0.0
+        self.angular_velocity_ema = 0.0
+        self.bucket_start = 0.0
+        self.bucket = 0
+        self.bucket_min = [math.inf] * ROM_BUCKETS
+        self.bucket_max = [-math.inf] * ROM_BUCKETS
+        self.above = False
+        self.reps = 0
+
+    def update(self, quat, timestamp):
+        w, x, y, z = quat
+        norm = math.sqrt(w * w + x * x + y * y + z * z)
+        if norm == 0.0:
+            return
+        w, x, y, z = w / norm, x / norm, y / norm, z / norm
+        state = motion_state_of(w, x, y, z)
+
+        if self.reference is None:
+            self.motion_state_ema = self.baseline = state
+            self.bucket_start = self.reference_time = timestamp
+            self.reference = (w, x, y, z)
+        else:
+            dt = timestamp - self.timestamp
+            if dt > 0.0:
+                # time-based smoothing, so irregular arrival rates give the same response
+                alpha = 1.0 - math.exp(-dt / EMA_SECONDS)
+                self.motion_state_ema += alpha * (state - self.motion_state_ema)
+                self.baseline += (1.0 - math.exp(-dt / BASELINE_SECONDS)) * (state - self.baseline)
+
+            dt = timestamp - self.reference_time
+            if dt >= VELOCITY_SECONDS:
+                rw, rx, ry, rz = self.reference
+                dot = min(abs(w * rw + x * rx + y * ry + z * rz), 1.0)
+                self.angular_velocity = 2.0 * math.acos(dot) / dt
+                alpha = 1.0 - math.exp(-dt / EMA_SECONDS)
+                self.angular_velocity_ema += alpha * (self.angular_velocity - self.angular_velocity_ema)
+                self.reference = (w, x, y, z)
+                self.reference_time = timestamp
+
+        # rotate to a fresh bucket once the current one covers its share of the window
+        if timestamp - self.bucket_start >= ROM_WINDOW_SECONDS / ROM_BUCKETS:
+            self.bucket = (self.bucket + 1) % ROM_BUCKETS
+            self.bucket_min[self.bucket] = math.inf
+            self.bucket_max[self.bucket] = -math.inf
+            self.bucket_start = timestamp
+        if state < self.bucket_min[self.bucket]:
+            self.bucket_min[self.bucket] = state
+        if state > self.bucket_max[self.bucket]:
+            self.bucket_max[self.bucket] = state
+
+        # a rep is one excursion above the baseline and back, with hysteresis against noise
+        if not self.above and state > self.baseline + REP_THRESHOLD:
+            self.above = True
+        elif self.above and state < self.baseline - REP_THRESHOLD:
+            self.above = False
+            self.reps += 1
+
+        self.timestamp = timestamp
+        self.motion_state = state
+        self.samples += 1
+
+    def features(self):
+        return JointFeatures(
+            self.motion_state, self.motion_state_ema, self.angular_velocity, self.angular_velocity_ema,
+            max(self.bucket_max) - min(self.bucket_min) if self.samples else 0.0,
+            self.reps, self.samples, self.timestamp,
+        )
+
+
+class MotionFeatures:
+    # receiver sink maintaining rolling activity metrics per (source, joint), so the Blender
+    # script and the dashboard read current values instead of recomputing from raw history
+    def __init__(self):
+        self.trackers = {}
+        self.lock = threading.Lock()
+
+    def push(self, key, value, timestamp, source=None):
+        if not key.startswith("/joint/"):
+            return
+        tracker = self.trackers.get((source, key))
+        if tracker is None:
+            if len(self.trackers) >= MAX_FEATURE_KEYS:
+                return
+            tracker = _JointTracker()
+            with self.lock:
+                self.trackers[(source, key)] = tracker
+        with self.lock:
+            try:
+                tracker.update(value, timestamp)
+            except (ValueError, TypeError):
+                pass
+
+    def features(self, source=None):
+        # {key: JointFeatures} for one source (None is the default for single-source setups)
+        with self.lock:
+            return {key: tracker.features() for (tracker_source, key), tracker in self.trackers.items()
+                    if tracker_source == source}
+
+    def all_features(self):
+        with self.lock:
+            return {source_key: tracker.features() for source_key, tracker in self.trackers.items()}
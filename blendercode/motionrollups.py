@@ -0,0 +1,202 @@
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+from livebuffers import RingBuffer
+from motionfeatures import motion_state_of
+
+RESOLUTIONS = (1.0, 60.0)                       # seconds per bucket of each tier, finest first
+CAPACITIES = (6 * 3600, 14 * 24 * 60)           # closed buckets kept per joint: 6 h of seconds, 2 weeks of minutes
+MAX_POINTS = 2000       # buckets series() returns at most, whatever the range
+MAX_ROLLUP_KEYS = 256   # new (source, key) pairs beyond this are ignored
+
+# bucket start times (wall-clock seconds) with the motion state mean/min/max and sample count per bucket
+MotionSeries = collections.namedtuple("MotionSeries", ["time", "mean", "min", "max", "count"])
+
+MotionSummary = collections.namedtuple("MotionSummary", ["count", "mean", "min", "max", "start", "end"])
+
+
+class _Tier:
+    # closed buckets of one resolution in a ring of (count, total, min, max) rows; the open bucket
+    # is plain floats, so a sample costs a few float operations and a bucket one row write.
+    # starts are monotonic seconds, aligned so that start + offset (wall clock) is a whole bucket
+    __slots__ = ("resolution", "offset", "ring", "start", "count", "total", "minimum", "maximum")
+
+    def __init__(self, resolution, capacity, start, offset):
+        self.resolution = resolution
+        self.offset = offset
+        self.ring = RingBuffer(capacity, 4)
+        self.open(start)
+
+    def open(self, start):
+        self.start = start - (start + self.offset) % self.resolution
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, start, count, total, minimum, maximum):
+        # one sample (count 1) or a closed bucket of a finer tier; returns the bucket this closed, if any.
+        # late samples (out of order across partitions) land in the open bucket
+        closed = None
+        if start >= self.start + self.resolution:
+            closed = self.row()
+            if self.count:
+                self.ring.append(self.start, closed[1:])
+            self.open(start)
+        self.count += count
+        self.total += total
+        if minimum < self.minimum:
+            self.minimum = minimum
+        if maximum > self.maximum:
+            self.maximum = maximum
+        return closed if closed is not None and closed[1] else None
+
+    def row(self):
+        return self.start, self.count, self.total, self.minimum, self.maximum
+
+    def oldest(self):
+        # start of the oldest bucket still held, or None while nothing was overwritten
+        ring = self.ring
+        return ring.times[ring.next] if ring.count == len(ring.times) else None
+
+
+class _JointRollup:
+    __slots__ = ("tiers", "count", "total", "minimum", "maximum", "first", "last")
+
+    def __init__(self, timestamp, offset):
+        self.tiers = [_Tier(resolution, capacity, timestamp, offset)
+                      for resolution, capacity in zip(RESOLUTIONS, CAPACITIES)]
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.first = timestamp
+        self.last = timestamp
+
+    def update(self, quat, timestamp):
+        w, x, y, z = quat
+        norm = math.sqrt(w * w + x * x + y * y + z * z)
+        if norm == 0.0:
+            return
+        state = motion_state_of(w / norm, x / norm, y / norm, z / norm)
+
+        # each tier is fed the buckets the finer one closes, never the samples
+        closed = self.tiers[0].add(timestamp, 1, state, state, state)
+        for tier in self.tiers[1:]:
+            if closed is None:
+                break
+            closed = tier.add(*closed)
+
+        self.count += 1
+        self.total += state
+        if state < self.minimum:
+            self.minimum = state
+        if state > self.maximum:
+            self.maximum = state
+        if timestamp > self.last:
+            self.last = timestamp
+
+    def rows(self, level):
+        # (starts, (n, 4) count/total/min/max) of one tier, oldest first, ending with the open bucket
+        # with whatever the finer tiers still hold open merged in
+        times, values = self.tiers[level].ring.ordered()
+        start, count, total, minimum, maximum = self.tiers[level].row()
+        for tier in self.tiers[:level]:
+            count += tier.count
+            total += tier.total
+            minimum = min(minimum, tier.minimum)
+            maximum = max(maximum, tier.maximum)
+        if count:
+            times = np.append(times, start)
+            values = np.vstack([values, [count, total, minimum, maximum]])
+        return times, values
+
+
+def merge_rows(times, values, max_points):
+    # equal-count groups of buckets merged into one each: counts and totals add, min and max of the
+    # group, so peaks survive however far a long range is reduced
+    if max_points is None or len(times) <= max_points:
+        return times, values
+    size = -(-len(times) // max_points)
+    pad = -len(times) % size
+    groups = len(times) // size + bool(pad)
+    counts = np.pad(values[:, 0], (0, pad)).reshape(groups, size)
+    totals = np.pad(values[:, 1], (0, pad)).reshape(groups, size)
+    minima = np.pad(values[:, 2], (0, pad), constant_values=np.inf).reshape(groups, size)
+    maxima = np.pad(values[:, 3], (0, pad), constant_values=-np.inf).reshape(groups, size)
+    merged = np.column_stack([counts.sum(axis=1), totals.sum(axis=1), minima.min(axis=1), maxima.max(axis=1)])
+    return times[::size], merged
+
+
+class MotionRollups:
+    # receiver sink rolling the motion state of every (source, joint) up into per-second and
+    # per-minute buckets plus totals for the whole session. charts read a bounded series() for
+    # any time range instead of raw samples, so drawing costs the same after a minute or a week.
+    def __init__(self):
+        self.joints = {}
+        self.lock = threading.Lock()
+        # receivers stamp samples with time.monotonic(); series and summaries carry wall-clock times,
+        # and buckets start on whole wall-clock seconds and minutes
+        self.wall_offset = time.time() - time.monotonic()
+
+    def push(self, key, value, timestamp, source=None):
+        if not key.startswith("/joint/"):
+            return
+        with self.lock:
+            joint = self.joints.get((source, key))
+            if joint is None:
+                if len(self.joints) >= MAX_ROLLUP_KEYS:
+                    return
+                joint = self.joints[(source, key)] = _JointRollup(timestamp, self.wall_offset)
+            try:
+                joint.update(value, timestamp)
+            except (ValueError, TypeError):
+                pass
+
+    def sources(self):
+        with self.lock:
+            return sorted({source for source, _ in self.joints}, key=str)
+
+    def keys(self, source=None):
+        with self.lock:
+            return sorted(key for joint_source, key in self.joints if joint_source == source)
+
+    def series(self, source, key, start=None, end=None, max_points=MAX_POINTS):
+        # buckets between start and end (wall-clock seconds, None for the whole session) from the
+        # finest tier still holding start, merged down to max_points (None keeps every bucket)
+        with self.lock:
+            joint = self.joints.get((source, key))
+            if joint is None:
+                return MotionSeries(*(np.empty(0) for _ in MotionSeries._fields))
+            first = joint.first if start is None else max(start - self.wall_offset, joint.first)
+            level = next((level for level, tier in enumerate(joint.tiers)
+                          if tier.oldest() is None or tier.oldest() <= first), len(joint.tiers) - 1)
+            times, values = joint.rows(level)
+
+        keep = times + RESOLUTIONS[level] > first
+        if end is not None:
+            keep &= times < end - self.wall_offset
+        times, values = merge_rows(times[keep], values[keep], max_points)
+        return MotionSeries(times + self.wall_offset, values[:, 1] / values[:, 0], values[:, 2], values[:, 3],
+                            values[:, 0].astype(np.int64))
+
+    def summary(self, source, key, start=None, end=None):
+        # the whole session from the running totals, or a range (e.g. one Sport Timer session)
+        # at the resolution of the finest tier still holding it
+        if start is None and end is None:
+            with self.lock:
+                joint = self.joints.get((source, key))
+                if joint is None or not joint.count:
+                    return None
+                return MotionSummary(joint.count, joint.total / joint.count, joint.minimum, joint.maximum,
+                                     joint.first + self.wall_offset, joint.last + self.wall_offset)
+        series = self.series(source, key, start, end, max_points=None)
+        count = int(series.count.sum())
+        if not count:
+            return None
+        return MotionSummary(count, float((series.mean * series.count).sum() / count), float(series.min.min()),
+                             float(series.max.max()), float(series.time[0]), float(series.time[-1]))
@@ -0,0 +1,54 @@
+import numpy as np
+
+import quatmath
+from livebuffers import lttb_indices
+
+EULER_COLUMNS = ["roll", "pitch", "yaw"]
+MAX_PLOT_POINTS = 2000  # points drawn per joint, however long the session
+
+
+def compute_motion_state(df):
+    # adds roll/pitch/yaw and motion_state (norm of the Euler angles) column-wise in one pass
+    df = df.copy()
+    euler = quatmath.to_euler(df[["w", "x", "y", "z"]].to_numpy(dtype=np.float64))
+    df[EULER_COLUMNS] = euler
+    df["motion_state"] = np.sqrt(np.einsum("ij,ij->i", euler, euler))
+    return df
+
+
+def motion_state_by_joint(df):
+    # one groupby instead of a boolean mask per joint
+    return df.groupby("JointKey", sort=False)
+
+
+def _plot_x(times):
+    # LTTB needs numbers; datetimes go in as nanoseconds, anything else by position
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.view(np.int64)
+    if np.issubdtype(times.dtype, np.number):
+        return times
+    return np.arange(len(times))
+
+
+def downsample_motion_state(times, states, max_points=MAX_PLOT_POINTS):
+    # one joint's series reduced to max_points with LTTB, so peaks and turns keep their shape
+    if max_points is None or len(times) <= max_points:
+        return times, states
+    x = _plot_x(times)
+    if (np.diff(x) < 0).any():
+        order = np.argsort(x, kind="stable")
+        times, states, x = times[order], states[order], x[order]
+    picks = lttb_indices(x, states, max_points)
+    return times[picks], states[picks]
+
+
+def plot_motion_state(df, ax, max_points=MAX_PLOT_POINTS):
+    # draws at most max_points per joint, so render time stays flat as sessions grow
+    for joint, joint_data in motion_state_by_joint(df):
+        times, states = downsample_motion_state(joint_data["EventTime"].to_numpy(),
+                                                joint_data["motion_state"].to_numpy(), max_points)
+        ax.plot(times, states, label=f"Motion State {joint}")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Motion State")
+    ax.legend()
+    ax.set_title("Motion State Over Time")
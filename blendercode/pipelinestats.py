@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+# counters and latency histograms for the joint pipeline, from the wire to the bone:
+#   <path>.decode  chunk/batch arrival -> decoded
+#   <path>.store   decoded -> in the JointStore
+#   cloud.transport  enqueued in Event Hub -> received here
+#   serial.fuse    raw IMU read -> fused orientation in the JointStore
+#   apply          sample in the JointStore -> written to the bones
+# recording is per chunk, batch or frame rather than per sample, and only appends to a list
+# (a serial chunk's counters and latencies go in as one tuple, see chunk_recorder);
+# the values are summed and binned in bulk off the hot path, so a reading thread pays well
+# under a microsecond per call. pipeline_stats is shared by everything in the process.
+
+SUB_BUCKETS = 32            # per power of two: about 3% relative precision, like a 2-digit HDR histogram
+MIN_EXPONENT = -24          # ~60 ns
+MAX_EXPONENT = 8            # ~256 s
+FOLD_INTERVAL = 1.0         # seconds between binning what the hot paths appended
+SUMMARY_PERCENTILES = (50, 90, 99, 99.9)
+CHUNK_COUNTERS = ("bytes", "lines", "frames", "samples")    # leading fields of a chunk_recorder tuple
+
+
+class LatencyHistogram:
+    # log-linear buckets over a fixed range: fixed memory, mergeable, percentiles within ~3%
+    def __init__(self):
+        self.buckets = np.zeros((MAX_EXPONENT - MIN_EXPONENT) * SUB_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        # one value or an array of them
+        seconds = np.atleast_1d(np.asarray(seconds, dtype=np.float64))
+        if not len(seconds):
+            return
+        self.count += len(seconds)
+        self.total += float(seconds.sum())
+        self.maximum = max(self.maximum, float(seconds.max()))
+        mantissa, exponent = np.frexp(seconds)     # seconds = mantissa * 2**exponent, mantissa in [0.5, 1)
+        index = (exponent - MIN_EXPONENT) * SUB_BUCKETS + ((mantissa - 0.5) * 2 * SUB_BUCKETS).astype(np.int64)
+        # below the range goes to the first bucket, above it to the last; frexp(0) is (0, 0), so zero
+        # (and clock-skewed negative) latencies are sent to the first bucket explicitly
+        index = np.where(seconds > 0, np.clip(index, 0, len(self.buckets) - 1), 0)
+        self.buckets += np.bincount(index, minlength=len(self.buckets))
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.buckets), percent / 100.0 * self.count))
+        if index >= len(self.buckets) - 1:
+            # the last bucket also holds everything beyond the range
+            return self.maximum
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        # upper edge of the bucket, so reported latencies never flatter
+        return min(float(np.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent + MIN_EXPONENT)), self.maximum)
+
+    def merge(self, other):
+        self.buckets += other.buckets
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+
+def discard(value):
+    pass
+
+
+class PipelineStats:
+    # hot paths resolve counter(name) / recorder(stage) once and call the result per chunk or batch:
+    # it is a bound list.append, atomic and lock-free. fold() bins what piled up, every
+    # FOLD_INTERVAL on a daemon thread and whenever a snapshot is taken.
+    def __init__(self, enabled=True, fold_interval=FOLD_INTERVAL):
+        self.enabled = enabled
+        self.fold_interval = fold_interval
+        self.counters = {}
+        self.histograms = {}
+        self.pending_counts = {}        # name -> [amount, ...]
+        self.pending_latencies = {}     # stage -> [seconds, ...]
+        self.pending_chunks = {}        # path -> [(bytes, lines, frames, samples, received, decoded, stored), ...]
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.logger = logging.getLogger("PipelineStats")
+        self.fold_thread = None
+        self.log_thread = None
+        self.log_stop = threading.Event()
+
+    def counter(self, name):
+        # callable adding its argument to counter `name`
+        return self.pending(self.pending_counts, name) if self.enabled else discard
+
+    def recorder(self, stage):
+        # callable recording one latency (seconds) for `stage`
+        return self.pending(self.pending_latencies, stage) if self.enabled else discard
+
+    def chunk_recorder(self, path):
+        # callable taking one (bytes, lines, frames, samples, received, decoded, stored) tuple per chunk
+        # read; fold() turns it into the <path>.bytes/lines/frames/samples counters and the
+        # <path>.decode (received -> decoded) and <path>.store (decoded -> stored) latencies.
+        # one append per chunk instead of one per counter and stage
+        return self.pending(self.pending_chunks, path) if self.enabled else discard
+
+    def count(self, name, amount=1):
+        self.counter(name)(amount)
+
+    def latency(self, stage, seconds):
+        self.recorder(stage)(seconds)
+
+    def pending(self, table, name):
+        series = table.get(name)
+        if series is None:
+            with self.lock:
+                series = table.setdefault(name, [])
+                if self.fold_thread is None:
+                    self.fold_thread = threading.Thread(target=self.fold_loop, daemon=True)
+                    self.fold_thread.start()
+        return series.append
+
+    def fold_loop(self):
+        while True:
+            time.sleep(self.fold_interval)
+            self.fold()
+
+    def fold(self):
+        with self.lock:
+            for name, series in list(self.pending_counts.items()):
+                # copy, then delete only what was copied: appends in between stay for the next fold
+                amounts = series[:]
+                del series[:len(amounts)]
+                if amounts:
+                    self.counters[name] = self.counters.get(name, 0) + sum(amounts)
+            for stage, series in list(self.pending_latencies.items()):
+                values = series[:]
+                del series[:len(values)]
+                if values:
+                    histogram = self.histograms.get(stage)
+                    if histogram is None:
+                        histogram = self.histograms[stage] = LatencyHistogram()
+                    histogram.record(values)
+            for path, series in list(self.pending_chunks.items()):
+                rows = series[:]
+                del series[:len(rows)]
+                if rows:
+                    self.fold_chunks(path, np.array(rows, dtype=np.float64))
+
+    def fold_chunks(self, path, rows):
+        # called with the lock held
+        for column, name in enumerate(CHUNK_COUNTERS):
+            total = int(rows[:, column].sum())
+            if total:
+                self.counters[f"{path}.{name}"] = self.counters.get(f"{path}.{name}", 0) + total
+        # chunks that decoded no samples (a partial line) have no decode/store latency
+        decoded = rows[rows[:, 3] > 0]
+        if len(decoded):
+            for stage, latencies in (("decode", decoded[:, 5] - decoded[:, 4]), ("store", decoded[:, 6] - decoded[:, 5])):
+                histogram = self.histograms.get(f"{path}.{stage}")
+                if histogram is None:
+                    histogram = self.histograms[f"{path}.{stage}"] = LatencyHistogram()
+                histogram.record(latencies)
+
+    def applied(self, timestamps, now=None):
+        # a frame was put on the bones; timestamps are the store arrival times of the samples new
+        # to this frame, so the oldest of them gives the worst arrival -> bone latency
+        if now is None:
+            now = time.monotonic()
+        self.count("apply.frames")
+        if len(timestamps):
+            self.latency("apply", now - float(np.min(timestamps)))
+        else:
+            self.count("apply.stale_frames")
+
+    def snapshot(self, reset=False):
+        # {"elapsed": s, "counters": {name: {"total", "rate"}}, "latency": {stage: {"count", "mean", "max", "p50", ...}}}
+        self.fold()
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.started, 1e-9)
+            counters = dict(self.counters)
+            histograms = self.histograms
+            if reset:
+                self.counters = {}
+                self.histograms = {}
+                self.started = now
+        result = {
+            "elapsed": elapsed,
+            "counters": {name: {"total": total, "rate": total / elapsed} for name, total in counters.items()},
+            "latency": {},
+        }
+        for stage, histogram in histograms.items():
+            summary = {"count": histogram.count, "mean": histogram.total / histogram.count if histogram.count else 0.0,
+                       "max": histogram.maximum}
+            for percent in SUMMARY_PERCENTILES:
+                summary[f"p{percent:g}"] = histogram.percentile(percent)
+            result["latency"][stage] = summary
+        return result
+
+    def summary(self, reset=False):
+        snapshot = self.snapshot(reset)
+        parts = [f"{name} {counter['rate']:.0f}/s" for name, counter in sorted(snapshot["counters"].items())]
+        for stage, latency in sorted(snapshot["latency"].items()):
+            parts.append(f"{stage} p50 {latency['p50'] * 1e3:.2f} p99 {latency['p99'] * 1e3:.2f} "
+                         f"max {latency['max'] * 1e3:.2f} ms")
+        return ", ".join(parts) if parts else "no data"
+
+    def start_logging(self, interval=10.0):
+        # one INFO line per interval covering that interval only
+        def log_loop():
+            while not self.log_stop.wait(interval):
+                self.logger.info(self.summary(reset=True))
+        self.log_stop.clear()
+        self.log_thread = threading.Thread(target=log_loop, daemon=True)
+        self.log_thread.start()
+
+    def stop_logging(self):
+        self.log_stop.set()
+
+
+pipeline_stats = PipelineStats()
@@ -0,0 +1,45 @@
+import numpy as np
+
+import quatmath
+
+ANGLE_THRESHOLD = np.radians(0.25)  # bones that moved less than this since the last write are left alone
+
+
+class PoseWriter:
+    # writes rotation_quaternion for a fixed set of pose bones with one foreach_get/foreach_set
+    # pair per frame instead of one RNA property write per bone. bone indices are resolved once.
+    def __init__(self, armature, bone_names, threshold=ANGLE_THRESHOLD):
+        self.armature = armature
+        self.bones = armature.pose.bones
+        names = [bone.name for bone in self.bones]
+        self.indices = np.array([names.index(name) for name in bone_names])
+        self.buffer = np.empty(len(self.bones) * 4, dtype=np.float32)
+        self.threshold = threshold
+        self.written = np.tile(np.array([np.nan, np.nan, np.nan, np.nan]), (len(bone_names), 1))
+        self.writes = 0
+        self.skipped = 0
+
+    def write(self, rotations, force=False):
+        # returns how many bones changed; nothing is touched if none moved past the threshold
+        rotations = np.asarray(rotations, dtype=np.float64)
+        if not force:
+            moved = ~(quatmath.angle_between(self.written, rotations) < self.threshold)
+            if not moved.any():
+                self.skipped += 1
+                return 0
+        else:
+            moved = np.ones(len(rotations), dtype=bool)
+
+        # read back first so bones we don't drive keep whatever pose they have
+        self.bones.foreach_get("rotation_quaternion", self.buffer)
+        pose = self.buffer.reshape(-1, 4)
+        pose[self.indices[moved]] = rotations[moved]
+        self.bones.foreach_set("rotation_quaternion", self.buffer)
+        # foreach_set bypasses the RNA update callbacks, so tag the armature for the depsgraph
+        self.armature.update_tag()
+        self.written[moved] = rotations[moved]
+        self.writes += 1
+        return int(moved.sum())
+
+    def reset(self):
+        self.write(np.tile(quatmath.IDENTITY, (len(self.indices), 1)), force=True)
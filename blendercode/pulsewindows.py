@@ -0,0 +1,204 @@
+import collections
+import json
+import math
+import threading
+import time
+
+BPM_KEY = "BPM"
+WINDOW_SECONDS = 60.0       # tumbling window length; one aggregate per device per window
+SLIDING_WINDOWS = 5         # closed windows merged for the sliding view
+VALID_BPM = (25, 250)       # outside this the pulse sensor is reading noise; excluded from the stats
+ALERT_BPM = (40, 180)       # valid but flagged as low / high
+MAX_ALERTS = 256            # recent out-of-range readings kept for the dashboard
+MAX_DEVICES = 1024          # new devices beyond this are ignored
+
+PulseAggregate = collections.namedtuple("PulseAggregate", [
+    "source", "window_start", "window_end",     # wall-clock seconds
+    "count", "mean", "min", "max",
+    "sdnn",         # standard deviation of the beat interval (ms)
+    "rmssd",        # root mean square of successive beat interval differences (ms)
+    "low", "high", "invalid",
+])
+
+PulseAlert = collections.namedtuple("PulseAlert", ["source", "timestamp", "value", "flag"])
+
+
+class _Window:
+    # running sums only, so a window costs the same memory at 1 reading or 1 million
+    __slots__ = ("start", "count", "total", "minimum", "maximum", "interval_total", "interval_squares",
+                 "diff_squares", "diffs", "low", "high", "invalid")
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.interval_total = 0.0
+        self.interval_squares = 0.0
+        self.diff_squares = 0.0
+        self.diffs = 0
+        self.low = 0
+        self.high = 0
+        self.invalid = 0
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.interval_total += other.interval_total
+        self.interval_squares += other.interval_squares
+        self.diff_squares += other.diff_squares
+        self.diffs += other.diffs
+        self.low += other.low
+        self.high += other.high
+        self.invalid += other.invalid
+
+    def aggregate(self, source, end, wall_offset):
+        count = self.count
+        if count:
+            mean_interval = self.interval_total / count
+            sdnn = math.sqrt(max(self.interval_squares / count - mean_interval * mean_interval, 0.0))
+        else:
+            sdnn = 0.0
+        return PulseAggregate(
+            source, self.start + wall_offset, end + wall_offset,
+            count, self.total / count if count else 0.0,
+            self.minimum if count else 0.0, self.maximum if count else 0.0,
+            sdnn, math.sqrt(self.diff_squares / self.diffs) if self.diffs else 0.0,
+            self.low, self.high, self.invalid,
+        )
+
+
+class _Device:
+    __slots__ = ("window", "closed", "last_interval")
+
+    def __init__(self, start):
+        self.window = _Window(start)
+        self.closed = collections.deque(maxlen=SLIDING_WINDOWS)
+        self.last_interval = None
+
+
+class PulseWindows:
+    # receiver sink turning raw BPM events into per-device windowed aggregates. each closed
+    # window is handed to every output as one PulseAggregate instead of storing the raw events.
+    def __init__(self, window=WINDOW_SECONDS, outputs=(), valid=VALID_BPM, alert=ALERT_BPM):
+        self.window = window
+        self.outputs = list(outputs)
+        self.valid = valid
+        self.alert = alert
+        self.devices = {}
+        self.alerts = collections.deque(maxlen=MAX_ALERTS)
+        self.lock = threading.Lock()
+        # receivers stamp samples with time.monotonic(); aggregates carry wall-clock times
+        self.wall_offset = time.time() - time.monotonic()
+
+    def push(self, key, value, timestamp, source=None):
+        if key != BPM_KEY or not isinstance(value, (int, float)):
+            return
+        with self.lock:
+            device = self.devices.get(source)
+            if device is None:
+                if len(self.devices) >= MAX_DEVICES:
+                    return
+                device = self.devices[source] = _Device(timestamp - timestamp % self.window)
+            closed = self.roll(source, device, timestamp)
+            self.add(source, device, value, timestamp)
+        for aggregate in closed:
+            self.emit(aggregate)
+
+    def roll(self, source, device, timestamp):
+        # close the open window once a reading lands past its end
+        closed = []
+        window = device.window
+        if timestamp >= window.start + self.window:
+            end = window.start + self.window
+            if window.count or window.invalid:
+                device.closed.append(window)
+                closed.append(window.aggregate(source, end, self.wall_offset))
+            device.window = _Window(timestamp - timestamp % self.window)
+        return closed
+
+    def add(self, source, device, value, timestamp):
+        window = device.window
+        if not self.valid[0] <= value <= self.valid[1]:
+            window.invalid += 1
+            self.alerts.append(PulseAlert(source, timestamp + self.wall_offset, value, "invalid"))
+            return
+        if value < self.alert[0]:
+            window.low += 1
+            self.alerts.append(PulseAlert(source, timestamp + self.wall_offset, value, "low"))
+        elif value > self.alert[1]:
+            window.high += 1
+            self.alerts.append(PulseAlert(source, timestamp + self.wall_offset, value, "high"))
+
+        # the sensor reports BPM, so variability is computed on the implied beat interval
+        interval = 60000.0 / value
+        window.count += 1
+        window.total += value
+        window.minimum = min(window.minimum, value)
+        window.maximum = max(window.maximum, value)
+        window.interval_total += interval
+        window.interval_squares += interval * interval
+        if device.last_interval is not None:
+            diff = interval - device.last_interval
+            window.diff_squares += diff * diff
+            window.diffs += 1
+        device.last_interval = interval
+
+    def emit(self, aggregate):
+        for output in self.outputs:
+            output(aggregate)
+
+    def flush(self, now=None):
+        # close windows that ended without a later reading (idle or disconnected devices)
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            closed = [aggregate for source, device in self.devices.items()
+                      for aggregate in self.roll(source, device, now)]
+        for aggregate in closed:
+            self.emit(aggregate)
+        return closed
+
+    def sources(self):
+        with self.lock:
+            return sorted(self.devices, key=str)
+
+    def sliding(self, source):
+        # the open window plus the closed ones from the last SLIDING_WINDOWS window lengths, merged
+        now = time.monotonic()
+        with self.lock:
+            device = self.devices.get(source)
+            if device is None:
+                return None
+            oldest = now - SLIDING_WINDOWS * self.window
+            windows = [window for window in device.closed if window.start >= oldest] + [device.window]
+            merged = _Window(windows[0].start)
+            for window in windows:
+                merged.merge(window)
+            return merged.aggregate(source, now, self.wall_offset)
+
+    def recent_alerts(self, source=None):
+        with self.lock:
+            return [alert for alert in self.alerts if source is None or alert.source == source]
+
+
+class AggregateFile:
+    # output appending one JSON line per closed window; usable as PulseWindows(outputs=[...])
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def __call__(self, aggregate):
+        # two decimals is well below the sensor's resolution and halves the line length
+        record = {field: round(value, 2) if isinstance(value, float) else value
+                  for field, value in aggregate._asdict().items()}
+        line = json.dumps(record, separators=(",", ":"))
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
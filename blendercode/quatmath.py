@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+# quaternion kernels shared by the Blender scripts and the Power BI visual.
+# every function takes (..., 4) arrays in (w, x, y, z) order, so one call handles
+# a single joint, the whole skeleton for a frame, or millions of telemetry rows.
+
+CONJUGATE_SIGNS = np.array([1.0, -1.0, -1.0, -1.0])
+IDENTITY = np.array([1.0, 0.0, 0.0, 0.0])
+
+
+def conjugate(q):
+    return np.asarray(q, dtype=np.float64) * CONJUGATE_SIGNS
+
+
+def _product_table():
+    # (q1 outer q0).reshape(16) @ table == q1 * q0, built from the basis quaternions
+    table = np.zeros((4, 4, 4))
+    basis = np.eye(4)
+    for i in range(4):
+        for j in range(4):
+            table[i, j] = _multiply_columns(basis[i], basis[j])
+    return table.reshape(16, 4)
+
+
+def _multiply_columns(q1, q0):
+    w1, x1, y1, z1 = q1[..., 0], q1[..., 1], q1[..., 2], q1[..., 3]
+    w0, x0, y0, z0 = q0[..., 0], q0[..., 1], q0[..., 2], q0[..., 3]
+    out = np.empty(np.broadcast_shapes(q1.shape, q0.shape))
+    out[..., 0] = -x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0
+    out[..., 1] = x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0
+    out[..., 2] = -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0
+    out[..., 3] = x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0
+    return out
+
+
+PRODUCT_TABLE = _product_table()
+SMALL_BATCH = 256   # below this many quaternions, one matmul beats 28 tiny ufunc calls
+
+
+def multiply(q1, q0):
+    # Hamilton product q1 * q0 (apply q0, then q1)
+    q1 = np.asarray(q1, dtype=np.float64)
+    q0 = np.asarray(q0, dtype=np.float64)
+    shape = np.broadcast_shapes(q1.shape, q0.shape)
+    if math.prod(shape[:-1]) <= SMALL_BATCH:
+        outer = q1[..., :, np.newaxis] * q0[..., np.newaxis, :]
+        return outer.reshape(shape[:-1] + (16,)) @ PRODUCT_TABLE
+    return _multiply_columns(q1, q0)
+
+
+def normalize(q):
+    q = np.asarray(q, dtype=np.float64)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    # zero quaternions (e.g. empty slots) become the identity rather than NaN
+    return np.where(norm > 0, q / np.where(norm > 0, norm, 1.0), IDENTITY)
+
+
+def relative(parent, child):
+    # rotation of child expressed in its parent's frame
+    return multiply(conjugate(parent), child)
+
+
+def angle_between(q0, q1):
+    # rotation angle (radians) taking q0 to q1, ignoring the q / -q sign ambiguity
+    q0 = np.asarray(q0, dtype=np.float64)
+    q1 = np.asarray(q1, dtype=np.float64)
+    dot = np.abs(np.sum(q0 * q1, axis=-1))
+    norms = np.linalg.norm(q0, axis=-1) * np.linalg.norm(q1, axis=-1)
+    return 2.0 * np.arccos(np.clip(dot / np.where(norms > 0, norms, 1.0), 0.0, 1.0))
+
+
+def to_euler(q):
+    # (roll, pitch, yaw) in radians along the last axis
+    q = np.asarray(q, dtype=np.float64)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+
+    roll = np.arctan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2.0 * (w * y - z * x), -1.0, 1.0))
+    yaw = np.arctan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return np.stack([roll, pitch, yaw], axis=-1)
+
+
+def slerp(q0, q1, t):
+    # spherical interpolation from q0 (t=0) to q1 (t=1); t broadcasts against the leading axes
+    q0 = normalize(q0)
+    q1 = normalize(q1)
+    t = np.asarray(t, dtype=np.float64)[..., np.newaxis]
+
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    # take the short way round
+    q1 = np.where(dot < 0, -q1, q1)
+    dot = np.clip(np.abs(dot), 0.0, 1.0)
+
+    theta = np.arccos(dot)
+    sin_theta = np.sin(theta)
+    nearly_parallel = sin_theta < 1e-6
+    safe_sin = np.where(nearly_parallel, 1.0, sin_theta)
+    w0 = np.where(nearly_parallel, 1.0 - t, np.sin((1.0 - t) * theta) / safe_sin)
+    w1 = np.where(nearly_parallel, t, np.sin(t * theta) / safe_sin)
+    return normalize(w0 * q0 + w1 * q1)
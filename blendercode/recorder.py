@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# a session is a directory of append-only column files plus meta.json:
+#   time.f8   arrival time (time.monotonic() of the receiver), float64
+#   joint.i2  index into meta["keys"], int16
+#   quat.f4   w, x, y, z, float32
+COLUMNS = {
+    "time": ("time.f8", np.dtype("<f8"), ()),
+    "joint": ("joint.i2", np.dtype("<i2"), ()),
+    "quat": ("quat.f4", np.dtype("<f4"), (4,)),
+}
+CHUNK_ROWS = 8192       # rows per preallocated buffer
+CHUNK_COUNT = 4         # buffers in the pool; all full means the disk is behind and samples are dropped
+FLUSH_INTERVAL = 1.0    # seconds before a partly filled buffer is flushed anyway
+
+
+class _Chunk:
+    def __init__(self, rows):
+        self.columns = {name: np.empty((rows,) + shape, dtype=dtype) for name, (_, dtype, shape) in COLUMNS.items()}
+        self.rows = 0
+        self.started = 0.0
+        self.opened = 0.0   # time.monotonic() the first row went in, for the timed flush
+
+
+class SessionRecorder:
+    # receiver sink: push() copies a sample into a preallocated buffer; a background thread
+    # appends full buffers to the column files, so the receive thread never touches the disk.
+    # a session is one run: key indices and the time base live in meta.json, so appending a second
+    # run to a folder would make its rows mean something else. path must be new or empty
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, chunk_count=CHUNK_COUNT, logging_level=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        existing = [filename for filename, _, _ in COLUMNS.values()] + ["meta.json"]
+        if any(os.path.exists(os.path.join(path, filename)) for filename in existing):
+            raise FileExistsError(f"{path} already holds a recorded session; record to a new folder")
+        self.keys = []
+        self.key_index = {}
+        self.dropped = 0
+        self.recorded = 0
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for _ in range(chunk_count):
+            self.free.put(_Chunk(chunk_rows))
+        self.chunk = None
+        # push() fills the chunk, flush_loop() takes it once it has been open FLUSH_INTERVAL
+        self.chunk_lock = threading.Lock()
+        self.files = {name: open(os.path.join(path, filename), "xb") for name, (filename, _, _) in COLUMNS.items()}
+        self.meta = {"started_wall": time.time(), "started_monotonic": time.monotonic()}
+        self.keys_written = 0
+        self.write_meta()
+        self.logger = logging.getLogger("Recorder")
+        if logging_level:
+            self.logger.setLevel(logging_level)
+        self.thread = threading.Thread(target=self.flush_loop, daemon=True)
+        self.thread.start()
+
+    def push(self, key, value, timestamp, source=None):
+        index = self.key_index.get(key)
+        if index is None:
+            if not isinstance(value, (list, tuple, np.ndarray)) or len(value) != 4:
+                return      # only quaternion streams are recorded
+            index = self.key_index[key] = len(self.keys)
+            self.keys.append(key)
+
+        with self.chunk_lock:
+            chunk = self.chunk
+            if chunk is None:
+                chunk = self.next_chunk(timestamp)
+                if chunk is None:
+                    self.dropped += 1
+                    return
+
+            row = chunk.rows
+            chunk.columns["time"][row] = timestamp
+            chunk.columns["joint"][row] = index
+            chunk.columns["quat"][row] = value
+            chunk.rows = row + 1
+
+            if chunk.rows == len(chunk.columns["time"]) or timestamp - chunk.started > FLUSH_INTERVAL:
+                self.full.put(chunk)
+                self.chunk = None
+
+    def next_chunk(self, timestamp):
+        try:
+            chunk = self.free.get_nowait()
+        except queue.Empty:
+            return None
+        chunk.rows = 0
+        chunk.started = timestamp
+        chunk.opened = time.monotonic()
+        self.chunk = chunk
+        return chunk
+
+    def flush_loop(self):
+        while True:
+            try:
+                chunk = self.full.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                # samples stopped arriving: flush the partly filled chunk rather than wait for the next push
+                chunk = self.take_stale_chunk()
+                if chunk is None:
+                    continue
+            if chunk is None:
+                return
+            for name, file in self.files.items():
+                chunk.columns[name][:chunk.rows].tofile(file)
+                file.flush()
+            self.recorded += chunk.rows
+            if len(self.keys) != self.keys_written:
+                self.write_meta()
+            self.free.put(chunk)
+
+    def take_stale_chunk(self):
+        with self.chunk_lock:
+            chunk = self.chunk
+            if chunk is None or not chunk.rows or time.monotonic() - chunk.opened < FLUSH_INTERVAL:
+                return None
+            self.chunk = None
+            return chunk
+
+    def write_meta(self):
+        keys = list(self.keys)
+        with open(os.path.join(self.path, "meta.json.tmp"), "w") as file:
+            json.dump({**self.meta, "keys": keys}, file)
+        self.keys_written = len(keys)
+        os.replace(os.path.join(self.path, "meta.json.tmp"), os.path.join(self.path, "meta.json"))
+
+    def close(self):
+        with self.chunk_lock:
+            if self.chunk is not None:
+                self.full.put(self.chunk)
+                self.chunk = None
+        self.full.put(None)
+        self.thread.join()
+        self.write_meta()
+        for file in self.files.values():
+            file.close()
+        if self.dropped:
+            self.logger.warning("Dropped %d samples while the disk was behind.", self.dropped)
+        self.logger.info("Recorded %d samples to %s.", self.recorded, self.path)
+
+
+class SessionReader:
+    # memory-maps a recorded session; nothing is read from disk until a column is sliced
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as file:
+            self.meta = json.load(file)
+        self.keys = self.meta["keys"]
+
+        sizes = {}
+        for name, (filename, dtype, shape) in COLUMNS.items():
+            row_size = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            sizes[name] = os.path.getsize(os.path.join(path, filename)) // row_size
+        # a crash mid-flush can leave columns of different lengths; trust the shortest
+        self.rows = min(sizes.values())
+
+        self.columns = {}
+        for name, (filename, dtype, shape) in COLUMNS.items():
+            if self.rows:
+                self.columns[name] = np.memmap(os.path.join(path, filename), dtype=dtype, mode="r", shape=(self.rows,) + shape)
+            else:
+                self.columns[name] = np.empty((0,) + shape, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def time(self):
+        return self.columns["time"]
+
+    @property
+    def joint(self):
+        return self.columns["joint"]
+
+    @property
+    def quat(self):
+        return self.columns["quat"]
+
+    def joint_samples(self, key):
+        mask = self.joint == self.keys.index(key)
+        return self.time[mask], self.quat[mask]
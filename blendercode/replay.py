@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from jointstore import JointStore
+from recorder import SessionReader
+
+REPLAY_CHUNK_ROWS = 4096    # rows pulled from the memory-mapped columns at a time
+MAX_SLEEP = 0.05            # upper bound on one wait, so stop() is honoured promptly
+
+
+class ReplaySource:
+    # plays a recorded session back into a JointStore (and sinks) with the same interface as
+    # PortManager / EventHubReceiver. speed=1.0 is real time, 10.0 ten times faster and
+    # None as fast as possible; loop=True restarts at the end for soak tests.
+    def __init__(self, path, speed=1.0, loop=False, logging_level=None, store=None, sinks=()):
+        if speed is not None and not speed > 0:
+            raise ValueError(f"replay speed must be positive or None (as fast as possible), got {speed}")
+        self.reader = SessionReader(path)
+        self.speed = speed
+        self.loop = loop
+        self.store = store if store is not None else JointStore()
+        self.sinks = list(sinks)
+        self.played = 0
+        self.started = None
+        self.finished = None
+        self.stop_signal = threading.Event()
+        self.logger = logging.getLogger("Replay")
+        if logging_level:
+            self.logger.setLevel(logging_level)
+
+    def stop(self):
+        self.stop_signal.set()
+        self.logger.info("Stopped.")
+
+    def start(self):
+        self.logger.debug("Starting...")
+        self.run()
+
+    def start_threaded(self):
+        self.logger.debug("Starting thread...")
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def run(self):
+        self.started = time.monotonic()
+        self.played = 0
+        try:
+            while not self.stop_signal.is_set():
+                self.play_once()
+                if not self.loop:
+                    break
+        finally:
+            self.finished = time.monotonic()
+            self.report()
+
+    def play_once(self):
+        reader = self.reader
+        if not len(reader):
+            return
+        session_start = float(reader.time[0])
+        wall_start = time.monotonic()
+
+        for offset in range(0, len(reader), REPLAY_CHUNK_ROWS):
+            times = np.asarray(reader.time[offset:offset + REPLAY_CHUNK_ROWS])
+            joints = np.asarray(reader.joint[offset:offset + REPLAY_CHUNK_ROWS])
+            quats = np.asarray(reader.quat[offset:offset + REPLAY_CHUNK_ROWS], dtype=np.float64)
+
+            if self.speed is None:
+                self.publish(joints, quats)
+                if self.stop_signal.is_set():
+                    return
+                continue
+
+            # release every row whose (scaled) session time has come, then sleep until the next one
+            due_at = wall_start + (times - session_start) / self.speed
+            position = 0
+            while position < len(times):
+                if self.stop_signal.is_set():
+                    return
+                now = time.monotonic()
+                end = int(np.searchsorted(due_at, now, side="right"))
+                if end > position:
+                    self.publish(joints[position:end], quats[position:end])
+                    position = end
+                else:
+                    time.sleep(min(due_at[position] - now, MAX_SLEEP))
+
+    def publish(self, joints, quats):
+        timestamp = time.monotonic()
+        keys = self.reader.keys
+
+        # the store only keeps the latest value, so write just the last row per joint
+        last_rows = len(joints) - 1 - np.unique(joints[::-1], return_index=True)[1]
+        for row in last_rows:
+            self.store.update(keys[joints[row]], quats[row], timestamp)
+
+        if self.sinks:
+            for joint, quat in zip(joints.tolist(), quats):
+                for sink in self.sinks:
+                    sink.push(keys[joint], quat, timestamp, "replay")
+        self.played += len(joints)
+
+    def stats(self):
+        end = self.finished or time.monotonic()
+        elapsed = end - self.started if self.started else 0.0
+        session_seconds = float(self.reader.time[-1] - self.reader.time[0]) if len(self.reader) > 1 else 0.0
+        rate = self.played / elapsed if elapsed else 0.0
+        # how much faster than the original recording the samples actually went out
+        speedup = rate * session_seconds / len(self.reader) if len(self.reader) and session_seconds else 0.0
+        return {"samples": self.played, "seconds": elapsed, "samples_per_sec": rate, "speedup": speedup}
+
+    def report(self):
+        stats = self.stats()
+        self.logger.info("Replayed %d samples in %.2f s (%.0f samples/sec, %.1fx real time).",
+                         stats["samples"], stats["seconds"], stats["samples_per_sec"], stats["speedup"])
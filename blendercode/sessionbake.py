@@ -0,0 +1,142 @@
+import logging
+
+import numpy as np
+
+import quatmath
+
+# offline counterpart of the live timer: a recorded session (recorder.py) is resampled to the
+# scene frame rate, solved for the whole skeleton and every frame in one batch, and written into
+# the action's F-curves with keyframe_points.add + foreach_set, so baking a long session takes
+# seconds instead of a real-time playback. nothing here imports bpy; bakesession.py drives it.
+
+DECIMATE_TOLERANCE = np.radians(0.5)    # keys dropped while interpolation stays within this of the session
+DECIMATE_SEGMENT = 128                  # frames between forced keys; bounds the recursion on periodic motion
+
+logger = logging.getLogger("SessionBake")
+
+
+def frame_times(reader, fps):
+    # time.monotonic() of every frame from the first to the last recorded sample
+    if not len(reader):
+        return np.empty(0)
+    start, end = float(np.min(reader.time)), float(np.max(reader.time))
+    return start + np.arange(int((end - start) * fps) + 1) / fps
+
+
+def resample(times, quats, at):
+    # orientation at each of `at`, slerped between the samples either side; held before the
+    # first sample and after the last
+    if len(times) == 1:
+        return np.tile(quats[0], (len(at), 1))
+    after = np.clip(np.searchsorted(times, at, side="right"), 1, len(times) - 1)
+    before = after - 1
+    span = times[after] - times[before]
+    t = np.clip((at - times[before]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+    return quatmath.slerp(quats[before], quats[after], t)
+
+
+def session_world(reader, keys, fps):
+    # (F, N, 4) world orientations of `keys` at every frame; joints never recorded stay at the identity
+    at = frame_times(reader, fps)
+    world = np.tile(quatmath.IDENTITY, (len(at), len(keys), 1))
+    times = np.asarray(reader.time)
+    joints = np.asarray(reader.joint)
+    quats = np.asarray(reader.quat, dtype=np.float64)
+    if len(times) > 1 and np.any(np.diff(times) < 0):
+        # several receivers writing one session interleave slightly out of order
+        order = np.argsort(times, kind="stable")
+        times, joints, quats = times[order], joints[order], quats[order]
+    for column, key in enumerate(keys):
+        rows = np.flatnonzero(joints == reader.keys.index(key)) if key in reader.keys else []
+        if not len(rows):
+            logger.warning("%s was not recorded; its bone stays at rest.", key)
+            continue
+        world[:, column] = resample(times[rows], quats[rows], at)
+    return at, world
+
+
+def continuous(rotations):
+    # F-curves interpolate each component on its own, so q and -q on neighbouring frames would
+    # swing through the origin; flip along the time axis (0) so every step takes the short way
+    rotations = np.array(rotations, dtype=np.float64)
+    dots = np.einsum("f...c,f...c->f...", rotations[1:], rotations[:-1])
+    rotations[1:] *= np.cumprod(np.where(dots < 0, -1.0, 1.0), axis=0)[..., np.newaxis]
+    return rotations
+
+
+def decimate(rotations, tolerance=DECIMATE_TOLERANCE, segment=DECIMATE_SEGMENT):
+    # (F, 4) rotations of one bone -> bool mask of the frames to key, so that linear interpolation
+    # between kept keys never strays more than `tolerance` radians (Ramer-Douglas-Peucker).
+    # all four components of a bone share its keys, so the curves stay one rotation. every
+    # segment of a level of the recursion is measured in one batch, so the Python loop runs
+    # once per level rather than once per key. on swinging arms the worst frame of a long
+    # segment tends to sit one period in from its end, which would take a level per period to
+    # peel off; starting from `segment`-frame pieces keeps the depth small.
+    count = len(rotations)
+    keep = np.zeros(count, dtype=bool)
+    bounds = np.unique(np.append(np.arange(0, count, segment), count - 1))
+    keep[bounds] = True
+    firsts = bounds[:-1]
+    lasts = bounds[1:]
+    while len(firsts):
+        inside = lasts - firsts - 1
+        firsts, lasts, inside = firsts[inside > 0], lasts[inside > 0], inside[inside > 0]
+        if not len(firsts):
+            break
+        # every interior frame of every segment, with the segment it belongs to
+        starts = np.cumsum(inside) - inside
+        segment_of = np.repeat(np.arange(len(firsts)), inside)
+        frames = np.arange(inside.sum()) - starts[segment_of] + firsts[segment_of] + 1
+        first, last = firsts[segment_of], lasts[segment_of]
+        t = ((frames - first) / (last - first))[:, np.newaxis]
+        line = rotations[first] + t * (rotations[last] - rotations[first])
+        error = quatmath.angle_between(line, rotations[frames])
+
+        worst = np.maximum.reduceat(error, starts)
+        # first frame per segment reaching its worst error
+        at_worst = np.flatnonzero(error == worst[segment_of])
+        _, first_worst = np.unique(segment_of[at_worst], return_index=True)
+        splits = frames[at_worst[first_worst]]
+        split = worst > tolerance
+        keep[splits[split]] = True
+        firsts = np.concatenate([firsts[split], splits[split]])
+        lasts = np.concatenate([splits[split], lasts[split]])
+    return keep
+
+
+def bake(reader, skeleton, fps, tolerance=None):
+    # -> (frame times, (F, N, 4) local bone rotations, (F, N) keys to write or None for all)
+    at, world = session_world(reader, skeleton.keys, fps)
+    rotations = continuous(skeleton.solve(world))
+    if tolerance is None or not len(at):
+        return at, rotations, None
+    keep = np.stack([decimate(rotations[:, bone], tolerance) for bone in range(rotations.shape[1])], axis=1)
+    return at, rotations, keep
+
+
+def write_action(action, bones, rotations, keep=None, frame_start=1):
+    # replaces the rotation_quaternion F-curves of `bones` in `action` with the baked keys.
+    # returns the number of keyframes written. keys are set to LINEAR interpolation, the curve
+    # decimate() measured its tolerance against; keyframe_points.add() makes them Bezier, which
+    # overshoots between sparse keys. foreach_set cannot write enums, so that is one Python
+    # assignment per key
+    written = 0
+    for column, bone in enumerate(bones):
+        frames = np.flatnonzero(keep[:, column]) if keep is not None else np.arange(len(rotations))
+        co = np.empty((len(frames), 2), dtype=np.float32)
+        co[:, 0] = frames + frame_start
+        data_path = f'pose.bones["{bone}"].rotation_quaternion'
+        for component in range(4):
+            fcurve = action.fcurves.find(data_path, index=component)
+            if fcurve is not None:
+                action.fcurves.remove(fcurve)
+            fcurve = action.fcurves.new(data_path, index=component, action_group=bone)
+            co[:, 1] = rotations[frames, column, component]
+            fcurve.keyframe_points.add(len(frames))
+            fcurve.keyframe_points.foreach_set("co", co.ravel())
+            for point in fcurve.keyframe_points:
+                point.interpolation = "LINEAR"
+            # sorts the keys and recomputes their handles
+            fcurve.update()
+            written += len(frames)
+    return written
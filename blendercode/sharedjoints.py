@@ -0,0 +1,245 @@
+import functools
+import json
+import operator
+import os
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from jointstore import JointStore, JointSnapshot, JOINT_KEYS
+
+# a JointStore whose slots live in a multiprocessing.shared_memory block, so a receiver process
+# (jointreceiver.py) can do all serial/cloud I/O and decoding while Blender only maps the block.
+# layout, all little-endian and 8-byte aligned:
+#   header    magic, generation, count, width, keys size, owner pid, closed (int64 each)
+#   keys      JSON list of the joint keys, padded to 8 bytes
+#   values    (count, width) float64
+#   timestamps  (count,) float64, time.monotonic() of arrival (the clock is system-wide)
+#   sequence  (count,) int64
+#   checks    (count,) int64, every 8-byte word of the slot's value, timestamp and sequence xor-ed
+# the generation counter is the same seqlock JointStore uses within a process. across processes
+# the writer's stores are not guaranteed to become visible in program order (they are on x86-64,
+# not on ARM64), so each slot also carries a check word written after it and readers retry until
+# every slot matches its check.
+# the owner pid and closed flag let a new receiver refuse a block a live receiver still owns, and
+# tell readers when the block they map was closed or replaced so they attach to the new one.
+
+MAGIC = 0x324E494F4A4D4853   # "SHMJOIN2"
+HEADER_FIELDS = 7
+MAGIC_FIELD, GENERATION_FIELD, COUNT_FIELD, WIDTH_FIELD, KEYS_FIELD, OWNER_FIELD, CLOSED_FIELD = range(HEADER_FIELDS)
+DEFAULT_NAME = "blender_joints"
+TAKEOVER_TIMEOUT = 2.0  # seconds a new receiver waits for readers to let go of a stale block (Windows)
+ORPHAN_SPINS = 10000    # snapshot retries before checking whether the writer died mid-update
+
+
+def _padded(size):
+    return (size + 7) // 8 * 8
+
+
+def _open(name, create=False, size=0):
+    # untracked: otherwise the resource tracker unlinks the block by name when this process exits,
+    # a reader's the writer's block, or a crashed receiver's the block of the receiver replacing it
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    memory = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if os.name == "posix":
+        resource_tracker.unregister(memory._name, "shared_memory")
+    return memory
+
+
+def _unlink(name):
+    # opened again tracked, as unlink() unregisters the block from this process's resource tracker.
+    # Windows has no unlink: a block goes away once every process has closed it
+    if os.name == "posix":
+        memory = shared_memory.SharedMemory(name=name)
+        memory.close()
+        memory.unlink()
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x00100000, False, pid)   # SYNCHRONIZE
+        if not handle:
+            return False
+        try:
+            return kernel32.WaitForSingleObject(handle, 0) == 0x102    # WAIT_TIMEOUT: still running
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _checks(values, timestamps, sequence):
+    return np.bitwise_xor.reduce(values.view("<i8"), axis=1) ^ timestamps.view("<i8") ^ sequence
+
+
+def _retire(name):
+    # a block with this name already exists. one a live receiver owns is refused; one left behind by a
+    # receiver that did not shut down cleanly is marked closed, so readers still mapping it re-attach,
+    # and unlinked
+    memory = _open(name)
+    header = np.ndarray((HEADER_FIELDS,), dtype="<i8", buffer=memory.buf) if memory.size >= 8 * HEADER_FIELDS else None
+    try:
+        if header is not None and header[MAGIC_FIELD] in (0, MAGIC):
+            owner = int(header[OWNER_FIELD])
+            if not header[CLOSED_FIELD] and owner and _alive(owner):
+                raise FileExistsError(f"shared memory {name} is in use by the receiver with pid {owner}")
+            header[CLOSED_FIELD] = 1
+        else:
+            raise FileExistsError(f"shared memory {name} exists and does not hold joints")
+    finally:
+        del header
+        memory.close()
+    _unlink(name)
+
+
+class SharedJointStore(JointStore):
+    # the receiver creates it (SharedJointStore(keys, name=...)) and passes it as store= to
+    # PortManager / EventHubReceiver / ReplaySource; Blender attaches with SharedJointStore.attach(name)
+    # and calls snapshot() as on any JointStore. only joint slots are shared: extras (logs, BPM)
+    # stay in the receiver process.
+    def __init__(self, keys=JOINT_KEYS, width=4, name=DEFAULT_NAME):
+        keys = tuple(keys)
+        encoded = json.dumps(list(keys)).encode()
+        size = 8 * HEADER_FIELDS + _padded(len(encoded)) + 8 * len(keys) * (width + 3)
+        deadline = time.monotonic() + TAKEOVER_TIMEOUT
+        while True:
+            try:
+                self.memory = _open(name, create=True, size=size)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise FileExistsError(f"shared memory {name} is still open in another process") from None
+                _retire(name)
+                if os.name != "posix":
+                    time.sleep(0.1)
+        self.owner = True
+        self.orphaned = False
+        header = np.ndarray((HEADER_FIELDS,), dtype="<i8", buffer=self.memory.buf)
+        header[:] = (0, 0, len(keys), width, len(encoded), os.getpid(), 0)
+        self.memory.buf[8 * HEADER_FIELDS:8 * HEADER_FIELDS + len(encoded)] = encoded
+        del header
+        self.map(keys, width, len(encoded))
+        # written last, so a reader never attaches to a half-initialized block
+        self.header[MAGIC_FIELD] = MAGIC
+
+    @classmethod
+    def attach(cls, name=DEFAULT_NAME):
+        store = cls.__new__(cls)
+        store.memory = _open(name)
+        store.owner = False
+        store.orphaned = False
+        header = np.ndarray((HEADER_FIELDS,), dtype="<i8", buffer=store.memory.buf)
+        magic, _, count, width, keys_size, _, closed = header.tolist()
+        del header
+        if closed or magic == 0:
+            # a stopped receiver's block, or one still being set up: not there yet, as far as readers go
+            store.memory.close()
+            raise FileNotFoundError(f"shared memory {name} is closed")
+        if magic != MAGIC:
+            store.memory.close()
+            raise ValueError(f"shared memory {name} does not hold joints")
+        keys = json.loads(bytes(store.memory.buf[8 * HEADER_FIELDS:8 * HEADER_FIELDS + keys_size]))
+        store.map(keys, width, keys_size)
+        if len(store.keys) != count:
+            store.close()
+            raise ValueError(f"shared memory {name} is corrupt")
+        return store
+
+    @classmethod
+    def reattach(cls, name, keys):
+        # for a reader whose block closed (the receiver stopped or was replaced): the next block,
+        # or None while it is not up yet. it must publish the keys the reader was built for
+        try:
+            store = cls.attach(name)
+        except FileNotFoundError:
+            return None
+        if store.keys != tuple(keys):
+            store.close()
+            raise ValueError(f"{name} now publishes {store.keys}, the skeleton needs {tuple(keys)}")
+        return store
+
+    def map(self, keys, width, keys_size):
+        self.keys = tuple(keys)
+        self.index = {key: slot for slot, key in enumerate(self.keys)}
+        self.extras = {}
+        self.write_lock = threading.Lock()
+        count = len(self.keys)
+        buffer = self.memory.buf
+        offset = 8 * HEADER_FIELDS + _padded(keys_size)
+        self.header = np.ndarray((HEADER_FIELDS,), dtype="<i8", buffer=buffer)
+        self.values = np.ndarray((count, width), dtype="<f8", buffer=buffer, offset=offset)
+        offset += 8 * count * width
+        self.timestamps = np.ndarray((count,), dtype="<f8", buffer=buffer, offset=offset)
+        offset += 8 * count
+        self.sequence = np.ndarray((count,), dtype="<i8", buffer=buffer, offset=offset)
+        offset += 8 * count
+        self.checks = np.ndarray((count,), dtype="<i8", buffer=buffer, offset=offset)
+        self.value_words = self.values.view("<i8")
+        self.timestamp_words = self.timestamps.view("<i8")
+
+    def write_slot(self, slot, value, timestamp):
+        super().write_slot(slot, value, timestamp)
+        # written last: a reader that sees the new check but not yet all of the slot (or the reverse) retries
+        self.checks[slot] = functools.reduce(operator.xor, self.value_words[slot].tolist(),
+                                             int(self.timestamp_words[slot]) ^ int(self.sequence[slot]))
+
+    def snapshot(self):
+        spins = 0
+        while True:
+            generation = self.generation
+            values = self.values.copy()
+            timestamps = self.timestamps.copy()
+            sequence = self.sequence.copy()
+            checks = self.checks.copy()
+            if (not generation & 1 and generation == self.generation
+                    and (_checks(values, timestamps, sequence) == checks).all()) or self.closed:
+                return JointSnapshot(values, timestamps, sequence, generation)
+            spins += 1
+            if spins % ORPHAN_SPINS == 0 and not _alive(int(self.header[OWNER_FIELD])):
+                # the receiver died in the middle of an update; closed from here on
+                self.orphaned = True
+            time.sleep(0)
+
+    @property
+    def generation(self):
+        return int(self.header[GENERATION_FIELD])
+
+    @generation.setter
+    def generation(self, value):
+        self.header[GENERATION_FIELD] = value
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def closed(self):
+        # readers poll this once a frame and re-attach when it turns True
+        return self.header is None or self.orphaned or bool(self.header[CLOSED_FIELD])
+
+    def close(self):
+        if self.header is None:
+            return
+        if self.owner:
+            # readers let go of the block before it is unlinked
+            self.header[CLOSED_FIELD] = 1
+        # the views must go before the mapping can be closed
+        self.header = self.values = self.timestamps = self.sequence = self.checks = None
+        self.value_words = self.timestamp_words = None
+        self.memory.close()
+        if self.owner:
+            _unlink(self.memory.name)
@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+
+import quatmath
+
+# which sensor drives which bone. each entry is (bone, joint key, parent bone); the parent is
+# the bone whose sensor the rotation is taken relative to (None for bones posed in world space).
+# sensors report world orientation, so every local rotation depends only on its parent's sensor
+# and the whole tree is solved in one batched multiply, whatever its depth.
+VRM_RIGHT_ARM = [
+    ("J_Bip_R_UpperArm", "/joint/0", None),
+    ("J_Bip_R_LowerArm", "/joint/1", "J_Bip_R_UpperArm"),
+]
+
+VRM_ARMS = VRM_RIGHT_ARM + [
+    ("J_Bip_L_UpperArm", "/joint/2", None),
+    ("J_Bip_L_LowerArm", "/joint/3", "J_Bip_L_UpperArm"),
+]
+
+VRM_FULL_BODY = [
+    ("J_Bip_C_Hips", "/joint/0", None),
+    ("J_Bip_C_Spine", "/joint/1", "J_Bip_C_Hips"),
+    ("J_Bip_C_Chest", "/joint/2", "J_Bip_C_Spine"),
+    ("J_Bip_C_Neck", "/joint/3", "J_Bip_C_Chest"),
+    ("J_Bip_C_Head", "/joint/4", "J_Bip_C_Neck"),
+    ("J_Bip_R_UpperArm", "/joint/5", "J_Bip_C_Chest"),
+    ("J_Bip_R_LowerArm", "/joint/6", "J_Bip_R_UpperArm"),
+    ("J_Bip_R_Hand", "/joint/7", "J_Bip_R_LowerArm"),
+    ("J_Bip_L_UpperArm", "/joint/8", "J_Bip_C_Chest"),
+    ("J_Bip_L_LowerArm", "/joint/9", "J_Bip_L_UpperArm"),
+    ("J_Bip_L_Hand", "/joint/10", "J_Bip_L_LowerArm"),
+    ("J_Bip_R_UpperLeg", "/joint/11", "J_Bip_C_Hips"),
+    ("J_Bip_R_LowerLeg", "/joint/12", "J_Bip_R_UpperLeg"),
+    ("J_Bip_R_Foot", "/joint/13", "J_Bip_R_LowerLeg"),
+    ("J_Bip_L_UpperLeg", "/joint/14", "J_Bip_C_Hips"),
+    ("J_Bip_L_LowerLeg", "/joint/15", "J_Bip_L_UpperLeg"),
+    ("J_Bip_L_Foot", "/joint/16", "J_Bip_L_LowerLeg"),
+]
+
+# by name, for jointreceiver.py --skeleton and the add-on's skeleton selector
+SKELETONS = {"right_arm": VRM_RIGHT_ARM, "arms": VRM_ARMS, "full_body": VRM_FULL_BODY}
+
+
+class Skeleton:
+    def __init__(self, joints):
+        self.bones = [bone for bone, _, _ in joints]
+        self.keys = [key for _, key, _ in joints]
+        # one row per bone and per joint: a repeat would leave a bone or a store slot written twice
+        for name, values in (("bone", self.bones), ("joint", self.keys)):
+            repeated = sorted({value for value in values if values.count(value) > 1})
+            if repeated:
+                raise ValueError(f"{name} {', '.join(repeated)} listed more than once")
+        index = {bone: row for row, bone in enumerate(self.bones)}
+        for bone, _, parent in joints:
+            if parent is not None and parent not in index:
+                raise ValueError(f"parent {parent} of {bone} is not driven by a joint")
+        # row of each bone's parent, or -1 for root bones
+        self.parents = np.array([index[parent] if parent is not None else -1 for _, _, parent in joints])
+        self.has_parent = self.parents >= 0
+
+    @classmethod
+    def from_json(cls, path):
+        # [{"bone": "J_Bip_R_UpperArm", "joint": "/joint/0", "parent": null}, ...]
+        with open(path) as file:
+            return cls([(joint["bone"], joint["joint"], joint.get("parent")) for joint in json.load(file)])
+
+    def slots(self, store):
+        # rows of store.values feeding each bone, resolved once
+        return np.array([store.index[key] for key in self.keys])
+
+    def solve(self, world):
+        # (..., N, 4) world sensor orientations in skeleton order -> (..., N, 4) local bone rotations;
+        # leading axes (e.g. every frame of a recorded session) are solved in the same batch
+        world = np.asarray(world, dtype=np.float64)
+        parent_world = np.where(self.has_parent[:, np.newaxis], world[..., self.parents, :], quatmath.IDENTITY)
+        return quatmath.relative(parent_world, world)
@@ -0,0 +1,51 @@
+import json
+
+# decoding for the newline-delimited {"key": ..., "value": ...} packets sent by the
+# MCUs over UART and by the ESP32 through Event Hub
+
+
+def decode_lines(lines):
+    # returns ([(key, value), ...], [bad_line, ...]); lines may be str or bytes
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return [], []
+
+    # fast path: a batch of well-formed lines is one JSON array, parsed in a single C call
+    opening, separator, closing = ("[", ",", "]") if isinstance(lines[0], str) else (b"[", b",", b"]")
+    try:
+        items = json.loads(opening + separator.join(lines) + closing)
+    except ValueError:
+        return _decode_each(lines)
+    if len(items) != len(lines):
+        # something like `{...},{...}` on one line; let the slow path report it
+        return _decode_each(lines)
+
+    records = [(item["key"], item.get("value")) for item in items if type(item) is dict and item.get("key")]
+    if len(records) == len(items):
+        return records, []
+    errors = [line for line, item in zip(lines, items) if not (type(item) is dict and item.get("key"))]
+    return records, errors
+
+
+def decode_bodies(bodies):
+    # Event Hub bodies arrive with escaped quotes and may hold several lines each
+    text = "\n".join(body.strip() for body in bodies)
+    if '\\"' in text:
+        text = text.replace('\\"', '"')
+    return decode_lines(text.split("\n"))
+
+
+def _decode_each(lines):
+    records = []
+    errors = []
+    for line in lines:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            errors.append(line)
+            continue
+        if isinstance(item, dict) and item.get("key"):
+            records.append((item["key"], item.get("value")))
+        else:
+            errors.append(line)
+    return records, errors
@@ -0,0 +1,87 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+# persistent Sport Timer history: one row per exercise session, plus daily/weekly totals
+# that are updated in the same transaction as each insert, so charts never rescan history
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_user_started ON sessions (user, started_at);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    total REAL NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (user, day)
+);
+CREATE TABLE IF NOT EXISTS weekly_totals (
+    user TEXT NOT NULL,
+    week TEXT NOT NULL,
+    total REAL NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (user, week)
+);
+"""
+
+UPSERT_TOTAL = """
+INSERT INTO {table} (user, {period}, total, sessions) VALUES (?, ?, ?, 1)
+ON CONFLICT (user, {period}) DO UPDATE SET total = total + excluded.total, sessions = sessions + 1
+"""
+
+
+class SessionStore:
+    def __init__(self, path):
+        # one connection shared by every Streamlit session thread, serialized by a lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def add_session(self, user, duration, started_at=None):
+        if started_at is None:
+            started_at = time.time() - duration
+        started = datetime.datetime.fromtimestamp(started_at)
+        day = started.strftime("%Y-%m-%d")
+        iso_year, iso_week, _ = started.isocalendar()
+        week = f"{iso_year}-W{iso_week:02d}"
+
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (user, started_at, duration) VALUES (?, ?, ?)", (user, started_at, duration))
+            self.connection.execute(UPSERT_TOTAL.format(table="daily_totals", period="day"), (user, day, duration))
+            self.connection.execute(UPSERT_TOTAL.format(table="weekly_totals", period="week"), (user, week, duration))
+            return cursor.lastrowid
+
+    def version(self, user):
+        # changes exactly when the user's history does; use it as a cache key
+        with self.lock:
+            row = self.connection.execute("SELECT MAX(id), COUNT(*) FROM sessions WHERE user = ?", (user,)).fetchone()
+        return row[0] or 0, row[1]
+
+    def history(self, user, page=0, page_size=20):
+        # newest first, one page at a time via the (user, started_at) index
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id, started_at, duration FROM sessions WHERE user = ? ORDER BY started_at DESC LIMIT ? OFFSET ?",
+                (user, page_size, page * page_size)).fetchall()
+
+    def daily_totals(self, user, limit=30):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT day, total, sessions FROM daily_totals WHERE user = ? ORDER BY day DESC LIMIT ?",
+                (user, limit)).fetchall()
+        return rows[::-1]
+
+    def weekly_totals(self, user, limit=12):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT week, total, sessions FROM weekly_totals WHERE user = ? ORDER BY week DESC LIMIT ?",
+                (user, limit)).fetchall()
+        return rows[::-1]
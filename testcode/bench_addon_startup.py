@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from bench_frame_pacing import Armature
+from blenderport import UARTCommunicator
+from jointsession import JointSession
+from recorder import SessionRecorder
+from skeleton import VRM_ARMS
+
+BLENDERCODE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode")
+START_TARGET_MS = 50    # Start may block Blender's UI for at most this long, whatever the transport's state
+IMPORTS = ["numpy", "jointsession", "blenderport", "replay", "sharedjoints", "blendercloud", "azure.eventhub"]
+MISSING_PORTS = ["/dev/ttyJOINT0", "/dev/ttyJOINT1"]
+FPS = 60
+
+
+def import_time(module):
+    # cold import in a fresh interpreter, as the first Start in a new Blender session sees it
+    code = (f"import sys, time; sys.path.append({BLENDERCODE!r}); started = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - started)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(result.stdout) * 1e3 if result.returncode == 0 else None
+
+
+def armature():
+    fake = Armature(60)
+    for bone, name in zip(fake.pose.bones, ["J_Bip_R_UpperArm", "J_Bip_R_LowerArm", "J_Bip_L_UpperArm",
+                                            "J_Bip_L_LowerArm"]):
+        bone.name = name
+    return fake
+
+
+def run_frames(session, until, timeout=10.0):
+    # the modal timer: one frame() per tick until until() holds
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        session.frame()
+        time.sleep(1.0 / FPS)
+
+
+def start_session(transport, options=None, **kwargs):
+    started = time.perf_counter()
+    session = JointSession(armature(), VRM_ARMS, transport, options, **kwargs)
+    session.start()
+    return session, (time.perf_counter() - started) * 1e3
+
+
+def record_session(path, seconds=2.0, rate=100):
+    recorder = SessionRecorder(path)
+    for step in range(int(seconds * rate)):
+        for key in ("/joint/0", "/joint/1", "/joint/2", "/joint/3"):
+            recorder.push(key, np.array([1.0, 0.0, 0.0, 0.0]), step / rate)
+    recorder.close()
+
+
+def legacy_blocking():
+    # the old mainapp.py path: UARTCommunicator(auto_connect=True) loops in connect() until the port opens
+    done = threading.Event()
+    uarts = []
+
+    def construct():
+        uarts.append(UARTCommunicator(MISSING_PORTS[0]))
+        done.set()
+
+    thread = threading.Thread(target=construct, daemon=True)
+    thread.start()
+    blocked = not done.wait(2.0)
+    return blocked
+
+
+if __name__ == "__main__":
+    print(f"{'cold import':>16} {'ms':>8}")
+    for module in IMPORTS:
+        elapsed = import_time(module)
+        print(f"{module:>16} {'not installed' if elapsed is None else f'{elapsed:8.1f}':>8}")
+
+    print(f"\n{'transport':>16} {'Start ms':>9} {'source up ms':>13} {'first joints ms':>16} {'Stop ms':>8} {'status'}")
+    rows = []
+
+    session, start_ms = start_session("serial", {"ports": MISSING_PORTS})
+    run_frames(session, lambda: session.source is not None)
+    up_ms = (time.monotonic() - session.started) * 1e3
+    run_frames(session, lambda: False, timeout=0.5)
+    status = session.status()
+    stopped = time.perf_counter()
+    session.stop()
+    rows.append(("serial unplugged", start_ms, up_ms, None, (time.perf_counter() - stopped) * 1e3, status))
+
+    with tempfile.TemporaryDirectory() as path:
+        record_session(path)
+        session, start_ms = start_session("replay", {"session": path})
+        run_frames(session, lambda: session.first_joints is not None)
+        up_ms = (time.monotonic() - session.started) * 1e3
+        status = session.status()
+        stopped = time.perf_counter()
+        session.stop()
+        rows.append(("replay", start_ms, None, session.first_joints * 1e3, (time.perf_counter() - stopped) * 1e3,
+                     status))
+
+    # Start before jointreceiver.py is up: the session keeps retrying, then attaches once the block exists
+    session, start_ms = start_session("shared", shared_memory_name="bench_joints")
+    run_frames(session, lambda: False, timeout=0.5)
+    waiting = session.status()
+    receiver = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "bench_shared_joints.py"), "--receiver", "1000"],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    receiver.stdout.readline()
+    launched = time.monotonic()
+    run_frames(session, lambda: session.first_joints is not None)
+    first_ms = (time.monotonic() - launched) * 1e3
+    stopped = time.perf_counter()
+    session.stop()
+    stop_ms = (time.perf_counter() - stopped) * 1e3
+    receiver.communicate("")
+    rows.append(("shared, late", start_ms, None, first_ms, stop_ms, waiting))
+
+    for name, start_ms, up_ms, first_ms, stop_ms, status in rows:
+        print(f"{name:>16} {start_ms:9.2f} {'-' if up_ms is None else f'{up_ms:.1f}':>13} "
+              f"{'-' if first_ms is None else f'{first_ms:.1f}':>16} {stop_ms:8.1f} {status}")
+    worst = max(row[1] for row in rows)
+    print(f"\nworst Start {worst:.2f} ms, target {START_TARGET_MS} ms: {'met' if worst <= START_TARGET_MS else 'MISSED'}")
+    print(f"legacy UARTCommunicator(auto_connect=True) on an unplugged port still blocked after 2 s: {legacy_blocking()}")
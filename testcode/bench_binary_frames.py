@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blenderport import UARTCommunicator, FRAME_SIZE, QUAT_SCALE, encode_frames
+from fake_mcu import FakeMCU, joint_lines, joint_frames
+
+SAMPLES = 200_000
+BAUD = 115200
+
+
+class CountingCommunicator(UARTCommunicator):
+    def __init__(self, port, expected):
+        self.expected = expected
+        self.count = 0
+        super().__init__(port)
+
+    def handle_lines(self, lines):
+        super().handle_lines(lines)
+        self.count += len(lines)
+        self.check_done()
+
+    def handle_frames(self, data):
+        super().handle_frames(data)
+        self.count += len(data) // FRAME_SIZE
+        self.check_done()
+
+    def check_done(self):
+        if self.count >= self.expected:
+            self.stop_signal.set()
+
+
+def run(payload, expected):
+    mcu = FakeMCU()
+    uart = CountingCommunicator(mcu.port, expected)
+    mcu.write_threaded(payload)
+    start = time.perf_counter()
+    uart.receive_packet()
+    elapsed = time.perf_counter() - start
+    uart.serial_connection.close()
+    mcu.close()
+    return uart, expected / elapsed
+
+
+def check_mixed_stream():
+    # JSON log lines, frames and a corrupted frame interleaved on one port
+    frames, quats = joint_frames(4, joints=(0, 1))
+    corrupted = bytearray(frames[:FRAME_SIZE])
+    corrupted[6] ^= 0xFF
+    payload = (b'{"key": "/log", "value": "Device ready.", "level": "INFO"}\n' + frames[:2 * FRAME_SIZE]
+               + bytes(corrupted) + b'{"key": "/joint/3", "value": [1.00, 0.00, 0.00, 0.00]}\n' + frames[2 * FRAME_SIZE:])
+    uart, _ = run(payload, 7)
+    assert uart.get("/log") == "Device ready."
+    assert uart.get("/joint/3") == [1.0, 0.0, 0.0, 0.0]
+    assert np.allclose(uart.get("/joint/0"), quats[2], atol=QUAT_SCALE)
+    assert np.allclose(uart.get("/joint/1"), quats[3], atol=QUAT_SCALE)
+    assert uart.crc_errors == 1
+    print("mixed JSON/binary stream decoded, corrupted frame rejected")
+
+
+class SampleCount:
+    def __init__(self):
+        self.count = 0
+
+    def push(self, key, value, timestamp, source=None):
+        self.count += 1
+
+
+def check_sequence_gaps():
+    # 254, 255, 255 again, wrap to 0, then 3: one repeated frame and two lost ones
+    sink = SampleCount()
+    uart = UARTCommunicator("bench", auto_connect=False, sinks=[sink])
+    quats = np.tile([1.0, 0.0, 0.0, 0.0], (5, 1))
+    uart.handle_frames(encode_frames([0] * 3, [254, 255, 255], quats[:3]))
+    uart.handle_frames(encode_frames([0] * 2, [0, 3], quats[3:]))
+    assert (uart.dropped_frames, uart.duplicate_frames, sink.count) == (2, 1, 4), \
+        (uart.dropped_frames, uart.duplicate_frames, sink.count)
+    print("sequence gaps counted as dropped frames, repeats as duplicates")
+
+
+if __name__ == "__main__":
+    check_mixed_stream()
+    check_sequence_gaps()
+
+    text = joint_lines(SAMPLES)
+    frames, _ = joint_frames(SAMPLES)
+    _, text_rate = run(text, SAMPLES)
+    _, frame_rate = run(frames, SAMPLES)
+
+    text_bytes = len(text) / SAMPLES
+    frame_bytes = len(frames) / SAMPLES
+    # 10 bits per byte on the wire (start + 8 data + stop)
+    print(f"{'':<12} {'bytes/sample':>12} {'samples/sec @115200':>20} {'host decode samples/sec':>24}")
+    print(f"{'JSON lines':<12} {text_bytes:12.1f} {BAUD / 10 / text_bytes:20.0f} {text_rate:24.0f}")
+    print(f"{'binary':<12} {frame_bytes:12.1f} {BAUD / 10 / frame_bytes:20.0f} {frame_rate:24.0f}")
@@ -0,0 +1,129 @@
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blendercloud import EventHubReceiver, PartitionPool
+from checkpointstore import SQLiteCheckpointStore
+from jointstore import JointStore
+from localhub import LocalEventHub, LocalConsumerClient, joint_payload, bpm_payload
+from motionfeatures import MotionFeatures
+from pipelinestats import PipelineStats
+from pulsewindows import PulseWindows
+
+PARTITIONS = 4
+DEVICES = 64
+BACKLOG = 200_000       # events that arrive while the consumer is down (4 joints per joint event)
+POOL_SIZES = [0, 1, 2, 4]   # 0 = decode and run the sinks on the receive thread
+
+
+def make_sinks():
+    # built inside each pool process
+    return [MotionFeatures(), PulseWindows()]
+
+
+def broken_sinks():
+    raise RuntimeError("sink factory failed")
+
+
+class FailingSink:
+    def push(self, key, value, timestamp, source=None):
+        raise RuntimeError("sink failed")
+
+
+def failing_sinks():
+    return [FailingSink()]
+
+
+def fill(hub, events, rng):
+    joint_pool = [joint_payload(rng) for _ in range(256)]
+    bpm_pool = [bpm_payload(rng) for _ in range(256)]
+    messages = []
+    for i in range(events):
+        body = bpm_pool[i % 256] if i % 50 == 0 else joint_pool[i % 256]
+        messages.append((body, f"esp32-{i % DEVICES:03d}"))
+    hub.send_many(messages)
+
+
+class CatchUpReceiver(EventHubReceiver):
+    def __init__(self, hub, checkpoint_store, processes, starting_position, sink_factory=make_sinks, stats=None):
+        pool = PartitionPool(processes, sink_factory=sink_factory) if processes else None
+        super().__init__(None, hub.name, sinks=() if pool else sink_factory(), store=JointStore(),
+                         consumer_client=LocalConsumerClient(hub, checkpoint_store=checkpoint_store),
+                         partition_pool=pool, starting_position=starting_position, stats=stats)
+        self.positions = {}
+        self.caught_up = threading.Event()
+        self.targets = {str(partition): end - 1 for partition, end in enumerate(hub.end_positions())}
+
+    def checkpoint(self, partition_context, event, force=False):
+        # called once per processed batch; note how far each partition got
+        self.positions[partition_context.partition_id] = event.sequence_number
+        if all(self.positions.get(partition) == target for partition, target in self.targets.items()):
+            self.caught_up.set()
+        super().checkpoint(partition_context, event, force)
+
+
+def run(hub, checkpoint_store, processes, starting_position):
+    receiver = CatchUpReceiver(hub, checkpoint_store, processes, starting_position)
+    start = time.perf_counter()
+    receiver.startThreaded()
+    receiver.caught_up.wait()
+    elapsed = time.perf_counter() - start
+    receiver.stop()
+    receiver.t.join()
+    return elapsed
+
+
+def check_pool_failures(rng):
+    # a worker that cannot build its sinks or dies stops the receiver with an error instead of
+    # stalling it; a batch whose sink raises is logged, skipped and checkpointed
+    for failure in ("factory", "killed"):
+        hub = LocalEventHub(partition_count=PARTITIONS)
+        fill(hub, 1000, rng)
+        receiver = CatchUpReceiver(hub, None, 2, "-1", sink_factory=broken_sinks if failure == "factory" else make_sinks)
+        receiver.startThreaded()
+        if failure == "killed":
+            receiver.partition_pool.workers[0].kill()
+        receiver.t.join(30)
+        assert not receiver.t.is_alive(), f"receiver still running after the pool {failure} failure"
+        assert receiver.partition_pool.failure is not None
+
+    hub = LocalEventHub(partition_count=PARTITIONS)
+    fill(hub, 1000, rng)
+    stats = PipelineStats()
+    receiver = CatchUpReceiver(hub, None, 2, "-1", sink_factory=failing_sinks, stats=stats)
+    receiver.startThreaded()
+    assert receiver.caught_up.wait(30), "failing batches stalled the partitions"
+    receiver.stop()
+    receiver.t.join()
+    assert stats.snapshot()["counters"]["cloud.pool_errors"]["total"] > 0
+    print("pool failures: broken sinks and a killed worker stop the receiver, failing batches are skipped")
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    check_pool_failures(rng)
+    print(f"{BACKLOG} events backlog over {PARTITIONS} partitions, {DEVICES} devices, {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'catch-up s':>11} {'events/s':>10} {'resumed at':>22}")
+    for processes in POOL_SIZES:
+        with tempfile.TemporaryDirectory() as path:
+            checkpoint_store = SQLiteCheckpointStore(os.path.join(path, "checkpoints.db"))
+            hub = LocalEventHub(partition_count=PARTITIONS)
+
+            # first run: consume what is there, checkpoint, stop
+            fill(hub, 1000, rng)
+            run(hub, checkpoint_store, 0, "-1")
+            resumed = [checkpoint["sequence_number"] + 1 for checkpoint in sorted(
+                checkpoint_store.list_checkpoints("local", hub.name, "$Default"), key=lambda c: c["partition_id"])]
+
+            # events pile up while the consumer is down; the restart starts from "@latest" but the
+            # checkpoints win, so it must work through the whole backlog
+            fill(hub, BACKLOG, rng)
+            elapsed = run(hub, checkpoint_store, processes, "@latest")
+            checkpoint_store.close()
+        label = "thread" if processes == 0 else f"{processes} proc"
+        print(f"{label:>8} {elapsed:>11.2f} {BACKLOG / elapsed:>10.0f} {str(resumed):>22}")
@@ -0,0 +1,63 @@
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blendercloud import EventHubReceiver
+from jointstore import JointStore
+from localhub import LocalEventHub, LocalConsumerClient, FakeESP32Fleet
+
+DEVICE_COUNTS = [1, 10, 100, 500]
+JOINT_RATE = 50.0       # joint messages/sec per device (4 joints each)
+BPM_RATE = 1.0
+DURATION = 5.0
+
+
+class MeasuredReceiver(EventHubReceiver):
+    def __init__(self, hub):
+        super().__init__(None, hub.name, consumer_client=LocalConsumerClient(hub), store=JointStore())
+        self.events = 0
+        self.decode_latency = []
+        self.sample_age = []
+
+    def on_event_batch(self, partition_context, events):
+        start = time.perf_counter()
+        super().on_event_batch(partition_context, events)
+        done = time.perf_counter()
+        if not events:
+            return
+        self.events += len(events)
+        self.decode_latency.append(done - start)
+        # age of every sample when it became visible in the store
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        self.sample_age.extend(now - event.enqueued_time.timestamp() for event in events)
+
+
+def percentiles(values, scale=1e3):
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(np.asarray(values) * scale, [50, 95, 99])
+    return f"{p50:7.2f} {p95:7.2f} {p99:7.2f}"
+
+
+if __name__ == "__main__":
+    print(f"{'devices':>7} {'offered/s':>10} {'events/s':>10} {'decode ms p50 p95 p99':>24} {'age ms p50 p95 p99':>24}")
+    for devices in DEVICE_COUNTS:
+        hub = LocalEventHub()
+        receiver = MeasuredReceiver(hub)
+        receiver.startThreaded()
+        fleet = FakeESP32Fleet(hub, devices=devices, joint_rate=JOINT_RATE, bpm_rate=BPM_RATE)
+        time.sleep(0.2)
+        fleet.start_threaded()
+        time.sleep(DURATION)
+        fleet.stop()
+        receiver.stop()
+        receiver.t.join()
+
+        offered = devices * (JOINT_RATE + BPM_RATE)
+        print(f"{devices:>7} {offered:>10.0f} {receiver.events / DURATION:>10.0f} "
+              f"{percentiles(receiver.decode_latency):>24} {percentiles(receiver.sample_age):>24}")
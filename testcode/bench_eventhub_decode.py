@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from jointstore import JointStore
+from telemetry import decode_bodies
+
+EVENTS = 200_000
+BATCH_SIZES = [1, 10, 100, 300]
+
+logger = logging.getLogger("bench")
+logger.setLevel(logging.WARNING)
+
+
+def make_bodies(count, rng):
+    # mix of the shapes seen on the hub: escaped single joints, multi-line joint bursts, BPM
+    bodies = []
+    for i in range(count):
+        q = rng.normal(size=4).round(2).tolist()
+        if i % 10 == 0:
+            bodies.append('{\\"key\\": \\"BPM\\", \\"value\\": %d}' % (60 + i % 40))
+        elif i % 3 == 0:
+            bodies.append("\n".join('{"key": "/joint/%d", "value": %s}' % (j, json.dumps(q)) for j in range(4)))
+        else:
+            bodies.append('{"key": "/joint/%d", "value": %s}' % (i % 4, json.dumps(q)))
+    return bodies
+
+
+def legacy(bodies, store):
+    # the previous on_event body, once per event
+    data_table = {}
+    for data in bodies:
+        data = data.replace('\\"', '"')
+        for line in data.strip().split('\n'):
+            try:
+                item = json.loads(line)
+                key = item.get("key")
+                if not key:
+                    continue
+                data_table[key] = item.get("value")
+                logger.info(f"Updated data_table: {data_table}")
+            except json.decoder.JSONDecodeError:
+                pass
+
+
+def batched(bodies, store, batch_size):
+    for start in range(0, len(bodies), batch_size):
+        records, errors = decode_bodies(bodies[start:start + batch_size])
+        for key, value in records:
+            store.update(key, value)
+        logger.info("Updated %d values", len(records))
+
+
+def rate(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return EVENTS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    bodies = make_bodies(EVENTS, np.random.default_rng(0))
+    print(f"{'per-event json.loads + f-string log':<40} {rate(legacy, bodies, None):12.0f} events/sec")
+    for batch_size in BATCH_SIZES:
+        label = f"decode_bodies, batch of {batch_size}"
+        print(f"{label:<40} {rate(batched, bodies, JointStore(), batch_size):12.0f} events/sec")
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from framepacing import FramePacer
+from jointstore import JointStore
+from posewriter import PoseWriter
+
+DATA_RATES = [20, 60, 200]  # joint samples/sec per joint
+SECONDS = 20
+BONES = 60                  # pose bones in the VRM armature
+
+
+class PoseBones(list):
+    # just enough of bpy_prop_collection for PoseWriter: names plus foreach_get/foreach_set
+    def __init__(self, count):
+        super().__init__(type("PoseBone", (), {"name": f"bone{i}"})() for i in range(count))
+        self.rotations = np.tile(np.array(quatmath.IDENTITY, dtype=np.float32), count)
+        self.sets = 0
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = self.rotations
+
+    def foreach_set(self, attribute, buffer):
+        self.rotations[:] = buffer
+        self.sets += 1
+
+
+class Armature:
+    def __init__(self, count):
+        self.pose = type("Pose", (), {"bones": PoseBones(count)})()
+
+    def update_tag(self):
+        pass
+
+
+def arm_motion(t):
+    # 5 s of swinging, then 5 s holding still (with sensor noise), repeated
+    moving = (t % 10) < 5
+    angle = np.where(moving, 0.6 * np.sin(2 * np.pi * 0.5 * t), 0.0)
+    rng = np.random.default_rng(int(t * 1000))
+    quat = np.array([np.cos(angle / 2), np.sin(angle / 2), 0.0, 0.0]) + rng.normal(scale=5e-4, size=4)
+    return quat / np.linalg.norm(quat)
+
+
+if __name__ == "__main__":
+    print(f"{'data Hz':>7} {'timer fps':>9} {'frames':>7} {'writes':>7} {'skipped':>8} {'frame ms p50/p95/p99/max':>28}")
+    for rate in DATA_RATES:
+        store = JointStore()
+        armature = Armature(BONES)
+        writer = PoseWriter(armature, ["bone10", "bone11"])
+        pacer = FramePacer()
+        generation = -1
+
+        # simulated clock: samples are written into the store at `rate`, frames run at the pacer's interval
+        clock = 0.0
+        next_sample = 0.0
+        while clock < SECONDS:
+            while next_sample <= clock:
+                quat = arm_motion(next_sample)
+                for key in store.keys:
+                    store.update(key, quat, next_sample)
+                next_sample += 1.0 / rate
+
+            started = time.perf_counter()
+            snapshot = store.snapshot()
+            updated = False
+            if snapshot.generation != generation:
+                generation = snapshot.generation
+                pacer.arrival(snapshot.sequence, snapshot.timestamps)
+                lower = quatmath.relative(snapshot.values[0], snapshot.values[1])
+                updated = writer.write((snapshot.values[0], lower)) > 0
+            pacer.frame(time.perf_counter() - started, updated)
+
+            # retime on the simulated clock rather than wall time
+            pacer.retimed -= 1.0
+            pacer.next_interval()
+            clock += pacer.interval
+
+        p50, p95, p99, worst = pacer.percentiles()
+        print(f"{rate:>7} {1 / pacer.interval:>9.0f} {pacer.frames:>7} {armature.pose.bones.sets:>7} "
+              f"{writer.skipped:>8} {p50:>8.3f}/{p95:.3f}/{p99:.3f}/{worst:.3f}")
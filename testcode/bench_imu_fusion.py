@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from blenderport import decode_raw_imu
+from imufusion import ImuFusion, SAMPLE_PERIOD
+
+SENSOR_COUNTS = [1, 2, 4, 8, 16, 32]
+SAMPLES_PER_TICK = 5    # ~50 ms of 100 Hz data queued per sensor between PortManager loops
+TICKS = 200
+GRAVITY = np.array([0.0, 0.0, 1.0])
+FIELD = np.array([0.4, 0.0, -0.9])   # roughly a mid-latitude field, north and downward
+
+
+def rotate(q, v):
+    # v expressed in the frame q rotates into (earth -> sensor uses the conjugate)
+    vq = np.concatenate([np.zeros(v.shape[:-1] + (1,)), v], axis=-1)
+    return quatmath.multiply(quatmath.multiply(q, vq), quatmath.conjugate(q))[..., 1:]
+
+
+def raw_lines(truth, rng, count):
+    # what 9axisdata.ino prints for a board held still at orientation `truth`
+    accel = rotate(quatmath.conjugate(truth), GRAVITY) * 1000 + rng.normal(scale=10, size=(count, 3))
+    mag = rotate(quatmath.conjugate(truth), FIELD) * 300 + rng.normal(scale=5, size=(count, 3))
+    gyro = rng.normal(scale=0.3, size=(count, 3))
+    # milli-g and milligauss as integers, deg/s with two decimals
+    return [(f"{ax:.0f}\t{ay:.0f}\t{az:.0f}\t{gx:.2f}\t{gy:.2f}\t{gz:.2f}\t{mx:.0f}\t{my:.0f}\t{mz:.0f}").encode()
+            for ax, ay, az, gx, gy, gz, mx, my, mz in np.hstack([accel, gyro, mag]).tolist()]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    # convergence: a still board at an arbitrary orientation, starting from identity
+    truth = quatmath.normalize(np.array([0.8, 0.3, -0.4, 0.35]))
+    fusion = ImuFusion(beta=0.5)
+    for _ in range(300):
+        samples, _ = decode_raw_imu(raw_lines(truth, rng, SAMPLES_PER_TICK))
+        fusion.add("/joint/0", samples, 0.0)
+        (_, quat, _), = fusion.update()
+    print(f"still board after {300 * SAMPLES_PER_TICK * SAMPLE_PERIOD:.0f} s: "
+          f"{np.degrees(quatmath.angle_between(quat, truth)):.2f} deg from truth\n")
+
+    print(f"{'sensors':>7} {'parse samples/s':>16} {'fuse samples/s':>15} {'us/tick':>8} {'realtime x':>11}")
+    for sensors in SENSOR_COUNTS:
+        keys = [f"/joint/{sensor}" for sensor in range(sensors)]
+        lines = raw_lines(truth, rng, SAMPLES_PER_TICK)
+        fusion = ImuFusion()
+
+        parse = 0.0
+        fuse = 0.0
+        for tick in range(TICKS):
+            start = time.perf_counter()
+            batches = [decode_raw_imu(lines)[0] for _ in keys]
+            parse += time.perf_counter() - start
+            start = time.perf_counter()
+            for key, samples in zip(keys, batches):
+                fusion.add(key, samples, tick)
+            fusion.update()
+            fuse += time.perf_counter() - start
+
+        samples = sensors * SAMPLES_PER_TICK * TICKS
+        realtime = samples * SAMPLE_PERIOD / sensors / (parse + fuse)
+        print(f"{sensors:>7} {samples / parse:>16.0f} {samples / fuse:>15.0f} {fuse / TICKS * 1e6:>8.0f} {realtime:>11.1f}")
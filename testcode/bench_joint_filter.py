@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from jointfilter import JointFilter
+from jointstore import JointStore
+from recorder import SessionRecorder, SessionReader
+
+JOINTS = 4
+SECONDS = 30
+FPS = 60
+PATHS = {
+    # name: (samples/sec, arrival jitter s, transport latency s)
+    "serial 100 Hz": (100, 0.002, 0.005),
+    "cloud 20 Hz": (20, 0.015, 0.080),
+}
+COST_JOINTS = [4, 16, 32]
+
+
+def truth(t, joints):
+    # each joint swings about its own axis at its own pace
+    frequencies = 0.3 + 0.2 * np.arange(joints)
+    angles = 0.8 * np.sin(2 * np.pi * np.outer(np.atleast_1d(t), frequencies))
+    axes = np.eye(3)[np.arange(joints) % 3]
+    return np.concatenate([np.cos(angles / 2)[..., None], np.sin(angles / 2)[..., None] * axes], axis=-1)
+
+
+def record(path, rate, jitter, latency, rng):
+    # what the recorder sees: samples taken every 1/rate s, stamped when they arrive
+    # simulated time runs faster than the flush thread's clock, so give it a chunk per second
+    recorder = SessionRecorder(path, chunk_count=SECONDS + 2)
+    taken = np.arange(0, SECONDS, 1.0 / rate)
+    arrived = np.sort(taken + latency + rng.uniform(0, jitter, size=len(taken)))
+    poses = truth(taken, JOINTS)
+    for arrival, pose in zip(arrived, poses):
+        for joint in range(JOINTS):
+            recorder.push(f"/joint/{joint}", pose[joint], arrival)
+    recorder.close()
+
+
+def render(path, mode, latency):
+    # drive a store from the recording and render at FPS, with or without the filter
+    reader = SessionReader(path)
+    times = reader.time
+    joints = reader.joint
+    quats = reader.quat
+    store = JointStore([f"/joint/{joint}" for joint in range(JOINTS)])
+    joint_filter = JointFilter(JOINTS, lead=latency if mode == "lead" else 0.0)
+    frames, rendered = [], []
+    row = 0
+    for frame in np.arange(0.2, SECONDS, 1.0 / FPS):
+        while row < len(times) and times[row] <= frame:
+            store.update(reader.keys[joints[row]], quats[row], times[row])
+            row += 1
+        snapshot = store.snapshot()
+        pose = snapshot.values if mode == "raw" else joint_filter.update(snapshot, frame)
+        frames.append(frame)
+        rendered.append(pose.copy())
+    return np.array(frames), np.array(rendered)
+
+
+def score(frames, rendered):
+    actual = truth(frames, JOINTS)
+    error = np.degrees(quatmath.angle_between(rendered, actual))
+    # jitter: how much the rendered frame-to-frame motion deviates from the true motion
+    step = quatmath.angle_between(rendered[1:], rendered[:-1])
+    true_step = quatmath.angle_between(actual[1:], actual[:-1])
+    jitter = np.degrees(np.sqrt(np.mean((step - true_step) ** 2)))
+    return np.sqrt(np.mean(error ** 2)), np.percentile(error, 95), jitter
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'path':>14} {'mode':>8} {'rms err deg':>12} {'p95 err deg':>12} {'jitter deg/frame':>17}")
+    with tempfile.TemporaryDirectory() as path:
+        for name, (rate, jitter, latency) in PATHS.items():
+            session = os.path.join(path, name.replace(" ", "_"))
+            record(session, rate, jitter, latency, rng)
+            # "lead" also predicts ahead by the path's known transport latency
+            for mode in ["raw", "filter", "lead"]:
+                rms, p95, frame_jitter = score(*render(session, mode, latency))
+                print(f"{name:>14} {mode:>8} {rms:>12.2f} {p95:>12.2f} {frame_jitter:>17.3f}")
+
+    print(f"\n{'joints':>6} {'filter us/frame':>16}")
+    for joints in COST_JOINTS:
+        store = JointStore([f"/joint/{joint}" for joint in range(joints)])
+        joint_filter = JointFilter(joints)
+        frames = 2000
+        cost = 0.0
+        for frame in range(frames):
+            now = frame / FPS
+            if frame % 3 == 0:
+                for key, quat in zip(store.keys, truth(now, joints)[0]):
+                    store.update(key, quat, now)
+            snapshot = store.snapshot()
+            start = time.perf_counter()
+            joint_filter.update(snapshot, now)
+            cost += (time.perf_counter() - start) / frames
+        print(f"{joints:>6} {cost * 1e6:>16.1f}")
@@ -0,0 +1,64 @@
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from motionfeatures import MotionFeatures
+
+RATE = 1000         # samples/sec per joint
+JOINTS = 8
+SECONDS = 30        # simulated session length, pushed as fast as possible
+SWING_HZ = 0.5      # each joint swings back and forth this often (one rep per cycle)
+SWING_ANGLE = 1.2   # radians peak to peak
+
+
+def swing(rng):
+    # every joint rotates about its own axis with a little sensor noise
+    t = np.arange(RATE * SECONDS) / RATE
+    quats = []
+    for joint in range(JOINTS):
+        angle = SWING_ANGLE / 2 * np.sin(2 * np.pi * SWING_HZ * t + joint) + SWING_ANGLE / 2
+        axis = np.eye(3)[joint % 3]
+        q = np.column_stack([np.cos(angle / 2), np.sin(angle / 2)[:, None] * axis])
+        q += rng.normal(scale=0.002, size=q.shape)
+        quats.append(q / np.linalg.norm(q, axis=1, keepdims=True))
+    # interleave joints in arrival order
+    return t, np.stack(quats, axis=1)
+
+
+if __name__ == "__main__":
+    t, quats = swing(np.random.default_rng(0))
+    keys = [f"/joint/{joint}" for joint in range(JOINTS)]
+    rows = quats.tolist()
+    times = t.tolist()
+    features = MotionFeatures()
+
+    worst = 0.0
+    start = time.perf_counter()
+    for row, timestamp in zip(rows, times):
+        t0 = time.perf_counter()
+        for key, quat in zip(keys, row):
+            features.push(key, quat, timestamp)
+        worst = max(worst, time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    samples = RATE * JOINTS * SECONDS
+    start = time.perf_counter()
+    for _ in range(1000):
+        snapshot = features.features()
+    read = (time.perf_counter() - start) / 1000
+
+    print(f"{samples} samples ({RATE} Hz x {JOINTS} joints x {SECONDS} s)")
+    print(f"push:        {samples / elapsed:12.0f} samples/sec  ({elapsed / samples * 1e6:.2f} us/sample)")
+    print(f"core load at {RATE} Hz x {JOINTS}: {RATE * JOINTS * elapsed / samples * 100:.1f} %")
+    print(f"worst row of {JOINTS} pushes: {worst * 1e6:.1f} us")
+    print(f"features() read: {read * 1e6:.1f} us")
+    expected = math.floor(SECONDS * SWING_HZ)
+    for key in keys:
+        f = snapshot[key]
+        print(f"  {key}: reps {f.reps} (expected ~{expected}), rom {f.range_of_motion:.2f} rad, "
+              f"ang vel ema {f.angular_velocity_ema:.2f} rad/s")
@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from livebuffers import downsample_minmax
+from motionfeatures import MotionFeatures
+from motionrollups import MotionRollups
+from motionstate import compute_motion_state, downsample_motion_state
+
+RATE = 50                       # samples/sec of the joint
+SESSION_MINUTES = [10, 60, 360]
+RANGES = {"10 min": 600, "1 h": 3600, "session": None}
+POWERBI_ROWS = [100_000, 1_000_000]
+JOINTS = ["/joint/0", "/joint/1", "/joint/2", "/joint/3"]
+
+
+def joint_samples(count, rng):
+    # arm swinging for 20 s, resting for 10 s, with sensor noise
+    t = np.arange(count) / RATE
+    angle = np.where((t % 30) < 20, 0.9 * np.sin(2 * np.pi * 0.3 * t), 0.1)
+    quats = np.column_stack([np.cos(angle / 2), np.sin(angle / 2), np.zeros(count), np.zeros(count)])
+    quats = quatmath.normalize(quats + rng.normal(scale=2e-3, size=quats.shape))
+    return t, [tuple(q) for q in quats.tolist()]
+
+
+def push_cost(sink, times, quats):
+    started = time.perf_counter()
+    for timestamp, quat in zip(times.tolist(), quats):
+        sink.push("/joint/0", quat, timestamp, "bench")
+    return (time.perf_counter() - started) / len(quats) * 1e6
+
+
+def render(times, values):
+    # what st.plotly_chart ships to the browser for one joint
+    started = time.perf_counter()
+    go.Figure(go.Scatter(x=pd.to_datetime(times, unit="s"), y=values, mode="lines")).to_json()
+    return (time.perf_counter() - started) * 1e3
+
+
+def check_rollups(times, quats):
+    # buckets start on whole wall-clock seconds and minutes
+    rollups = MotionRollups()
+    for timestamp, quat in zip((times + 0.37).tolist(), quats):
+        rollups.push("/joint/0", quat, timestamp, "bench")
+    for level, resolution in enumerate((1.0, 60.0)):
+        starts, _ = rollups.joints[("bench", "/joint/0")].rows(level)
+        wall = starts + rollups.wall_offset
+        assert np.allclose(wall - np.round(wall / resolution) * resolution, 0.0, atol=1e-3), resolution
+
+    # receivers pushing the same new joints from several threads (one per partition or port)
+    rollups = MotionRollups()
+    pushes = 2000
+
+    def push():
+        for step in range(pushes):
+            rollups.push(f"/joint/{step % 4}", quats[step], float(times[step]), "bench")
+
+    threads = [threading.Thread(target=push) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(rollups.summary("bench", key).count for key in rollups.keys("bench")) == 4 * pushes
+
+
+def raw_states(quats):
+    euler = quatmath.to_euler(np.array(quats))
+    return np.sqrt(np.einsum("ij,ij->i", euler, euler))
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    times, quats = joint_samples(RATE * 600, rng)
+    check_rollups(times, quats)
+    print(f"sink push, {len(quats)} samples: MotionFeatures {push_cost(MotionFeatures(), times, quats):.2f} us, "
+          f"MotionRollups {push_cost(MotionRollups(), times, quats):.2f} us per sample")
+
+    print(f"\n{'session':>8} {'range':>8} {'raw points':>11} {'raw render ms':>14} {'series ms':>10} "
+          f"{'points':>7} {'render ms':>10} {'raw max':>8} {'rollup max':>11}")
+    for minutes in SESSION_MINUTES:
+        times, quats = joint_samples(RATE * 60 * minutes, rng)
+        rollups = MotionRollups()
+        # the session ends now, so ranges measured back from time.time() line up with the samples
+        times = times - times[-1] + (time.time() - rollups.wall_offset)
+        for timestamp, quat in zip(times.tolist(), quats):
+            rollups.push("/joint/0", quat, timestamp, "bench")
+        states = raw_states(quats)
+        wall = times + rollups.wall_offset
+        for name, seconds in RANGES.items():
+            if seconds is not None and seconds > minutes * 60:
+                continue
+            start = time.time() - seconds if seconds is not None else None
+            keep = wall >= start if start is not None else np.ones(len(wall), dtype=bool)
+            raw_ms = render(wall[keep], states[keep])
+            started = time.perf_counter()
+            series = rollups.series("bench", "/joint/0", start=start)
+            series_ms = (time.perf_counter() - started) * 1e3
+            rollup_ms = render(series.time, series.mean)
+            print(f"{minutes:>6} m {name:>8} {int(keep.sum()):>11} {raw_ms:14.1f} {series_ms:10.2f} {len(series.time):>7} "
+                  f"{rollup_ms:10.1f} {states[keep].max():8.3f} {series.max.max():11.3f}")
+
+    print(f"\n{'Power BI rows':>13} {'motion state ms':>16} {'LTTB ms':>8} {'min/max ms':>11} {'points/joint':>13}")
+    for rows in POWERBI_ROWS:
+        quats = quatmath.normalize(rng.normal(size=(rows, 4)))
+        df = pd.DataFrame({
+            "EventTime": pd.date_range("2024-05-01", periods=rows, freq="10ms"),
+            "JointKey": np.array(JOINTS)[np.arange(rows) % len(JOINTS)],
+            "w": quats[:, 0], "x": quats[:, 1], "y": quats[:, 2], "z": quats[:, 3],
+        })
+        started = time.perf_counter()
+        df = compute_motion_state(df)
+        computed = time.perf_counter()
+        groups = [(joint["EventTime"].to_numpy(), joint["motion_state"].to_numpy())
+                  for _, joint in df.groupby("JointKey", sort=False)]
+        started_lttb = time.perf_counter()
+        points = [len(downsample_motion_state(x, y)[0]) for x, y in groups]
+        lttb = time.perf_counter()
+        for x, y in groups:
+            downsample_minmax(x, y, 2000)
+        minmax = time.perf_counter()
+        print(f"{rows:>13} {(computed - started) * 1e3:16.1f} {(lttb - started_lttb) * 1e3:8.1f} "
+              f"{(minmax - lttb) * 1e3:11.1f} {max(points):>13}")
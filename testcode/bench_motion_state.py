@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from motionstate import compute_motion_state, motion_state_by_joint
+
+SIZES = [10_000, 100_000, 1_000_000]
+LEGACY_MAX_ROWS = 100_000   # the row-wise apply takes minutes beyond this
+JOINTS = ["/joint/0", "/joint/1", "/joint/2", "/joint/3"]
+
+
+def make_dataset(rows, rng):
+    quats = quatmath.normalize(rng.normal(size=(rows, 4)))
+    return pd.DataFrame({
+        "EventTime": pd.date_range("2024-05-01", periods=rows, freq="10ms"),
+        "JointKey": np.array(JOINTS)[np.arange(rows) % len(JOINTS)],
+        "w": quats[:, 0], "x": quats[:, 1], "y": quats[:, 2], "z": quats[:, 3],
+    })
+
+
+def quaternion_to_euler(w, x, y, z):
+    t0 = +2.0 * (w * x + y * z)
+    t1 = +1.0 - 2.0 * (x * x + y * y)
+    t2 = np.clip(+2.0 * (w * y - z * x), -1.0, +1.0)
+    t3 = +2.0 * (w * z + x * y)
+    t4 = +1.0 - 2.0 * (y * y + z * z)
+    return np.arctan2(t0, t1), np.arcsin(t2), np.arctan2(t3, t4)
+
+
+def legacy(df):
+    # the previous visual body, minus plotting
+    df = df.copy()
+    df[['roll', 'pitch', 'yaw']] = df.apply(
+        lambda row: quaternion_to_euler(row['w'], row['x'], row['y'], row['z']),
+        axis=1, result_type='expand'
+    )
+    df['motion_state'] = np.sqrt(df['roll']**2 + df['pitch']**2 + df['yaw']**2)
+    for joint in df['JointKey'].unique():
+        joint_data = df[df['JointKey'] == joint]
+        joint_data['motion_state'].to_numpy()
+
+
+def vectorized(df):
+    df = compute_motion_state(df)
+    for joint, joint_data in motion_state_by_joint(df):
+        joint_data["motion_state"].to_numpy()
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    func(df)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'row-wise apply':>16} {'vectorized':>12}")
+    for rows in SIZES:
+        df = make_dataset(rows, rng)
+        before = f"{timed(legacy, df) * 1e3:13.1f} ms" if rows <= LEGACY_MAX_ROWS else f"{'skipped':>16}"
+        after = timed(vectorized, df)
+        print(f"{rows:>10} {before} {after * 1e3:9.1f} ms")
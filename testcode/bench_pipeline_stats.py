@@ -0,0 +1,151 @@
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blendercloud import EventHubReceiver
+from blenderport import UARTCommunicator
+from fake_mcu import joint_lines, joint_frames
+from jointstore import JointStore
+from localhub import LocalConsumerClient, LocalEventData, LocalEventHub, bpm_payload, joint_payload
+from pipelinestats import LatencyHistogram, PipelineStats
+
+SAMPLES = 100_000
+CHUNK_SAMPLES = [1, 4, 32]      # samples per serial read: 1 is the worst case for per-chunk overhead
+EVENTS = 50_000
+BATCH_SIZES = [1, 30, 300]
+REPEATS = 7
+
+
+class Context:
+    partition_id = "0"
+
+    def update_checkpoint(self, event=None):
+        pass
+
+
+def chunks(data, sample_bytes, per_chunk):
+    size = sample_bytes * per_chunk
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def serial_cost(payload, stats):
+    uart = UARTCommunicator("bench", auto_connect=False, store=JointStore(), stats=stats)
+    start = time.perf_counter()
+    for chunk in payload:
+        uart.handle_chunk(chunk)
+    return time.perf_counter() - start
+
+
+def cloud_cost(batches, stats):
+    receiver = EventHubReceiver("local", "local", consumer_client=LocalConsumerClient(LocalEventHub()),
+                                store=JointStore(), stats=stats)
+    context = Context()
+    start = time.perf_counter()
+    for events in batches:
+        receiver.on_event_batch(context, events)
+    return time.perf_counter() - start
+
+
+def overhead(run, payload):
+    # best of a few runs each way, interleaved so drift hits both equally
+    enabled = disabled = float("inf")
+    stats = None
+    for _ in range(REPEATS):
+        disabled = min(disabled, run(payload, PipelineStats(enabled=False)))
+        stats = PipelineStats()
+        enabled = min(enabled, run(payload, stats))
+    return disabled, enabled, stats
+
+
+def check_histogram():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=np.log(2e-3), sigma=0.8, size=100_000)
+    histogram = LatencyHistogram()
+    for chunk in np.array_split(values, 100):
+        histogram.record(chunk)
+    for percent in (50, 90, 99, 99.9):
+        exact = np.percentile(values, percent)
+        assert abs(histogram.percentile(percent) / exact - 1) < 0.04, percent
+    assert histogram.percentile(100) == values.max()
+
+    # zero and negative (clock skew) latencies go to the first bucket, out-of-range ones to the ends
+    histogram = LatencyHistogram()
+    histogram.record(np.zeros(90))
+    histogram.record(np.full(10, 5e-3))
+    assert histogram.percentile(50) < 1e-6 and abs(histogram.percentile(95) / 5e-3 - 1) < 0.04
+    histogram = LatencyHistogram()
+    histogram.record(np.full(90, -0.2))
+    histogram.record(np.full(10, 5e-3))
+    assert histogram.percentile(50) < 1e-6
+    histogram = LatencyHistogram()
+    histogram.record([1e-12, 1e-9, 1e4])
+    assert histogram.buckets[0] == 2 and histogram.buckets[-1] == 1
+    assert histogram.percentile(100) == 1e4
+    print("histogram percentiles within 4% of exact; zero, negative and out-of-range values bucketed")
+
+
+if __name__ == "__main__":
+    check_histogram()
+
+    stats = PipelineStats()
+    start = time.perf_counter()
+    for i in range(200_000):
+        stats.latency("stage", 1e-3)
+    latency = (time.perf_counter() - start) / 200_000
+    start = time.perf_counter()
+    for i in range(200_000):
+        stats.count("counter", 3)
+    count = (time.perf_counter() - start) / 200_000
+    # what UARTCommunicator adds per chunk: one clock read and one tuple append (received and
+    # decoded are read anyway); the end-to-end runs below are noisier than this difference
+    record_chunk = stats.chunk_recorder("serial")
+    start = time.perf_counter()
+    for i in range(200_000):
+        received = time.monotonic()
+        record_chunk((60, 1, 0, 1, received, received, time.monotonic()))
+    per_chunk = (time.perf_counter() - start) / 200_000
+    start = time.perf_counter()
+    for i in range(200_000):
+        received = time.monotonic()
+    per_chunk -= (time.perf_counter() - start) / 200_000
+    stats.fold()
+    print(f"stats.latency {latency * 1e6:.2f} us, stats.count {count * 1e6:.2f} us, "
+          f"serial instrumentation {per_chunk * 1e6:.2f} us per chunk")
+
+    text = joint_lines(SAMPLES)
+    frames, _ = joint_frames(SAMPLES)
+    print(f"\n{'serial':<8} {'samples/read':>12} {'us/sample off':>14} {'on':>8} {'overhead':>9} {'per-chunk est.':>15}")
+    instrumentation = per_chunk
+    for name, data in (("JSON", text), ("binary", frames)):
+        for per_chunk in CHUNK_SAMPLES:
+            payload = chunks(data, len(data) // SAMPLES, per_chunk)
+            disabled, enabled, stats = overhead(serial_cost, payload)
+            chunk_cost = disabled / len(payload)
+            print(f"{name:<8} {per_chunk:>12} {disabled / SAMPLES * 1e6:14.2f} {enabled / SAMPLES * 1e6:8.2f} "
+                  f"{(enabled / disabled - 1) * 100:8.1f}% {instrumentation / chunk_cost * 100:14.1f}%")
+    print(stats.summary())
+
+    rng = random.Random(0)
+    bodies = [bpm_payload(rng) if i % 10 == 0 else joint_payload(rng) for i in range(EVENTS)]
+    events = [LocalEventData(body, f"esp32-{i % 4}", "0", i) for i, body in enumerate(bodies)]
+    print(f"\n{'cloud':<8} {'events/batch':>12} {'us/event off':>14} {'on':>8} {'overhead':>9}")
+    for batch_size in BATCH_SIZES:
+        batches = [events[start:start + batch_size] for start in range(0, EVENTS, batch_size)]
+        disabled, enabled, stats = overhead(cloud_cost, batches)
+        print(f"{'':<8} {batch_size:>12} {disabled / EVENTS * 1e6:14.2f} {enabled / EVENTS * 1e6:8.2f} "
+              f"{(enabled / disabled - 1) * 100:8.1f}%")
+    print(stats.summary())
+
+    # the apply stage: one call per rendered frame
+    stats = PipelineStats()
+    timestamps = np.full(4, time.monotonic())
+    start = time.perf_counter()
+    for _ in range(100_000):
+        stats.applied(timestamps)
+    applied = (time.perf_counter() - start) / 100_000
+    print(f"\napply: {applied * 1e6:.2f} us per frame ({applied * 60 * 100:.3f}% of a core at 60 fps)")
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blenderport import UARTCommunicator, PortManager
+
+PORT_COUNTS = [1, 2, 4, 8, 16]
+RATE = 400          # lines/sec per port, roughly two DMP joints at full rate
+DURATION = 3.0
+
+
+def start_fake_mcus(count):
+    process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_mcu.py"),
+                                "--ports", str(count), "--rate", str(RATE)], stdout=subprocess.PIPE, text=True)
+    ports = [process.stdout.readline().strip() for _ in range(count)]
+    return process, ports
+
+
+def measure(start, stop):
+    cpu = time.process_time()
+    start()
+    time.sleep(0.5)
+    threads = threading.active_count()
+    time.sleep(DURATION - 0.5)
+    cpu = time.process_time() - cpu
+    stop()
+    return threads, cpu / DURATION * 100
+
+
+def thread_per_port(ports):
+    uarts = [UARTCommunicator(port) for port in ports]
+
+    def start():
+        for uart in uarts:
+            uart.start_threaded()
+
+    def stop():
+        for uart in uarts:
+            uart.stop()
+        for uart in uarts:
+            uart.thread.join()
+
+    return measure(start, stop)
+
+
+def port_manager(ports):
+    manager = PortManager(ports)
+
+    def stop():
+        manager.stop()
+        manager.thread.join()
+
+    return measure(manager.start_threaded, stop)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    PortManager(["/dev/does-not-exist"])
+    print(f"PortManager construction with a missing port: {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    print(f"{'ports':>5} {'threads (per-port)':>19} {'cpu % (per-port)':>17} {'threads (manager)':>18} {'cpu % (manager)':>16}")
+    for count in PORT_COUNTS:
+        process, ports = start_fake_mcus(count)
+        before = thread_per_port(ports)
+        after = port_manager(ports)
+        process.terminate()
+        process.wait()
+        print(f"{count:>5} {before[0]:>19} {before[1]:>17.1f} {after[0]:>18} {after[1]:>16.1f}")
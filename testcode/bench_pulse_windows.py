@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from pulsewindows import PulseWindows, AggregateFile
+
+DEVICES = 100
+HOURS = 24          # simulated time, pushed as fast as possible
+BPM_RATE = 1.0      # readings per second per device, as sent by the ESP32 loop
+WINDOWS = [60.0, 300.0]
+
+
+def readings(rng):
+    # a resting pulse with slow drift, beat-to-beat noise and the odd sensor glitch
+    steps = int(HOURS * 3600 * BPM_RATE)
+    drift = 70 + 15 * np.sin(np.arange(steps) / (600 * BPM_RATE))
+    bpm = np.rint(drift + rng.normal(scale=3, size=steps)).astype(int)
+    glitches = rng.random(steps) < 0.001
+    bpm[glitches] = rng.choice([0, 255, 30, 200], size=glitches.sum())
+    return bpm.tolist()
+
+
+if __name__ == "__main__":
+    bpm = readings(np.random.default_rng(0))
+    devices = [f"esp32-{device:03d}" for device in range(DEVICES)]
+    events = len(bpm) * DEVICES
+    # what storing every raw event body costs today
+    raw_bytes = sum(len(json.dumps({"key": "BPM", "value": value})) for value in bpm) * DEVICES
+
+    print(f"{events} BPM events ({DEVICES} devices x {HOURS} h at {BPM_RATE} Hz), raw bodies {raw_bytes / 1e6:.1f} MB")
+    for window in WINDOWS:
+        with tempfile.TemporaryDirectory() as path:
+            output = AggregateFile(os.path.join(path, "pulse.jsonl"))
+            aggregates = []
+            pulse_windows = PulseWindows(window=window, outputs=[output, aggregates.append])
+            start = time.perf_counter()
+            for step, value in enumerate(bpm):
+                timestamp = step / BPM_RATE
+                for device in devices:
+                    pulse_windows.push("BPM", value, timestamp, device)
+            pulse_windows.flush(len(bpm) / BPM_RATE + window)
+            elapsed = time.perf_counter() - start
+            output.close()
+            size = os.path.getsize(os.path.join(path, "pulse.jsonl"))
+
+        flagged = sum(a.low + a.high + a.invalid for a in aggregates)
+        print(f"window {window:5.0f} s: {events / elapsed:9.0f} events/sec, {len(aggregates)} aggregates "
+              f"({events / len(aggregates):.0f}x fewer rows), {size / 1e6:.2f} MB ({raw_bytes / size:.0f}x smaller), "
+              f"{flagged} readings flagged")
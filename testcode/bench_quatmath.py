@@ -0,0 +1,57 @@
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+
+FRAMES = 20000
+ROWS = 1_000_000
+
+
+def multiply_quaternions(q1, q0):
+    # the per-joint helper previously duplicated in mainapp.py / maincloud.py
+    w0, x0, y0, z0 = q0
+    w1, x1, y1, z1 = q1
+    return np.array([-x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0,
+                     x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0,
+                     -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0,
+                     x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0], dtype=np.float64)
+
+
+def legacy_frame(joints):
+    right_upper, right_lower, left_upper, left_lower = (np.array(q) for q in joints)
+    multiply_quaternions(right_upper * np.array([1, -1, -1, -1]), right_lower)
+    multiply_quaternions(left_upper * np.array([1, -1, -1, -1]), left_lower)
+
+
+def batched_frame(quats):
+    quatmath.relative(quats[[0, 2]], quats[[1, 3]])
+
+
+def report(label, seconds, count, unit):
+    print(f"{label:<34} {seconds / count * 1e6:10.2f} us/{unit}")
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    skeleton = quatmath.normalize(rng.normal(size=(4, 4)))
+    joints = skeleton.tolist()
+
+    print("per frame, 4-joint skeleton")
+    report("  per-joint multiply_quaternions", timeit.timeit(lambda: legacy_frame(joints), number=FRAMES), FRAMES, "frame")
+    report("  quatmath.relative batch", timeit.timeit(lambda: batched_frame(skeleton), number=FRAMES), FRAMES, "frame")
+
+    print(f"per batch, {ROWS} telemetry rows")
+    a = quatmath.normalize(rng.normal(size=(ROWS, 4)))
+    b = quatmath.normalize(rng.normal(size=(ROWS, 4)))
+    for name, kernel in [("multiply", lambda: quatmath.multiply(a, b)),
+                         ("normalize", lambda: quatmath.normalize(a)),
+                         ("relative", lambda: quatmath.relative(a, b)),
+                         ("to_euler", lambda: quatmath.to_euler(a)),
+                         ("slerp", lambda: quatmath.slerp(a, b, 0.5))]:
+        seconds = min(timeit.repeat(kernel, number=1, repeat=3))
+        print(f"  {name:<32} {seconds * 1e3:10.1f} ms/batch")
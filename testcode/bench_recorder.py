@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from recorder import SessionRecorder, SessionReader
+
+RATE = 1000         # samples/sec per joint
+JOINTS = 8
+SECONDS = 60        # simulated session length, pushed as fast as possible
+
+
+if __name__ == "__main__":
+    keys = [f"/joint/{joint}" for joint in range(JOINTS)]
+    samples = RATE * JOINTS * SECONDS
+    rng = np.random.default_rng(0)
+    quats = rng.normal(size=(RATE * JOINTS, 4))
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    quats = quats.tolist()
+
+    with tempfile.TemporaryDirectory() as path:
+        recorder = SessionRecorder(path)
+        worst = 0.0
+        start = time.perf_counter()
+        for i in range(samples):
+            t0 = time.perf_counter()
+            recorder.push(keys[i % JOINTS], quats[i % len(quats)], i / (RATE * JOINTS))
+            worst = max(worst, time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        recorder.close()
+
+        reader = SessionReader(path)
+        assert len(reader) + recorder.dropped == samples
+        start = time.perf_counter()
+        times, joint_quats = reader.joint_samples("/joint/3")
+        scan = time.perf_counter() - start
+
+        print(f"{samples} samples ({RATE} Hz x {JOINTS} joints x {SECONDS} s)")
+        print(f"push:        {samples / elapsed:12.0f} samples/sec  ({samples / elapsed / (RATE * JOINTS):.0f}x real time)")
+        print(f"worst push:  {worst * 1e6:12.1f} us")
+        print(f"dropped:     {recorder.dropped:12d}")
+        print(f"on disk:     {sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / samples:12.1f} bytes/sample")
+        print(f"mmap scan of one joint: {len(times)} rows in {scan * 1e3:.1f} ms")
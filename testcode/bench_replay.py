@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from recorder import SessionRecorder
+from replay import ReplaySource
+
+RATE = 1000
+JOINTS = 8
+SECONDS = 20
+FPS = 60
+
+
+def make_session(path, seconds=SECONDS, rate=RATE, joints=JOINTS, seed=0):
+    # smooth synthetic motion: each joint swings about its own axis
+    rng = np.random.default_rng(seed)
+    axes = rng.normal(size=(joints, 3))
+    axes /= np.linalg.norm(axes, axis=1, keepdims=True)
+    frequencies = rng.uniform(0.2, 1.0, size=joints)
+    recorder = SessionRecorder(path)
+    for step in range(int(seconds * rate)):
+        t = step / rate
+        angles = 0.8 * np.sin(2 * np.pi * frequencies * t)
+        quats = np.concatenate([np.cos(angles / 2)[:, None], np.sin(angles / 2)[:, None] * axes], axis=1)
+        for joint in range(joints):
+            recorder.push(f"/joint/{joint}", quats[joint], t)
+    recorder.close()
+
+
+def render_loop(source, stop, counters):
+    # stand-in for ModalTimerOperator.modal: snapshot, skip if unchanged, batch relative rotations
+    generation = -1
+    while not stop.is_set():
+        snapshot = source.store.snapshot()
+        counters["frames"] += 1
+        if snapshot.generation != generation and snapshot.sequence.all():
+            generation = snapshot.generation
+            quatmath.relative(snapshot.values[0::2], snapshot.values[1::2])
+            counters["updated"] += 1
+        time.sleep(1 / FPS)
+
+
+def check_speed(path):
+    for speed in (0, 0.0, -1.0):
+        try:
+            ReplaySource(path, speed=speed)
+            raise AssertionError(f"accepted speed {speed}")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as path:
+        make_session(path)
+        check_speed(path)
+        for speed in [1.0, 10.0, None]:
+            source = ReplaySource(path, speed=speed)
+            stop = threading.Event()
+            counters = {"frames": 0, "updated": 0}
+            renderer = threading.Thread(target=render_loop, args=(source, stop, counters))
+            renderer.start()
+            source.start()
+            stop.set()
+            renderer.join()
+
+            stats = source.stats()
+            label = "as fast as possible" if speed is None else f"{speed:g}x"
+            print(f"{label:<20} {stats['samples_per_sec']:10.0f} samples/sec  {stats['speedup']:6.1f}x real time  "
+                  f"render {counters['frames'] / stats['seconds']:5.1f} fps ({counters['updated']} frames with new data)")
@@ -0,0 +1,131 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from recorder import SessionRecorder, SessionReader
+from sessionbake import bake, write_action
+from skeleton import Skeleton, VRM_ARMS
+
+MINUTES = 30
+RATE = 100          # samples/sec per joint, as the MCUs send them
+FPS = 60
+TOLERANCES = [None, 0.25, 0.5, 1.0]     # degrees
+
+
+class Keyframe:
+    __slots__ = ("interpolation",)
+
+    def __init__(self):
+        self.interpolation = "BEZIER"
+
+
+class KeyframePoints:
+    # just enough of FCurveKeyframePoints: add() grows with Bezier keys, foreach_set("co") fills
+    def __init__(self):
+        self.co = np.empty((0, 2), dtype=np.float32)
+        self.points = []
+
+    def add(self, count):
+        self.co = np.concatenate([self.co, np.zeros((count, 2), dtype=np.float32)])
+        self.points.extend(Keyframe() for _ in range(count))
+
+    def foreach_set(self, attribute, values):
+        self.co[:] = np.asarray(values).reshape(-1, 2)
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self):
+        return len(self.co)
+
+
+class FCurve:
+    def __init__(self, data_path, index):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        self.keyframe_points.co = self.keyframe_points.co[np.argsort(self.keyframe_points.co[:, 0], kind="stable")]
+
+    def evaluate(self, frames):
+        # LINEAR interpolation, which is only what Blender plays back if every key was set to it
+        assert all(point.interpolation == "LINEAR" for point in self.keyframe_points)
+        co = self.keyframe_points.co
+        return np.interp(frames, co[:, 0], co[:, 1])
+
+
+class FCurves(list):
+    def find(self, data_path, index=0):
+        return next((f for f in self if f.data_path == data_path and f.array_index == index), None)
+
+    def new(self, data_path, index=0, action_group=""):
+        self.append(FCurve(data_path, index))
+        return self[-1]
+
+
+class Action:
+    def __init__(self):
+        self.fcurves = FCurves()
+
+
+def make_session(path, minutes=MINUTES, rate=RATE, keys=("/joint/0", "/joint/1", "/joint/2", "/joint/3")):
+    # arms swinging for 20 s, then resting for 10 s (with sensor noise), for the whole session
+    steps = int(minutes * 60 * rate)
+    t = np.arange(steps) / rate
+    moving = (t % 30) < 20
+    rng = np.random.default_rng(0)
+    recorder = SessionRecorder(path, chunk_count=steps * len(keys) // 8192 + 2)
+    columns = []
+    for joint, key in enumerate(keys):
+        axis = rng.normal(size=3)
+        axis /= np.linalg.norm(axis)
+        angle = np.where(moving, 0.9 * np.sin(2 * np.pi * (0.3 + 0.1 * joint) * t), 0.2 * joint)
+        quats = np.column_stack([np.cos(angle / 2), np.sin(angle / 2)[:, None] * axis])
+        columns.append(quatmath.normalize(quats + rng.normal(scale=2e-4, size=quats.shape)))
+    for step in range(steps):
+        for joint, key in enumerate(keys):
+            recorder.push(key, columns[joint][step], t[step])
+    recorder.close()
+
+
+def max_error(action, skeleton, rotations, frame_start=1):
+    # worst angle between the written curves (linear between keys) and the baked rotation of every frame
+    frames = np.arange(len(rotations)) + frame_start
+    worst = 0.0
+    for column, bone in enumerate(skeleton.bones):
+        data_path = f'pose.bones["{bone}"].rotation_quaternion'
+        curves = np.column_stack([action.fcurves.find(data_path, i).evaluate(frames) for i in range(4)])
+        worst = max(worst, float(quatmath.angle_between(curves, rotations[:, column]).max()))
+    return np.degrees(worst)
+
+
+if __name__ == "__main__":
+    skeleton = Skeleton(VRM_ARMS)
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        make_session(path)
+        print(f"recorded a {MINUTES} min session ({RATE} Hz x {len(skeleton.keys)} joints) "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        reader = SessionReader(path)
+        print(f"{'tolerance':>9} {'solve s':>8} {'write s':>8} {'keys/curve':>11} {'kept':>6} {'max err deg':>12}")
+        for tolerance in TOLERANCES:
+            start = time.perf_counter()
+            at, rotations, keep = bake(reader, skeleton, FPS, None if tolerance is None else np.radians(tolerance))
+            solved = time.perf_counter()
+            action = Action()
+            keys = write_action(action, skeleton.bones, rotations, keep)
+            written = time.perf_counter()
+            curves = len(skeleton.bones) * 4
+            print(f"{'every' if tolerance is None else tolerance:>9} {solved - start:8.2f} {written - solved:8.2f} "
+                  f"{keys / curves:11.0f} {keys / curves / len(rotations):6.1%} "
+                  f"{max_error(action, skeleton, rotations):12.3f}")
+        print(f"{len(reader)} samples -> {len(at)} frames at {FPS} fps "
+              f"(real-time playback would take {len(at) / FPS / 60:.0f} min)")
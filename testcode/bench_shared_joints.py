@@ -0,0 +1,167 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blenderport import UARTCommunicator
+from fake_mcu import joint_lines
+from jointstore import JointStore
+from sharedjoints import SharedJointStore
+from skeleton import Skeleton, VRM_ARMS
+
+SECONDS = 5
+FPS = 60
+LOADS = [0, 10000, 40000, 80000]    # joint samples/sec decoded by the receiver
+TICK = 0.02                         # the receiver decodes a burst every TICK, like an Event Hub batch
+NAME = "bench_joints"
+
+
+def ingest(store, rate, stop):
+    # JSON lines for all four joints, decoded at `rate` samples/sec in TICK-sized chunks
+    uart = UARTCommunicator("bench", auto_connect=False, store=store)
+    per_tick = max(1, int(rate * TICK))
+    lines = joint_lines(per_tick * 50, keys=store.keys)
+    chunk = len(lines) // 50
+    next_tick = time.perf_counter()
+    position = 0
+    while not stop.is_set():
+        uart.handle_chunk(lines[position:position + chunk])
+        position = (position + chunk) % (chunk * 50)
+        next_tick += TICK
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def receiver_process(rate):
+    # what jointreceiver.py does, with a synthetic source; runs until stdin closes
+    store = SharedJointStore(Skeleton(VRM_ARMS).keys, name=NAME)
+    stop = threading.Event()
+    thread = threading.Thread(target=ingest, args=(store, rate, stop))
+    thread.start()
+    print("ready", flush=True)
+    sys.stdin.read()
+    stop.set()
+    thread.join()
+    store.close()
+
+
+def crashed_receiver():
+    # a receiver killed without close(): its block stays behind, open
+    store = SharedJointStore(("/joint/0",), name=NAME)
+    store.update("/joint/0", (1.0, 0.0, 0.0, 0.0))
+    print("ready", flush=True)
+    os._exit(0)
+
+
+def check_ownership():
+    keys = ("/joint/0",)
+    owner = SharedJointStore(keys, name=NAME)
+    try:
+        SharedJointStore(keys, name=NAME)
+        raise AssertionError("took over a live receiver's block")
+    except FileExistsError:
+        pass
+    reader = SharedJointStore.attach(NAME)
+    owner.update("/joint/0", (1.0, 0.0, 0.0, 0.0))
+    assert reader.snapshot().sequence[0] == 1 and not reader.closed
+    owner.close()
+    assert reader.closed
+    reader.close()
+    try:
+        SharedJointStore.attach(NAME)
+        raise AssertionError("attached to a closed block")
+    except FileNotFoundError:
+        pass
+    assert SharedJointStore.reattach(NAME, keys) is None
+
+    process = subprocess.Popen([sys.executable, __file__, "--crash"], stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    process.wait()
+    reader = SharedJointStore.attach(NAME)
+    assert not reader.closed
+    replacement = SharedJointStore(keys, name=NAME)
+    assert reader.closed
+    reader.close()
+    try:
+        SharedJointStore.reattach(NAME, ("/joint/1",))
+        raise AssertionError("re-attached to a block with other keys")
+    except ValueError:
+        pass
+    reader = SharedJointStore.reattach(NAME, keys)
+    assert reader.snapshot().sequence[0] == 0
+    reader.close()
+    replacement.close()
+
+
+def frame_loop(store, skeleton):
+    # stand-in for ModalTimerOperator.modal: one snapshot and solve per frame at FPS
+    work = []
+    late = []
+    interval = 1.0 / FPS
+    next_frame = time.perf_counter() + interval
+    end = time.perf_counter() + SECONDS
+    while next_frame < end:
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.perf_counter()
+        late.append(started - next_frame)
+        snapshot = store.snapshot()
+        skeleton.solve(snapshot.values)
+        work.append(time.perf_counter() - started)
+        next_frame += interval
+    return np.array(work) * 1e3, np.array(late) * 1e3, snapshot
+
+
+def in_process(skeleton, rate):
+    store = JointStore(skeleton.keys)
+    stop = threading.Event()
+    thread = threading.Thread(target=ingest, args=(store, rate, stop)) if rate else None
+    if thread:
+        thread.start()
+    try:
+        return frame_loop(store, skeleton)
+    finally:
+        stop.set()
+        if thread:
+            thread.join()
+
+
+def out_of_process(skeleton, rate):
+    process = subprocess.Popen([sys.executable, __file__, "--receiver", str(rate)],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    store = SharedJointStore.attach(NAME)
+    try:
+        return frame_loop(store, skeleton)
+    finally:
+        store.close()
+        process.communicate("")
+
+
+if __name__ == "__main__":
+    if "--crash" in sys.argv:
+        crashed_receiver()
+    if "--receiver" in sys.argv:
+        receiver_process(int(sys.argv[sys.argv.index("--receiver") + 1]))
+        sys.exit()
+
+    check_ownership()
+    print("ownership: a live block is refused, closed and crashed blocks are replaced and readers see it")
+
+    skeleton = Skeleton(VRM_ARMS)
+    print(f"{SECONDS} s at {FPS} fps per run, {os.cpu_count()} cores")
+    print(f"{'receiver':>14} {'samples/s':>9} {'frame ms p50':>12} {'p99':>6} {'max':>6} "
+          f"{'late ms p50':>11} {'p99':>6} {'samples seen':>12}")
+    for rate in LOADS:
+        for name, run in (("thread", in_process), ("process+shm", out_of_process)):
+            work, late, snapshot = run(skeleton, rate)
+            print(f"{name:>14} {rate:>9} {np.percentile(work, 50):12.3f} {np.percentile(work, 99):6.3f} "
+                  f"{work.max():6.2f} {np.percentile(late, 50):11.2f} {np.percentile(late, 99):6.2f} "
+                  f"{int(snapshot.sequence.sum()):>12}")
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+import quatmath
+from skeleton import Skeleton, VRM_RIGHT_ARM, VRM_ARMS, VRM_FULL_BODY
+
+FRAMES = 5000
+
+
+def two_people(joints):
+    # a second avatar: same tree with its own bones and keys
+    offset = len(joints)
+    rename = {bone: "P2_" + bone for bone, _, _ in joints}
+    return joints + [(rename[bone], f"/joint/{int(key.rsplit('/', 1)[1]) + offset}", rename.get(parent))
+                     for bone, key, parent in joints]
+
+
+def per_joint(skeleton, world):
+    # the hand-written way: one relative() per child bone, roots copied through
+    rotations = []
+    for row, parent in enumerate(skeleton.parents):
+        rotations.append(quatmath.relative(world[parent], world[row]) if parent >= 0 else world[row])
+    return rotations
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        func(*args)
+    return (time.perf_counter() - start) / FRAMES
+
+
+def check_duplicates():
+    # a bone or a joint key listed twice is refused rather than driven twice
+    for joints in (VRM_RIGHT_ARM + VRM_RIGHT_ARM[:1],
+                   VRM_RIGHT_ARM + [("J_Bip_L_UpperArm", VRM_RIGHT_ARM[0][1], None)]):
+        try:
+            Skeleton(joints)
+            raise AssertionError(f"accepted {joints}")
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    check_duplicates()
+    rng = np.random.default_rng(0)
+    print(f"{'skeleton':>18} {'joints':>6} {'per joint us':>13} {'batched us':>11}")
+    for name, joints in [("right arm", VRM_RIGHT_ARM), ("arms", VRM_ARMS), ("full body", VRM_FULL_BODY),
+                         ("two full bodies", two_people(VRM_FULL_BODY))]:
+        skeleton = Skeleton(joints)
+        world = quatmath.normalize(rng.normal(size=(len(joints), 4)))
+        assert np.allclose(np.array(per_joint(skeleton, world)), skeleton.solve(world))
+        print(f"{name:>18} {len(joints):>6} {timed(per_joint, skeleton, world) * 1e6:>13.1f} "
+              f"{timed(skeleton.solve, world) * 1e6:>11.1f}")
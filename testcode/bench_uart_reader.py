@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blenderport import UARTCommunicator
+from fake_mcu import FakeMCU, joint_lines
+
+LINES = 20000
+
+
+class CountingCommunicator(UARTCommunicator):
+    def __init__(self, port, expected):
+        self.expected = expected
+        self.count = 0
+        super().__init__(port)
+
+    def handle_lines(self, lines):
+        super().handle_lines(lines)
+        self.count += len(lines)
+        if self.count >= self.expected:
+            self.stop_signal.set()
+
+
+def legacy_receive(uart):
+    # the previous reader: one read() call and one bytes concatenation per byte
+    while uart.count < uart.expected:
+        char = b""
+        buffer = b""
+        while char != b"\n":
+            buffer += char
+            char = uart.serial_connection.read()
+        uart.handle_lines([buffer])
+
+
+def run(receive):
+    mcu = FakeMCU()
+    uart = CountingCommunicator(mcu.port, LINES)
+    mcu.write_threaded(joint_lines(LINES))
+    start = time.perf_counter()
+    receive(uart)
+    elapsed = time.perf_counter() - start
+    uart.serial_connection.close()
+    mcu.close()
+    return LINES / elapsed
+
+
+if __name__ == "__main__":
+    before = run(legacy_receive)
+    after = run(lambda uart: uart.receive_packet())
+    print(f"byte-at-a-time reader: {before:12.0f} lines/sec")
+    print(f"chunked reader:        {after:12.0f} lines/sec  ({after / before:.1f}x)")
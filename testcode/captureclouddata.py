@@ -1,20 +1,34 @@
 import os
-from azure.eventhub import EventHubConsumerClient
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blendercloud import create_consumer_client
+from checkpointstore import SQLiteCheckpointStore
+from localhub import LocalEventHub, LocalConsumerClient, FakeESP32Fleet
 
 CONNECTION_STR = "key"
 EVENTHUB_NAME = "name"
 
-consumer_client = EventHubConsumerClient.from_connection_string(
-    conn_str=CONNECTION_STR,
-    consumer_group="$Default",
-    eventhub_name=EVENTHUB_NAME,
-)
+# `python captureclouddata.py --local` prints events from an in-process hub fed by fake ESP32s.
+# `--checkpoints capture.db` resumes each partition where the previous run stopped instead of "@latest"
+checkpoint_store = None
+if "--checkpoints" in sys.argv:
+    checkpoint_store = SQLiteCheckpointStore(sys.argv[sys.argv.index("--checkpoints") + 1])
+
+if "--local" in sys.argv:
+    hub = LocalEventHub()
+    FakeESP32Fleet(hub, devices=2, joint_rate=2.0, bpm_rate=1.0).start_threaded()
+    consumer_client = LocalConsumerClient(hub, checkpoint_store=checkpoint_store)
+else:
+    consumer_client = create_consumer_client(CONNECTION_STR, EVENTHUB_NAME, checkpoint_store=checkpoint_store)
 
 
 def on_event(partition_context, event):
     print("Received event from partition: {}.".format(partition_context.partition_id))
     print("Event properties: {}".format(event.properties))
     print("Event body: {}".format(event.body_as_str()))
+    partition_context.update_checkpoint(event)
 
 
 try:
@@ -24,4 +38,4 @@ try:
             starting_position="@latest",  
         )
 except KeyboardInterrupt:
-    print("Stopped receiving.")
\ No newline at end of file
+    print("Stopped receiving.")
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+import tty
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blendercode"))
+
+from blenderport import encode_frames
+
+# pty-backed stand-in for the joint01 firmware: anything written to the master end
+# shows up on `port` exactly as it would on a real COM port
+class FakeMCU:
+    def __init__(self):
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.thread = None
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master_fd, view)
+            view = view[written:]
+
+    def write_threaded(self, data):
+        self.thread = threading.Thread(target=self.write, args=(data,), daemon=True)
+        self.thread.start()
+
+    def close(self):
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+def joint_lines(count, keys=("/joint/2", "/joint/3")):
+    # same text the firmware prints: two-decimal floats
+    lines = []
+    for i in range(count):
+        key = keys[i % len(keys)]
+        lines.append('{"key": "%s", "value": [0.71, %.2f, -0.12, 0.05]}\n' % (key, (i % 100) / 100))
+    return "".join(lines).encode()
+
+
+def joint_frames(count, joints=(2, 3), rng=None):
+    # the firmware's BINARY_FRAMES output: returns (frame bytes, the quaternions encoded)
+    rng = rng or np.random.default_rng(0)
+    quats = rng.normal(size=(count, 4))
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    ids = np.array(joints)[np.arange(count) % len(joints)]
+    sequences = np.arange(count) // len(joints)
+    return encode_frames(ids, sequences, quats), quats
+
+
+if __name__ == "__main__":
+    # prints one pty path per line, then streams joint lines at --rate lines/sec on each
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ports", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=200.0)
+    args = parser.parse_args()
+
+    mcus = [FakeMCU() for _ in range(args.ports)]
+    for mcu in mcus:
+        print(mcu.port)
+    sys.stdout.flush()
+
+    burst = joint_lines(10)
+    interval = 10 / args.rate
+    try:
+        next_burst = time.monotonic()
+        while True:
+            for mcu in mcus:
+                mcu.write(burst)
+            next_burst += interval
+            time.sleep(max(0.0, next_burst - time.monotonic()))
+    except KeyboardInterrupt:
+        for mcu in mcus:
+            mcu.close()
@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+import time
+
+from streamlit.testing.v1 import AppTest
+
+# simulates many dashboard sessions pressing Start on the Sport Timer and measures what they
+# cost the server while the timers run: `python load_test_app.py [path/to/App.py] [sessions]`
+APP = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "App.py")
+SESSIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+RUN_TIMEOUT = 10.0
+SETTLE = 2.0        # seconds after launching before sampling
+WINDOW = 4.0        # sampling window, inside RUN_TIMEOUT
+
+
+def start_session(results, clicked):
+    at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+    at.run()
+    clicked.release()
+    start = time.perf_counter()
+    try:
+        at.button[0].click().run()
+        results.append(time.perf_counter() - start)
+    except RuntimeError:
+        results.append(None)    # the script never finished rendering
+
+
+if __name__ == "__main__":
+    baseline_threads = threading.active_count()
+    results = []
+    clicked = threading.Semaphore(0)
+    sessions = [threading.Thread(target=start_session, args=(results, clicked), daemon=True) for _ in range(SESSIONS)]
+    for session in sessions:
+        session.start()
+
+    # sample once every session has pressed Start and had time to render
+    for _ in range(SESSIONS):
+        clicked.acquire()
+    time.sleep(SETTLE)
+    cpu = time.process_time()
+    thread_samples = []
+    for _ in range(int(WINDOW * 10)):
+        thread_samples.append(threading.active_count() - baseline_threads)
+        time.sleep(0.1)
+    cpu = time.process_time() - cpu
+
+    for session in sessions:
+        session.join()
+    finished = sorted(seconds for seconds in results if seconds is not None)
+    print(f"{SESSIONS} sessions with the timer running ({APP})")
+    print(f"  fully rendered:          {len(finished)}/{SESSIONS}")
+    if finished:
+        print(f"  render after Start:      {finished[len(finished) // 2] * 1e3:.1f} ms median")
+    print(f"  threads held (mean/max): {sum(thread_samples) / len(thread_samples):.1f} / {max(thread_samples)}")
+    print(f"  server CPU while timing: {cpu / WINDOW * 100:.1f} %")